@@ -0,0 +1,204 @@
+import asyncio
+import json
+import time
+from typing import List, Dict, Any, Optional, Sequence
+from urllib.parse import quote
+
+import aiohttp
+
+from downloader import (
+    WINDOW_ROWS,
+    RANGES_PER_BATCH,
+    SPREADSHEET_INFO_FIELDS,
+    plan_ranges,
+    parse_spreadsheet_info,
+    assemble_windows,
+)
+from shared.credentials import get_credentials, refresh_if_needed
+from shared.rate_limit import (
+    AsyncTokenBucket,
+    RETRYABLE_STATUSES,
+    SHEETS_READ_REQUESTS_PER_MINUTE,
+    backoff_delay,
+)
+
+SHEETS_API_BASE = "https://sheets.googleapis.com"
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+
+
+class SheetsApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class AsyncGoogleSheetsDownloader:
+    """asyncio variant of GoogleSheetsDownloader.
+
+    All requests share one pooled aiohttp session and one token bucket sized
+    to the Sheets per-minute read quota. 429 and 5xx responses are retried
+    with exponential backoff. Spreadsheet metadata is fetched once per
+    downloader instance (one run) and reused.
+
+    Use as an async context manager:
+
+        async with AsyncGoogleSheetsDownloader(credentials_info=info) as dl:
+            results = await dl.download_many(["id1", "id2"])
+    """
+
+    def __init__(
+        self,
+        credentials_file: Optional[str] = None,
+        credentials_info: Optional[Dict[str, Any]] = None,
+        base_url: str = SHEETS_API_BASE,
+        requests_per_minute: float = SHEETS_READ_REQUESTS_PER_MINUTE,
+        burst: Optional[int] = None,
+        max_connections: int = 10,
+        max_retries: int = 5,
+        timeout_s: float = 60.0,
+    ):
+        if credentials_file and credentials_info is None:
+            with open(credentials_file, 'r') as f:
+                credentials_info = json.load(f)
+        self.credentials_info = credentials_info
+        self.credentials = self._build_credentials(credentials_info) if credentials_info else None
+        self.base_url = base_url.rstrip("/")
+        self.limiter = AsyncTokenBucket(requests_per_minute, burst)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._info_cache: Dict[str, Dict[str, Any]] = {}
+        self._token_lock = asyncio.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0}
+
+    @staticmethod
+    def _build_credentials(credentials_info: Dict[str, Any]):
+        # Shared with the threaded downloader, so a fresh token is reused
+        return get_credentials(credentials_info, SCOPES)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _auth_headers(self) -> Dict[str, str]:
+        if self.credentials is None:
+            return {}
+        async with self._token_lock:
+            if not self.credentials.valid:
+                # Token refresh is blocking; keep it off the event loop
+                import google_auth_httplib2
+                import httplib2
+                request = google_auth_httplib2.Request(httplib2.Http())
+                await asyncio.to_thread(refresh_if_needed, self.credentials_info, SCOPES, request)
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def _get(self, path: str, params: Sequence = ()) -> Dict[str, Any]:
+        if self.session is None:
+            await self.open()
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            headers = await self._auth_headers()
+            self.stats["requests"] += 1
+            try:
+                async with self.session.get(url, params=list(params), headers=headers) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    body = await response.text()
+                    if response.status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                        raise SheetsApiError(response.status, body[:200])
+                    if response.status == 429:
+                        self.stats["throttled"] += 1
+                    delay = backoff_delay(attempt, retry_after=response.headers.get("Retry-After"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise SheetsApiError(0, str(e))
+                delay = backoff_delay(attempt)
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+        raise SheetsApiError(0, "retries exhausted")
+
+    async def get_spreadsheet_info(self, spreadsheet_id: str, refresh: bool = False) -> Dict[str, Any]:
+        if not refresh and spreadsheet_id in self._info_cache:
+            return self._info_cache[spreadsheet_id]
+        try:
+            spreadsheet = await self._get(
+                f"/v4/spreadsheets/{quote(spreadsheet_id, safe='')}",
+                [("fields", SPREADSHEET_INFO_FIELDS)],
+            )
+        except Exception as e:
+            raise Exception(f"Spreadsheet bilgileri alınamadı: {e}")
+        info = parse_spreadsheet_info(spreadsheet)
+        self._info_cache[spreadsheet_id] = info
+        return info
+
+    async def batch_get(self, spreadsheet_id: str, ranges: List[str]) -> List[List[List[str]]]:
+        result = await self._get(
+            f"/v4/spreadsheets/{quote(spreadsheet_id, safe='')}/values:batchGet",
+            [("ranges", r) for r in ranges],
+        )
+        return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+    async def download_all_sheets(
+        self,
+        spreadsheet_id: str,
+        window_rows: int = WINDOW_ROWS,
+        ranges_per_batch: int = RANGES_PER_BATCH,
+    ) -> Dict[str, List[List[str]]]:
+        """Same result shape as GoogleSheetsDownloader.download_all_sheets.
+
+        Raises if any batch still fails after its retries.
+        """
+        info = await self.get_spreadsheet_info(spreadsheet_id)
+        plan = plan_ranges(info, window_rows)
+        batches = [plan[i:i + ranges_per_batch] for i in range(0, len(plan), ranges_per_batch)]
+        results = await asyncio.gather(
+            *(self.batch_get(spreadsheet_id, [a1 for _, _, a1 in batch]) for batch in batches),
+            return_exceptions=True,
+        )
+        parts: Dict[str, list] = {name: [] for name in info['sheets']}
+        for batch, values in zip(batches, results):
+            if isinstance(values, Exception):
+                # batch_get already retried; an empty sheet here would be indexed as if it were empty
+                sheets = ", ".join(sorted({name for name, _, _ in batch}))
+                raise Exception(f"Batch indirilemedi ({sheets}): {values}") from values
+            for (sheet_name, start, _), rows in zip(batch, values):
+                parts[sheet_name].append((start, rows))
+        return {name: assemble_windows(windows) for name, windows in parts.items()}
+
+    async def download_many(
+        self,
+        spreadsheet_ids: Sequence[str],
+        concurrency: int = 8,
+    ) -> Dict[str, Any]:
+        """Download several spreadsheets concurrently.
+
+        Returns {spreadsheet_id: data} where data is the sheet mapping or the
+        exception raised for that spreadsheet.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(spreadsheet_id):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    return await self.download_all_sheets(spreadsheet_id)
+                finally:
+                    print(f"⏱️ {spreadsheet_id}: {time.perf_counter() - start:.2f}s")
+
+        results = await asyncio.gather(*(one(s) for s in spreadsheet_ids), return_exceptions=True)
+        return dict(zip(spreadsheet_ids, results))
@@ -0,0 +1,280 @@
+"""Headless batch ingestion of many spreadsheets.
+
+Downloads run on a thread pool (I/O bound); chunking and embedding run on a
+process pool (CPU bound); each result is written to its `sheets_<id>`
+collection from the parent process.
+
+CLI:
+    python batch_ingest.py --credentials creds.json --ids ID1 ID2
+    python batch_ingest.py --credentials creds.json --items items.json
+    python batch_ingest.py --credentials creds.json --ids ID1 --dedup near
+    python batch_ingest.py --credentials creds.json --ids ID1 --dedup near --dedup-key SKU
+
+items.json is a list of
+    {"spreadsheet_id": "...", "inclusion_rules": [...], "exclusion_rules": [...],
+     "selection": {"sheets": [...], "columns": [...], "ranges": "A1:F500", "rows": [...]}}
+
+"selection" is optional, see selection.SelectionSpec.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+
+from downloader import GoogleSheetsDownloader
+from google_sheets_embedding_method import GoogleSheetsEmbeddingMethod
+from row_chunker import CHUNK_TOKENS
+from selection import SelectionSpec
+from shared.config import DEDUP_MODES
+
+
+def collection_name_for(spreadsheet_id: str) -> str:
+    return f"sheets_{spreadsheet_id[:8]}"
+
+
+def _init_worker(num_threads: int):
+    # Split the CPU between worker processes instead of each using every core
+    os.environ["EMBED_NUM_THREADS"] = str(num_threads)
+    os.environ["EMBED_WARMUP"] = "0"
+
+
+def _download(credentials_info: Dict[str, Any], item: Dict[str, Any], cache_mode: Optional[str] = None) -> Dict[str, Any]:
+    start = time.perf_counter()
+    # Credentials and per-thread clients are shared through shared.credentials
+    downloader = GoogleSheetsDownloader(credentials_info=credentials_info, cache_mode=cache_mode)
+    all_data = downloader.download_all_sheets_bulk(
+        item["spreadsheet_id"],
+        selection=SelectionSpec.from_config(item),
+    )
+    return {"all_data": all_data, "download_s": time.perf_counter() - start}
+
+
+def _chunk_and_embed(
+    service_account_dict: Dict[str, Any],
+    spreadsheet_id: str,
+    all_data: Dict[str, List[List[str]]],
+    chunk_tokens: int,
+    dedup: Optional[str] = None,
+    dedup_key_columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Process-pool task: rows -> nodes -> embeddings (uses the worker's shared model)."""
+    from shared.dedup import make_deduplicator
+    from shared.embedding_cache import EmbeddingCache
+    from shared.embedding_registry import embed_nodes
+
+    start = time.perf_counter()
+    embedding_method = GoogleSheetsEmbeddingMethod(
+        data_source_id="google_sheets",
+        config={
+            "service_account_dict": service_account_dict,
+            "spreadsheet_id": spreadsheet_id,
+            "chunk_tokens": chunk_tokens,
+        },
+    )
+    # A single-row sheet has no header and is indexed as data, like the other paths
+    windows = [
+        (sheet_name, rows[0], 2, rows[1:]) if len(rows) > 1 else (sheet_name, [], 1, rows)
+        for sheet_name, rows in all_data.items()
+        if rows
+    ]
+    # The whole spreadsheet is in memory, so every back-reference is known before embedding
+    deduplicator = make_deduplicator(dedup, dedup_key_columns)
+    nodes = list(embedding_method.iter_nodes(windows, deduplicator))
+    if deduplicator is not None:
+        deduplicator.annotate(nodes)
+    chunk_s = time.perf_counter() - start
+    embed_nodes(nodes, EmbeddingCache())
+    return {
+        "nodes": nodes,
+        "chunk_s": chunk_s,
+        "embed_s": time.perf_counter() - start - chunk_s,
+        "dedup": deduplicator.summary() if deduplicator is not None else None,
+    }
+
+
+class BatchIngester:
+    """Ingest a list of spreadsheets into their own collections.
+
+    Each item is {"spreadsheet_id", "inclusion_rules", "exclusion_rules",
+    "selection"}; rules are sheet-name substrings and, like the selection,
+    are applied before download.
+    """
+
+    def __init__(
+        self,
+        credentials_file: str,
+        download_workers: int = 4,
+        process_workers: Optional[int] = None,
+        chunk_tokens: int = CHUNK_TOKENS,
+        cache_mode: Optional[str] = None,
+        dedup: Optional[str] = None,
+        dedup_key_columns: Optional[List[str]] = None,
+    ):
+        self.credentials_file = credentials_file
+        with open(credentials_file, 'r') as f:
+            self.service_account_dict = json.load(f)
+        self.download_workers = download_workers
+        self.process_workers = process_workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.chunk_tokens = chunk_tokens
+        # Snapshot cache mode for downloads (None = SHEETS_CACHE_MODE)
+        self.cache_mode = cache_mode
+        # Row dedup mode (None = EMBED_DEDUP)
+        self.dedup = dedup
+        # Columns near-duplicates must match exactly (None = EMBED_DEDUP_KEY_COLUMNS)
+        self.dedup_key_columns = dedup_key_columns
+
+    def _write(self, spreadsheet_id: str, nodes) -> Dict[str, Any]:
+        from vector_store_manager import GoogleSheetsVectorStore
+        from shared.manifest import IndexManifest
+
+        start = time.perf_counter()
+        vector_store = GoogleSheetsVectorStore(collection_name=collection_name_for(spreadsheet_id))
+        # Full rebuild, same as streaming mode
+        vector_store.clear_collection()
+        IndexManifest().clear_collection(vector_store.collection_name)
+        vector_store.add_node_stream(nodes)
+        return {"write_s": time.perf_counter() - start, "collection": vector_store.collection_name}
+
+    def run(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        report: Dict[str, Dict[str, Any]] = {item["spreadsheet_id"]: {} for item in items}
+        threads_per_worker = max(1, (os.cpu_count() or 1) // self.process_workers)
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as download_pool, \
+                ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(threads_per_worker,),
+                ) as process_pool:
+            downloads = {
+                download_pool.submit(_download, self.service_account_dict, item, self.cache_mode): item["spreadsheet_id"]
+                for item in items
+            }
+            processing = {}
+            for future in as_completed(downloads):
+                spreadsheet_id = downloads[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    report[spreadsheet_id]["error"] = f"download: {e}"
+                    continue
+                all_data = result["all_data"]
+                report[spreadsheet_id].update({
+                    "sheets": len(all_data),
+                    "rows": sum(len(rows) - 1 if len(rows) > 1 else len(rows) for rows in all_data.values()),
+                    "download_s": result["download_s"],
+                })
+                processing[process_pool.submit(
+                    _chunk_and_embed,
+                    self.service_account_dict,
+                    spreadsheet_id,
+                    all_data,
+                    self.chunk_tokens,
+                    self.dedup,
+                    self.dedup_key_columns,
+                )] = spreadsheet_id
+
+            for future in as_completed(processing):
+                spreadsheet_id = processing[future]
+                try:
+                    result = future.result()
+                    report[spreadsheet_id].update({
+                        "nodes": len(result["nodes"]),
+                        "chunk_s": result["chunk_s"],
+                        "embed_s": result["embed_s"],
+                    })
+                    if result["dedup"]:
+                        report[spreadsheet_id]["dedup"] = result["dedup"]
+                    report[spreadsheet_id].update(self._write(spreadsheet_id, result["nodes"]))
+                except Exception as e:
+                    report[spreadsheet_id]["error"] = f"process/write: {e}"
+
+        elapsed = time.perf_counter() - started
+        for entry in report.values():
+            for key in ("download_s", "chunk_s", "embed_s", "write_s"):
+                if key in entry:
+                    entry[key] = round(entry[key], 3)
+        total_rows = sum(entry.get("rows", 0) for entry in report.values())
+        total_nodes = sum(entry.get("nodes", 0) for entry in report.values())
+        return {
+            "spreadsheets": report,
+            "elapsed_s": round(elapsed, 3),
+            "rows": total_rows,
+            "nodes": total_nodes,
+            "rows_per_s": round(total_rows / elapsed, 1) if elapsed else 0.0,
+            "nodes_per_s": round(total_nodes / elapsed, 1) if elapsed else 0.0,
+            "failed": [sid for sid, entry in report.items() if "error" in entry],
+        }
+
+
+def load_items(args) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    if args.items:
+        with open(args.items, 'r', encoding='utf-8') as f:
+            items.extend(json.load(f))
+    for spreadsheet_id in args.ids or []:
+        items.append({
+            "spreadsheet_id": spreadsheet_id,
+            "inclusion_rules": args.include or [],
+            "exclusion_rules": args.exclude or [],
+            "selection": {"columns": args.columns or [], "ranges": args.range, "rows": args.rows or []},
+        })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-ingest Google Sheets into Chroma collections.")
+    parser.add_argument("--credentials", required=True, help="Service account JSON file")
+    parser.add_argument("--ids", nargs="*", help="Spreadsheet IDs")
+    parser.add_argument("--items", help="JSON file with per-spreadsheet rules")
+    parser.add_argument("--include", nargs="*", help="Inclusion rules applied to --ids")
+    parser.add_argument("--exclude", nargs="*", help="Exclusion rules applied to --ids")
+    parser.add_argument("--columns", nargs="*", help="Header names or letters to download for --ids")
+    parser.add_argument("--range", default=None, help="A1 range to download for --ids (e.g. A1:F5000)")
+    parser.add_argument("--rows", nargs="*", help='Row filters for --ids (e.g. "Status == Open")')
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--process-workers", type=int, default=None)
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument(
+        "--cache-mode",
+        choices=["off", "cache_first", "offline"],
+        help="Snapshot cache mode (default: SHEETS_CACHE_MODE or off)",
+    )
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        help="Drop repeated rows before embedding (default: EMBED_DEDUP or off)",
+    )
+    parser.add_argument(
+        "--dedup-key",
+        nargs="+",
+        metavar="COLUMN",
+        help="Key columns (names or letters) near-duplicates must match exactly "
+             "(default: EMBED_DEDUP_KEY_COLUMNS)",
+    )
+    args = parser.parse_args()
+
+    items = load_items(args)
+    if not items:
+        parser.error("no spreadsheets given (use --ids or --items)")
+
+    ingester = BatchIngester(
+        args.credentials,
+        download_workers=args.download_workers,
+        process_workers=args.process_workers,
+        chunk_tokens=args.chunk_tokens,
+        cache_mode=args.cache_mode,
+        dedup=args.dedup,
+        dedup_key_columns=args.dedup_key,
+    )
+    report = ingester.run(items)
+    print(json.dumps(report, indent=2))
+    raise SystemExit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
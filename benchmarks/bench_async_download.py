@@ -0,0 +1,59 @@
+"""Refresh many spreadsheets concurrently against the local fake Sheets server.
+
+Usage:
+    python -m benchmarks.bench_async_download --spreadsheets 24 --fail-every 7
+"""
+import argparse
+import asyncio
+import time
+
+from async_downloader import AsyncGoogleSheetsDownloader
+from shared.fake_sheets_server import FakeSheetsServer
+from shared.sheets_stub import generate_workbook
+
+
+async def refresh(base_url, spreadsheet_ids, args):
+    async with AsyncGoogleSheetsDownloader(
+        base_url=base_url,
+        requests_per_minute=args.rpm,
+        max_connections=args.connections,
+    ) as downloader:
+        start = time.perf_counter()
+        results = await downloader.download_many(spreadsheet_ids, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+        return results, elapsed, downloader.stats, downloader.limiter.waited_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spreadsheets", type=int, default=24)
+    parser.add_argument("--sheets", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-every", type=int, default=7, help="Inject a 429 every n-th request")
+    parser.add_argument("--rpm", type=float, default=600, help="Token bucket rate (requests/minute)")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    workbooks = {
+        f"sheet-{i}": generate_workbook(args.sheets, args.rows, seed=i)
+        for i in range(args.spreadsheets)
+    }
+    with FakeSheetsServer(workbooks, latency=args.latency, fail_every=args.fail_every) as server:
+        results, elapsed, stats, waited = asyncio.run(refresh(server.base_url, list(workbooks), args))
+
+    errors = {k: v for k, v in results.items() if isinstance(v, Exception)}
+    assert not errors, f"failed spreadsheets: {errors}"
+    for spreadsheet_id, data in results.items():
+        assert data == workbooks[spreadsheet_id], f"{spreadsheet_id}: data mismatch"
+    rows = sum(len(r) for wb in workbooks.values() for r in wb.values())
+    print(
+        f"{len(workbooks)} spreadsheets, {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s); "
+        f"requests={stats['requests']} retries={stats['retries']} throttled={stats['throttled']} "
+        f"limiter_wait={waited:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
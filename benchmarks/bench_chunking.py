@@ -0,0 +1,54 @@
+"""Compare SentenceSplitter with RowChunker on synthetic sheets.
+
+Usage:
+    python -m benchmarks.bench_chunking --rows 1000 10000 100000 --columns 12
+"""
+import argparse
+import time
+
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document
+
+from row_chunker import RowChunker
+from shared.sheets_stub import generate_workbook
+
+
+def sheet_document(rows):
+    """Build the same document shape as the fallback reader."""
+    return Document(
+        text="\n".join(", ".join(r) for r in rows[1:]),
+        metadata={"sheet_name": "Sheet1", "columns": ", ".join(rows[0]), "first_row": 2},
+    )
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    nodes = fn()
+    elapsed = time.perf_counter() - start
+    avg = sum(len(n.text) for n in nodes) / len(nodes) if nodes else 0
+    print(f"  {label:<16} {elapsed:8.3f}s  {len(nodes):7d} chunks  {avg:7.0f} avg chars")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--cell-size", type=int, default=8)
+    parser.add_argument("--chunk-tokens", type=int, default=512)
+    args = parser.parse_args()
+
+    splitter = IngestionPipeline(transformations=[SentenceSplitter(chunk_size=1024, chunk_overlap=50)])
+    chunker = RowChunker(chunk_tokens=args.chunk_tokens)
+    for row_count in args.rows:
+        rows = generate_workbook(1, row_count, args.columns, args.cell_size)["Sheet1"]
+        document = sheet_document(rows)
+        print(f"{row_count} rows x {args.columns} columns ({len(document.text) / 1e6:.1f} MB text)")
+        old = measure("SentenceSplitter", lambda: splitter.run(documents=[document]))
+        new = measure("RowChunker", lambda: chunker.chunk_documents([document]))
+        print(f"  speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Chunks, embedded characters and (optionally) embedding time saved by row dedup.
+
+The synthetic workbook repeats rows the way real sheets do: template rows
+inside every tab, a block copied across tabs, and near-copies that differ in
+one cell. `--embed` also times the shared embedding model on the chunks of
+each mode (no embedding cache). `--key` sets near-dup key columns. A check
+that rows differing only in a key column are kept runs first.
+
+Usage:
+    python -m benchmarks.bench_dedup --sheets 5 --rows 5000
+    python -m benchmarks.bench_dedup --rows 2000 --embed
+    python -m benchmarks.bench_dedup --key C1
+"""
+import argparse
+import random
+import time
+
+from llama_index.core.schema import MetadataMode
+
+from row_chunker import RowChunker
+from shared.dedup import RowDeduplicator
+from shared.sheets_stub import generate_workbook
+
+
+def repetitive_workbook(sheets: int, rows: int, columns: int, seed: int, template_share: float,
+                        copied_share: float, near_share: float):
+    rng = random.Random(seed)
+    workbook = generate_workbook(sheet_count=sheets, rows=rows, columns=columns, seed=seed)
+    templates = [[f"TEMPLATE-{t}", "TODO"] + ["-"] * (columns - 2) for t in range(5)]
+    block = workbook["Sheet1"][1:1 + int(rows * copied_share)]
+    for name, values in workbook.items():
+        data = values[1:]
+        if name != "Sheet1":
+            start = rng.randrange(max(1, rows - len(block)))
+            data[start:start + len(block)] = [list(row) for row in block]
+        for i in rng.sample(range(rows), int(rows * template_share)):
+            data[i] = list(rng.choice(templates))
+        for i in rng.sample(range(1, rows), int(rows * near_share)):
+            near = list(data[i - 1])
+            near[-1] = near[-1][:-1] + "X"
+            data[i] = near
+        values[1:] = data
+    return workbook
+
+
+def chunk(workbook, deduplicator=None):
+    chunker = RowChunker()
+    nodes = []
+    for name, values in workbook.items():
+        nodes.extend(chunker.chunk_rows(
+            values[0], values[1:], metadata={"spreadsheet_id": "bench", "sheet_name": name},
+            deduplicator=deduplicator,
+        ))
+    if deduplicator is not None:
+        deduplicator.annotate(nodes)
+    return nodes
+
+
+def check_key_columns():
+    """Rows that differ only in a key column survive near dedup once it is a key."""
+    header = ["SKU", "Product", "Description", "Status"]
+    description = (
+        "Stainless steel water bottle, 750 ml, double walled and vacuum insulated; keeps drinks cold "
+        "for 24 hours or hot for 12, leak-proof lid, dishwasher safe, ships in recycled packaging"
+    )
+    rows = [
+        ["SKU-10001", "Bottle", description, "In stock"],
+        ["SKU-10002", "Bottle", description, "In stock"],
+        ["SKU-10001", "Bottle", description, "In Stock"],
+    ]
+
+    def near_duplicates(key_columns):
+        deduplicator = RowDeduplicator("near", key_columns=key_columns)
+        RowChunker().chunk_rows(header, rows, metadata={"sheet_name": "Items"}, deduplicator=deduplicator)
+        return deduplicator.counters["near_duplicates"]
+
+    assert near_duplicates([]) == 2
+    for key in ("SKU", "A"):
+        # SKU-10002 is kept; the second SKU-10001 differs only in case and is still dropped
+        assert near_duplicates([key]) == 1, key
+    print("key columns: ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=5000, help="Data rows per sheet")
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--templates", type=float, default=0.15, help="Share of rows that are template rows")
+    parser.add_argument("--copied", type=float, default=0.2, help="Share of Sheet1 copied into every other tab")
+    parser.add_argument("--near", type=float, default=0.05, help="Share of rows that near-copy the row above")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embed", action="store_true", help="Also time embedding of each mode's chunks")
+    parser.add_argument("--key", nargs="+", default=[], help="Near-dup key columns (names or letters)")
+    args = parser.parse_args()
+
+    check_key_columns()
+
+    workbook = repetitive_workbook(
+        args.sheets, args.rows, args.columns, args.seed, args.templates, args.copied, args.near
+    )
+    print(f"workbook: {args.sheets} sheet(s) x {args.rows} rows, {args.columns} columns")
+    for mode in ("off", "exact", "near"):
+        deduplicator = None if mode == "off" else RowDeduplicator(mode, key_columns=args.key)
+        start = time.perf_counter()
+        nodes = chunk(workbook, deduplicator)
+        chunk_s = time.perf_counter() - start
+        line = f"{mode:<6} chunks={len(nodes):<7} chunk+dedup {chunk_s:6.2f}s"
+        if deduplicator is not None:
+            summary = deduplicator.summary()
+            line += (
+                f"  dropped exact={summary['exact_duplicates']} near={summary['near_duplicates']}"
+                f"  vectors saved {summary['vectors_saved_pct']:.1f}%"
+                f"  embedded chars saved {summary['embed_chars_saved_pct']:.1f}%"
+            )
+        if args.embed:
+            from shared.embedding_registry import embedding_registry
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            start = time.perf_counter()
+            embedding_registry.embed_texts(texts)
+            line += f"  embed {time.perf_counter() - start:6.2f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Offline throughput comparison: serial per-sheet download vs bulk batchGet.
+
+Usage:
+    python -m benchmarks.bench_download --sheets 40 --rows 2000 --latency 0.05
+"""
+import argparse
+import time
+
+from downloader import GoogleSheetsDownloader
+from shared.sheets_stub import StubSheetsService, generate_workbook
+
+
+def run(label, downloader, spreadsheet_id, total_rows, **kwargs):
+    service = downloader.service
+    service.call_counts.clear()
+    start = time.perf_counter()
+    data = downloader.download_all_sheets(spreadsheet_id, **kwargs)
+    elapsed = time.perf_counter() - start
+    rows = sum(len(r) for r in data.values())
+    assert rows == total_rows, f"{label}: expected {total_rows} rows, got {rows}"
+    print(
+        f"{label:<8} {elapsed:8.3f}s  {rows / elapsed:12.0f} rows/s  "
+        f"requests={sum(service.call_counts.values())}"
+    )
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per request")
+    parser.add_argument("--window-rows", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    spreadsheet_id = "bench"
+    workbook = generate_workbook(args.sheets, args.rows, args.columns)
+    total_rows = sum(len(r) for r in workbook.values())
+    service = StubSheetsService({spreadsheet_id: workbook}, latency=args.latency)
+    downloader = GoogleSheetsDownloader(None, service=service)
+
+    serial = run("serial", downloader, spreadsheet_id, total_rows)
+    bulk = run(
+        "bulk", downloader, spreadsheet_id, total_rows,
+        bulk=True, window_rows=args.window_rows, max_workers=args.workers,
+    )
+    assert serial == bulk, "bulk download result differs from serial download"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Exact-key lookup latency of the BM25 lexical index as the sheet grows.
+
+Each sheet gets a unique SKU-style key per row; chunks come from the real
+RowChunker, so the index sees the same text the pipeline writes.
+
+Usage:
+    python -m benchmarks.bench_lexical --rows 10000 100000 --lookups 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from llama_index.core.schema import MetadataMode
+
+from row_chunker import RowChunker
+from shared.lexical_index import LexicalIndex
+from shared.sheets_stub import generate_workbook
+from benchmarks.query_load import percentile
+
+
+def build_entries(rows: int, columns: int, seed: int):
+    values = generate_workbook(sheet_count=1, rows=rows, columns=columns, seed=seed)["Sheet1"]
+    header = ["sku"] + values[0]
+    data = [[f"SKU-{seed}-{i:07d}"] + row for i, row in enumerate(values[1:])]
+    nodes = RowChunker().chunk_rows(header, data, first_row=2, metadata={"sheet_name": "Sheet1"}, source_id="bench")
+    return [
+        (node.node_id, node.get_content(metadata_mode=MetadataMode.NONE), node.metadata)
+        for node in nodes
+    ], [row[0] for row in data]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as root:
+        for rows in args.rows:
+            entries, keys = build_entries(rows, args.columns, args.seed)
+            index = LexicalIndex(os.path.join(root, f"bench_{rows}.sqlite3"))
+            start = time.perf_counter()
+            for i in range(0, len(entries), 256):
+                index.upsert(entries[i:i + 256])
+            build_s = time.perf_counter() - start
+
+            latencies = []
+            misses = 0
+            for key in rng.sample(keys, min(args.lookups, len(keys))):
+                start = time.perf_counter()
+                hits = index.search(key, top_k=5)
+                latencies.append(time.perf_counter() - start)
+                misses += not hits
+            stats = index.stats()
+            index.close()
+            print(
+                f"rows={rows:<8} chunks={stats['chunks']:<7} build {rows / build_s:9.0f} rows/s  "
+                f"size {stats['size_bytes'] / 1e6:7.1f} MB  lookup p50={percentile(latencies, 50) * 1000:6.2f}ms "
+                f"p99={percentile(latencies, 99) * 1000:6.2f}ms  misses={misses}"
+            )
+
+
+if __name__ == "__main__":
+    main()
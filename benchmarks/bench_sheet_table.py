@@ -0,0 +1,114 @@
+"""Compare memory and summary time of List[List[str]] against SheetTable.
+
+Usage:
+    python -m benchmarks.bench_sheet_table --rows 10000 100000 --columns 20
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from sheet_table import SheetTable, rows_nbytes, DATE, DATETIME, TEXT
+
+
+def numeric_sheet(rows, columns, seed):
+    """Header plus rows of ints, decimals, ISO dates and a low-cardinality label column."""
+    rng = random.Random(seed)
+    labels = ["north", "south", "east", "west"]
+    header = [f"col_{c}" for c in range(columns)]
+    data = [header]
+    for _ in range(rows):
+        row = []
+        for c in range(columns):
+            kind = c % 4
+            if kind == 0:
+                row.append(str(rng.randint(0, 10 ** 6)))
+            elif kind == 1:
+                row.append(f"{rng.randint(0, 999)}.{rng.randint(1, 9)}")
+            elif kind == 2:
+                row.append(f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+            else:
+                row.append(rng.choice(labels))
+        data.append(row)
+    return data
+
+
+def python_summary(rows):
+    """The list-walking equivalent of SheetTable.summary() for numeric columns."""
+    stats = {}
+    for c, name in enumerate(rows[0]):
+        values = []
+        for row in rows[1:]:
+            if c < len(row) and row[c]:
+                try:
+                    values.append(float(row[c]))
+                except ValueError:
+                    break
+        else:
+            if values:
+                stats[name] = (min(values), max(values), sum(values) / len(values))
+    return stats
+
+
+def traced(fn):
+    """(result, seconds, peak bytes); timed without tracemalloc, which slows allocation."""
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def check_inference():
+    """Type inference on edge cases; every column must round-trip unchanged."""
+    data = [
+        ["due", "stamp", "bad_date", "bad_stamp", "amount"],
+        ["2024-02-28", "2024-02-28T10:00:00", "2024-02-28", "2024-02-28T10:00:00", "1.5"],
+        ["2024-03-01", "", "2024-02-30", "2024-13-01T10:00:00", "2"],
+    ]
+    table = SheetTable.from_rows(data)
+    kinds = {c.name: c.kind for c in table.columns}
+    assert kinds["due"] == DATE and kinds["stamp"] == DATETIME, kinds
+    assert kinds["bad_date"] == TEXT and kinds["bad_stamp"] == TEXT, kinds
+    assert table.to_rows() == data[1:], "round trip mismatch"
+
+
+def check_summary_names():
+    """Duplicate and blank header names each get their own column_stats entry."""
+    data = [["Name", "Name", "", "col_3", "Name (2)"], ["1", "2", "3", "4", "5"], ["6", "7", "8", "9", "10"]]
+    stats = SheetTable.from_rows(data, header=True).summary()["column_stats"]
+    assert len(stats) == 5, list(stats)
+    assert stats["Name"]["min"] == 1.0 and stats["Name (2)"]["min"] == 2.0, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    check_inference()
+    check_summary_names()
+    for rows in args.rows:
+        data = numeric_sheet(rows, args.columns, args.seed)
+        print(f"{rows} rows x {args.columns} columns")
+        print(f"  list[list[str]]  {rows_nbytes(data) / 2 ** 20:8.1f} MiB resident")
+        table, build_s, build_peak = traced(lambda: SheetTable.from_rows(data))
+        print(
+            f"  SheetTable       {table.nbytes / 2 ** 20:8.1f} MiB resident  "
+            f"build {build_s:6.3f}s  peak {build_peak / 2 ** 20:6.1f} MiB"
+        )
+        assert table.to_rows() == data[1:], "round trip mismatch"
+        _, list_s, _ = traced(lambda: python_summary(data))
+        _, table_s, _ = traced(table.summary)
+        print(f"  summary          lists {list_s:6.3f}s  table {table_s:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cosine drift and chunks/s of the ONNX embedding backends against the torch reference.
+
+Chunks come from a generated workbook through the real RowChunker, so text
+lengths match what the pipeline embeds. Exits 1 when a backend's worst
+cosine similarity to the reference drops below its bound.
+
+Usage:
+    python -m benchmarks.embedding_parity
+    python -m benchmarks.embedding_parity --backends onnx-int8 --rows 4000 --min-cosine onnx-int8=0.98
+"""
+import argparse
+import time
+
+import numpy as np
+from llama_index.core.schema import MetadataMode
+
+from row_chunker import RowChunker
+from sheet_table import SheetTable
+from shared.embedding_registry import embedding_registry
+from shared.sheets_stub import generate_workbook
+
+REFERENCE = "torch"
+# Worst-case cosine similarity to the torch vectors
+MIN_COSINE = {"onnx": 0.999, "onnx-int8": 0.97}
+QUERIES = ["total amount by region", "rows with status pending", "customer email address", "latest date"]
+
+
+def chunk_texts(rows: int, columns: int, seed: int):
+    chunker = RowChunker()
+    texts = []
+    for sheet_name, values in generate_workbook(sheet_count=2, rows=rows, columns=columns, seed=seed).items():
+        table = SheetTable.from_rows(values)
+        for node in chunker.chunk_table(table, metadata={"sheet_name": sheet_name}):
+            texts.append(node.get_content(metadata_mode=MetadataMode.EMBED))
+    return texts
+
+
+def run_backend(backend: str, model_name: str, texts, repeat: int):
+    start = time.perf_counter()
+    model = embedding_registry.get_model(model_name, backend=backend)
+    load_s = time.perf_counter() - start
+    embedding_registry.embed_texts(texts[:8], model_name=model_name, backend=backend)  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vectors = embedding_registry.embed_texts(texts, model_name=model_name, backend=backend)
+        best = min(best, time.perf_counter() - start)
+    queries = [model.get_query_embedding(q) for q in QUERIES]
+    return {
+        "load_s": load_s,
+        "chunks_per_s": len(texts) / best,
+        "vectors": np.asarray(vectors, dtype=np.float32),
+        "queries": np.asarray(queries, dtype=np.float32),
+    }
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def parse_bounds(items):
+    bounds = dict(MIN_COSINE)
+    for item in items or []:
+        backend, value = item.split("=", 1)
+        bounds[backend] = float(value)
+    return bounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=None, help="Model id (default: EMBED_MODEL_NAME)")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes; the fastest is reported")
+    parser.add_argument("--min-cosine", nargs="*", metavar="BACKEND=VALUE", help="Override drift bounds")
+    args = parser.parse_args()
+
+    bounds = parse_bounds(args.min_cosine)
+    texts = chunk_texts(args.rows, args.columns, args.seed)
+    print(f"{len(texts)} chunks, avg {sum(map(len, texts)) / len(texts):.0f} chars")
+
+    reference = run_backend(REFERENCE, args.model, texts, args.repeat)
+    print(f"  {REFERENCE:<10} load {reference['load_s']:6.2f}s  {reference['chunks_per_s']:8.1f} chunks/s")
+
+    failed = []
+    for backend in args.backends:
+        result = run_backend(backend, args.model, texts, args.repeat)
+        drift = cosine(result["vectors"], reference["vectors"])
+        query_drift = cosine(result["queries"], reference["queries"])
+        worst = float(min(drift.min(), query_drift.min()))
+        bound = bounds.get(backend, 0.0)
+        ok = worst >= bound
+        print(
+            f"  {backend:<10} load {result['load_s']:6.2f}s  {result['chunks_per_s']:8.1f} chunks/s  "
+            f"speedup {result['chunks_per_s'] / reference['chunks_per_s']:5.2f}x  "
+            f"cosine min {worst:.5f} mean {drift.mean():.5f} (bound {bound})  {'✅' if ok else '❌'}"
+        )
+        if not ok:
+            failed.append(backend)
+
+    if failed:
+        raise SystemExit(f"❌ Cosine drift beyond bound: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
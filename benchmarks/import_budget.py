@@ -0,0 +1,121 @@
+"""Import-time budget for the app's cold start, measured with `python -X importtime`.
+
+Imports `main` (the Streamlit script, without running it) in fresh
+interpreters and reports the time spent in the app's own import chain,
+i.e. everything except what Streamlit itself imports. Exits 1 when the
+median exceeds the budget or when a heavy dependency is imported eagerly.
+
+Usage:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 60 --repeat 9 --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import List, Dict, Any, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "main"
+# Imported by Streamlit before the app runs; not charged to the app
+FRAMEWORK = ("streamlit",)
+# Must only be imported on first use, never at app start
+HEAVY = (
+    "chromadb",
+    "llama_index",
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "onnxruntime",
+    "googleapiclient",
+    "google_auth_httplib2",
+)
+BUDGET_MS = 100.0
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """(self_us, cumulative_us, depth, module) rows in the order Python reports them."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, module))
+    return rows
+
+
+def app_imports(rows: List[Tuple[int, int, int, str]], module: str) -> List[Tuple[int, int, int, str]]:
+    """Rows of `module`'s import subtree, minus the framework's own subtrees.
+
+    Python reports children before their parent, so the rows are walked
+    backwards: each parent is seen first, then its deeper descendants.
+    """
+    kept = []
+    inside = False
+    skip_depth = None
+    for row in reversed(rows):
+        _, _, depth, name = row
+        if depth == 0:
+            inside = name == module
+            skip_depth = None
+            if inside:
+                kept.append(row)
+            continue
+        if not inside or (skip_depth is not None and depth > skip_depth):
+            continue
+        skip_depth = None
+        if name.split(".")[0] in FRAMEWORK:
+            skip_depth = depth
+            continue
+        kept.append(row)
+    return list(reversed(kept))
+
+
+def measure(module: str) -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{result.stderr[-2000:]}")
+    rows = app_imports(parse_importtime(result.stderr), module)
+    return {
+        "app_ms": sum(self_us for self_us, _, _, _ in rows) / 1000,
+        "rows": rows,
+        "heavy": sorted({m.split(".")[0] for _, _, _, m in rows if m.split(".")[0] in HEAVY}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters; the median is compared")
+    parser.add_argument("--top", type=int, default=10, help="Slowest app modules to list")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(max(1, args.repeat))]
+    median_ms = statistics.median(run["app_ms"] for run in runs)
+    last = runs[-1]
+    print(f"import {args.module}: app import chain {median_ms:.1f} ms (median of {len(runs)}, budget {args.budget_ms:.0f} ms)")
+    for self_us, cumulative_us, depth, module in sorted(last["rows"], key=lambda r: r[0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {module}")
+
+    failures = []
+    if last["heavy"]:
+        failures.append(f"heavy modules imported at startup: {', '.join(last['heavy'])}")
+    if median_ms > args.budget_ms:
+        failures.append(f"{median_ms:.1f} ms > budget {args.budget_ms:.0f} ms")
+    if failures:
+        raise SystemExit("❌ Import budget exceeded: " + "; ".join(failures))
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Load generator for SheetsRetriever: p50/p99 latency over a persisted collection.
+
+Queries are sampled from the collection's own chunk text unless --queries is given.
+
+Usage:
+    python -m benchmarks.query_load --collection sheets_1BxiMVs0 --requests 500 --threads 8
+    python -m benchmarks.query_load --collection sheets_1BxiMVs0 --mode lexical
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from retrieval_service import SheetsRetriever
+from shared.config import RETRIEVAL_MODES
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def sample_queries(retriever, count, seed):
+    collection = retriever.client.get_collection(retriever.collection_name)
+    documents = collection.get(limit=max(count * 4, 100), include=["documents"])["documents"]
+    rng = random.Random(seed)
+    queries = []
+    for document in rng.sample(documents, min(count, len(documents))):
+        words = document.split()
+        start = rng.randrange(max(1, len(words) - 6))
+        queries.append(" ".join(words[start:start + 6]))
+    return queries
+
+
+def run_phase(label, retriever, queries, requests, threads, top_k, seed):
+    rng = random.Random(seed)
+    workload = [rng.choice(queries) for _ in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = [t for _, t in pool.map(lambda q: retriever.timed_search(q, top_k=top_k), workload)]
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<6} n={requests:<6} p50={percentile(latencies, 50) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.2f}ms  qps={requests / elapsed:8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--queries", nargs="*", help="Query strings (default: sampled from the collection)")
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct sampled queries")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=RETRIEVAL_MODES, default=None, help="Default: RETRIEVAL_MODE")
+    args = parser.parse_args()
+
+    retriever = SheetsRetriever(args.collection, mode=args.mode)
+    queries = args.queries or sample_queries(retriever, args.distinct, args.seed)
+    if not queries:
+        parser.error("collection is empty and no --queries given")
+
+    # Cold: every distinct query embedded and searched once
+    run_phase("cold", retriever, queries, len(queries), 1, args.top_k, args.seed)
+    # Warm: repeated queries, served from the query/result caches
+    run_phase("warm", retriever, queries, args.requests, args.threads, args.top_k, args.seed)
+    print(retriever.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Offline end-to-end benchmark: download -> documents -> nodes -> index, per stage.
+
+Each scenario runs in a fresh spawned process against StubSheetsService and a
+temporary Chroma directory (cold embedding cache), so peak RSS is not polluted
+by earlier scenarios. The embedding model must be available locally
+(e.g. HF_HUB_OFFLINE=1 with a populated HuggingFace cache).
+
+Usage:
+    python -m benchmarks.suite                              # all scenarios
+    python -m benchmarks.suite --scenarios small wide --repeat 3
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+# name -> generate_workbook arguments
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "small": {"sheet_count": 3, "rows": 500, "columns": 8, "cell_size": 8},
+    "wide": {"sheet_count": 2, "rows": 1000, "columns": 60, "cell_size": 8},
+    "tall": {"sheet_count": 1, "rows": 50000, "columns": 10, "cell_size": 8},
+    "many_tabs": {"sheet_count": 60, "rows": 200, "columns": 8, "cell_size": 8},
+    "big_cells": {"sheet_count": 2, "rows": 2000, "columns": 6, "cell_size": 200},
+}
+STAGES = ("download", "documents", "nodes", "index")
+SERVICE_ACCOUNT = {
+    key: "benchmark" for key in (
+        "type", "project_id", "private_key_id", "private_key", "client_email", "client_id",
+        "auth_uri", "token_uri", "auth_provider_x509_cert_url", "client_x509_cert_url", "universe_domain",
+    )
+}
+
+
+def current_rss() -> int:
+    """Resident set size in bytes (Linux /proc, falling back to the lifetime peak)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class RssSampler:
+    """Samples RSS on a background thread to find the peak of one stage."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_rss = current_rss()
+        self.peak = self.start_rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(stage: str, fn: Callable[[], Any], count: Callable[[Any], int], unit: str, results: Dict[str, Any]):
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+    items = count(value)
+    results[stage] = {
+        "seconds": round(elapsed, 4),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+        "rss_delta_mb": round((rss.peak - rss.start_rss) / 2 ** 20, 1),
+    }
+    return value
+
+
+def run_scenario(name: str, params: Dict[str, int], latency: float, bulk: bool) -> Dict[str, Any]:
+    """One full pipeline run; executed inside a fresh worker process."""
+    from downloader import GoogleSheetsDownloader
+    from google_sheets_embedding_method import GoogleSheetsEmbeddingMethod
+    from shared.embedding_cache import EmbeddingCache
+    from shared.embedding_registry import embedding_registry
+    from shared.metrics import metrics
+    from shared.sheets_stub import StubSheetsService, generate_workbook
+    from vector_store_manager import GoogleSheetsVectorStore
+
+    spreadsheet_id = f"bench_{name}"
+    service = StubSheetsService({spreadsheet_id: generate_workbook(seed=0, **params)}, latency=latency)
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="sheets-bench-") as tmp:
+        # Model load is reported on its own so it does not skew the index stage
+        measure("model_load", embedding_registry.get_model, lambda _: 1, "model", results)
+        metrics.reset()
+
+        downloader = GoogleSheetsDownloader(None, service=service, cache_mode="off")
+        all_data = measure(
+            "download",
+            lambda: downloader.download_all_sheets(spreadsheet_id, bulk=bulk),
+            lambda data: sum(len(rows) for rows in data.values()),
+            "rows", results,
+        )
+        embedding_method = GoogleSheetsEmbeddingMethod(
+            data_source_id="google_sheets",
+            config={"service_account_dict": SERVICE_ACCOUNT, "spreadsheet_id": spreadsheet_id},
+        )
+        documents = measure(
+            "documents",
+            lambda: embedding_method.documents_from_sheets(all_data),
+            len, "documents", results,
+        )
+        for document in documents:
+            embedding_method.customize_metadata(document, "google_sheets", spreadsheet_id=spreadsheet_id)
+        nodes = measure("nodes", lambda: embedding_method.get_nodes(documents), len, "nodes", results)
+        vector_store = GoogleSheetsVectorStore(
+            collection_name=f"sheets_{name}",
+            embedding_cache=EmbeddingCache(os.path.join(tmp, "embedding_cache.sqlite3")),
+            chroma_path=os.path.join(tmp, "chroma"),
+        )
+        measure("index", lambda: vector_store.create_index(nodes), lambda _: len(nodes), "nodes", results)
+        results["spans"] = metrics.snapshot()["spans"]
+    return results
+
+
+def median_results(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = dict(runs[-1])
+    for stage in ("model_load",) + STAGES:
+        entry = dict(runs[-1][stage])
+        for key in ("seconds", "throughput", "peak_rss_mb", "rss_delta_mb"):
+            entry[key] = round(statistics.median(r[stage][key] for r in runs), 4)
+        merged[stage] = entry
+    merged["repeats"] = len(runs)
+    return merged
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print a stage-by-stage comparison and return the regressions."""
+    regressions = []
+    print(f"\n{'scenario':<11} {'stage':<10} {'baseline':>10} {'current':>10} {'change':>8}   rss MB (base -> now)")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"{name:<11} (no baseline)")
+            continue
+        for stage in STAGES:
+            old, new = base[stage]["seconds"], result[stage]["seconds"]
+            change = (new - old) / old if old else 0.0
+            old_rss, new_rss = base[stage]["peak_rss_mb"], result[stage]["peak_rss_mb"]
+            flag = ""
+            if change > tolerance:
+                flag = "  ⚠️ slower"
+                regressions.append(f"{name}/{stage}: {old:.3f}s -> {new:.3f}s ({change:+.0%})")
+            if old_rss and (new_rss - old_rss) / old_rss > tolerance:
+                flag += "  ⚠️ more memory"
+                regressions.append(f"{name}/{stage}: peak RSS {old_rss} -> {new_rss} MB")
+            print(
+                f"{name:<11} {stage:<10} {old:9.3f}s {new:9.3f}s {change:+7.0%}   "
+                f"{old_rss:7.1f} -> {new_rss:7.1f}{flag}"
+            )
+    return regressions
+
+
+def print_results(name: str, result: Dict[str, Any]):
+    print(f"\n{name}")
+    for stage in ("model_load",) + STAGES:
+        r = result[stage]
+        print(
+            f"  {stage:<10} {r['seconds']:8.3f}s  {r['throughput']:10.1f} {r['unit']}/s  "
+            f"peak {r['peak_rss_mb']:7.1f} MB (+{r['rss_delta_mb']:.1f})"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median is reported")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per Sheets request")
+    parser.add_argument("--serial", action="store_true", help="Use the per-sheet download path instead of bulk")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Store the results as the new baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "latency": args.latency,
+        "bulk": not args.serial,
+        "scenarios": {},
+    }
+    context = multiprocessing.get_context("spawn")
+    for name in args.scenarios:
+        runs = []
+        for _ in range(args.repeat):
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(run_scenario, (name, SCENARIOS[name], args.latency, not args.serial)))
+        result = median_results(runs)
+        result["params"] = SCENARIOS[name]
+        report["scenarios"][name] = result
+        print_results(name, result)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions beyond tolerance:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print("\n✅ No regressions beyond tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,163 @@
 import json
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Any, Optional, Sequence, Set, Tuple
+from shared.change_tracker import ChangeTracker, sheet_fingerprint
+from shared.config import get_snapshot_settings
+from shared.credentials import get_credentials, get_service
+from shared.snapshot_store import SnapshotStore, CACHE_OFF, CACHE_FIRST, OFFLINE, CACHE_MODES
+from shared.metrics import metrics, count_values
+from selection import SelectionSpec, SheetPlan, quote_sheet_name
+from sheet_table import SheetTable
+
+# Bulk download defaults: sheets larger than WINDOW_ROWS are split into
+# row windows, and at most RANGES_PER_BATCH ranges go into one batchGet call.
+WINDOW_ROWS = 5000
+RANGES_PER_BATCH = 20
+MAX_WORKERS = 4
+
+
+def plan_ranges(
+    spreadsheet_info: Dict[str, Any],
+    window_rows: int = WINDOW_ROWS,
+) -> List[Tuple[str, int, str]]:
+    """Split every sheet into (sheet_name, first_row, a1_range) windows.
+
+    Sheets whose grid fits in one window are requested whole; larger ones
+    are split into 1-based row ranges of `window_rows` rows.
+    """
+    plan = []
+    grid_sizes = spreadsheet_info.get('grid_sizes', {})
+    for sheet_name in spreadsheet_info['sheets']:
+        quoted = quote_sheet_name(sheet_name)
+        row_count = grid_sizes.get(sheet_name, {}).get('rows', 0)
+        if row_count <= window_rows:
+            plan.append((sheet_name, 0, quoted))
+            continue
+        for start in range(0, row_count, window_rows):
+            end = min(start + window_rows, row_count)
+            plan.append((sheet_name, start, f"{quoted}!{start + 1}:{end}"))
+    return plan
+
+
+def parse_spreadsheet_info(spreadsheet: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a `spreadsheets.get` response to title, sheet names and grid sizes."""
+    sheets = [sheet['properties'] for sheet in spreadsheet.get('sheets', [])]
+    return {
+        'title': spreadsheet.get('properties', {}).get('title', 'Bilinmeyen'),
+        'sheets': [props['title'] for props in sheets],
+        'grid_sizes': {
+            props['title']: {
+                'rows': props.get('gridProperties', {}).get('rowCount', 0),
+                'columns': props.get('gridProperties', {}).get('columnCount', 0),
+            }
+            for props in sheets
+        },
+    }
+
+
+def assemble_windows(parts: List[Tuple[int, List[List[str]]]]) -> List[List[str]]:
+    """Join (first_row, rows) windows of one sheet back into a single row list."""
+    rows: List[List[str]] = []
+    for start, part in sorted(parts, key=lambda p: p[0]):
+        if part and len(rows) < start:
+            # Interior empty rows are trimmed at window edges; pad them back
+            rows.extend([] for _ in range(start - len(rows)))
+        rows.extend(part)
+    return rows
+
+
+SPREADSHEET_INFO_FIELDS = "properties.title,sheets.properties(title,gridProperties)"
+
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    # Only used to read modifiedTime/version for change detection
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+
 
 class GoogleSheetsDownloader:
-    def __init__(self, credentials_file):
+    def __init__(
+        self,
+        credentials_file=None,
+        service=None,
+        drive_service=None,
+        change_tracker: Optional[ChangeTracker] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+        cache_mode: Optional[str] = None,
+        credentials_info: Optional[Dict[str, Any]] = None,
+    ):
+        """`cache_mode` is off, cache_first or offline (default: SHEETS_CACHE_MODE).
+
+        cache_first serves fresh snapshots from `snapshot_store` and saves
+        every download; offline only reads snapshots and needs no credentials.
+        Credentials come from `credentials_info` (a service account dict, kept
+        in memory) or are read once from `credentials_file`.
+        """
+        self.cache_mode = cache_mode or get_snapshot_settings()["cache_mode"]
+        if self.cache_mode not in CACHE_MODES:
+            raise ValueError(f"Geçersiz cache_mode: {self.cache_mode} (beklenen: {', '.join(CACHE_MODES)})")
+        self.snapshot_store = snapshot_store
+        if self.snapshot_store is None and self.cache_mode != CACHE_OFF:
+            self.snapshot_store = SnapshotStore()
         self.credentials_file = credentials_file
-        self.service = self._authenticate()
+        self.credentials_info = credentials_info
+        self.credentials = None
+        self._info_cache: Dict[str, Dict[str, Any]] = {}
+        self._revisions: Dict[str, Dict[str, Any]] = {}
+        self._service_injected = service is not None
+        if service is None and self.cache_mode != OFFLINE:
+            service = self._authenticate()
+        self.service = service
+        self._drive_service = drive_service
+        self.change_tracker = change_tracker
 
+    @metrics.traced("auth")
     def _authenticate(self):
         try:
-            with open(self.credentials_file, 'r') as f:
-                credentials_info = json.load(f)
-            creds = service_account.Credentials.from_service_account_info(
-            credentials_info,
-            scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-        )
-            
-            return build('sheets', 'v4', credentials=creds)
+            if self.credentials_info is None:
+                with open(self.credentials_file, 'r') as f:
+                    self.credentials_info = json.load(f)
+            # Shared per service account, so tokens are reused across downloaders
+            self.credentials = get_credentials(self.credentials_info, SCOPES)
+            return get_service('sheets', 'v4', self.credentials_info, SCOPES)
         except Exception as e:
             raise Exception(f"Google Sheets kimlik doğrulama hatası: {e}")
-        
-        
-    def get_spreadsheet_info(self, spreadsheet_id: str) -> Dict[str, Any]:
+
+    def _worker_service(self):
+        """Return a Sheets client for the current thread.
+
+        The discovery client (httplib2) is not thread-safe, so each thread
+        gets its own client, cached per service account in shared.credentials.
+        """
+        if self._service_injected:
+            return self.service
+        return get_service('sheets', 'v4', self.credentials_info, SCOPES)
+
+    def get_spreadsheet_info(self, spreadsheet_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """Fetch title, sheet names and grid sizes; cached per downloader instance."""
+        if not refresh and spreadsheet_id in self._info_cache:
+            return self._info_cache[spreadsheet_id]
+        if self.cache_mode != CACHE_OFF:
+            meta = self.snapshot_store.load_meta(spreadsheet_id)
+            if meta is None and self.cache_mode == OFFLINE:
+                raise Exception(f"Spreadsheet bilgileri alınamadı: {spreadsheet_id} için snapshot yok (offline)")
+            if meta is not None and (
+                self.cache_mode == OFFLINE or (not refresh and self.snapshot_store.is_fresh(meta))
+            ):
+                info = {'title': meta['title'], 'sheets': meta['sheet_order'], 'grid_sizes': meta['grid_sizes']}
+                self._info_cache[spreadsheet_id] = info
+                return info
         try:
             print(f"Attempting to access spreadsheet: {spreadsheet_id}")
-            spreadsheet = self.service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-            return {
-                'title': spreadsheet.get('properties', {}).get('title', 'Bilinmeyen'),
-                'sheets': [sheet['properties']['title'] for sheet in spreadsheet.get('sheets', [])]
-            }
+            with metrics.span("spreadsheet_info"):
+                spreadsheet = self._worker_service().spreadsheets().get(
+                    spreadsheetId=spreadsheet_id,
+                    fields=SPREADSHEET_INFO_FIELDS
+                ).execute()
+            info = parse_spreadsheet_info(spreadsheet)
+            self._info_cache[spreadsheet_id] = info
+            return info
         except Exception as e:
             print(f"Error details: {str(e)}")
             print(f"Error type: {type(e)}")
@@ -38,23 +166,518 @@ class GoogleSheetsDownloader:
     def download_sheet_data(self, spreadsheet_id: str, sheet_name: str) -> List[List[str]]:
         try:
             print(f"Downloading sheet: {sheet_name}")
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=spreadsheet_id,
-                range=sheet_name
-            ).execute()
-            return result.get('values', [])
+            with metrics.span("download_sheet", sheet=sheet_name) as span:
+                result = self._worker_service().spreadsheets().values().get(
+                    spreadsheetId=spreadsheet_id,
+                    range=sheet_name
+                ).execute()
+                values = result.get('values', [])
+                span["rows"] = self._count_download(values)
+            return values
         except Exception as e:
             print(f"Sheet download error: {str(e)}")
             raise Exception(f"{sheet_name} sheet verisi indirilemedi: {e}")
 
-    def download_all_sheets(self, spreadsheet_id: str) -> Dict[str, List[List[str]]]:
+    @staticmethod
+    def _count_download(rows: List[List[str]]) -> int:
+        cells, size = count_values(rows)
+        metrics.incr("rows_downloaded", len(rows))
+        metrics.incr("cells_downloaded", cells)
+        metrics.incr("bytes_downloaded", size)
+        return len(rows)
+
+    def _load_snapshot(self, spreadsheet_id: str, sheet_names: List[str]) -> Optional[Dict[str, List[List[str]]]]:
+        """Sheets from the snapshot store, or None if the cache mode says to download."""
+        if self.cache_mode == CACHE_OFF:
+            return None
+        with metrics.span("snapshot_load"):
+            snapshot = self.snapshot_store.load(
+                spreadsheet_id, sheet_names, allow_expired=self.cache_mode == OFFLINE
+            )
+        if snapshot is None:
+            if self.cache_mode == OFFLINE:
+                raise Exception(f"{spreadsheet_id} için snapshot bulunamadı (offline mod)")
+            return None
+        current = self._revisions.get(spreadsheet_id)
+        if self.cache_mode == CACHE_FIRST and current and snapshot['revision'] != current:
+            # Drive already reported a newer revision in this run
+            return None
+        print(f"💾 {spreadsheet_id} snapshot'tan okundu ({len(snapshot['all_data'])} sheet)")
+        metrics.incr("snapshot_hits")
+        return snapshot['all_data']
+
+    def _save_snapshot(
+        self,
+        spreadsheet_id: str,
+        all_data: Dict[str, List[List[str]]],
+        failed: Sequence[str] = (),
+    ):
+        if self.cache_mode != CACHE_FIRST:
+            return
+        # Failed sheets come back as []; blank tabs are saved as [] too so the snapshot stays complete
+        downloaded = {name: rows for name, rows in all_data.items() if name not in failed}
+        revision = self._revisions.get(spreadsheet_id)
+        if revision is None:
+            try:
+                revision = self.get_revision(spreadsheet_id)
+            except Exception as e:
+                print(f"⚠️ Drive revision alınamadı, snapshot revision'sız kaydediliyor: {e}")
+        try:
+            with metrics.span("snapshot_save"):
+                self.snapshot_store.save(
+                    spreadsheet_id, downloaded, self.get_spreadsheet_info(spreadsheet_id), revision
+                )
+        except Exception as e:
+            print(f"⚠️ Snapshot kaydedilemedi: {e}")
+
+    def download_all_sheets(
+        self,
+        spreadsheet_id: str,
+        bulk: bool = False,
+        window_rows: int = WINDOW_ROWS,
+        ranges_per_batch: int = RANGES_PER_BATCH,
+        max_workers: int = MAX_WORKERS,
+        selection: Optional[SelectionSpec] = None,
+    ) -> Dict[str, List[List[str]]]:
+        """Download every sheet, or only what `selection` selects.
+
+        A sheet that cannot be downloaded comes back as []; use
+        `download_if_changed` to tell it apart from an empty sheet.
+        """
+        all_data, _ = self._download_all(
+            spreadsheet_id,
+            bulk=bulk,
+            window_rows=window_rows,
+            ranges_per_batch=ranges_per_batch,
+            max_workers=max_workers,
+            selection=selection,
+        )
+        return all_data
+
+    @metrics.traced("download_all")
+    def _download_all(
+        self,
+        spreadsheet_id: str,
+        bulk: bool = False,
+        window_rows: int = WINDOW_ROWS,
+        ranges_per_batch: int = RANGES_PER_BATCH,
+        max_workers: int = MAX_WORKERS,
+        selection: Optional[SelectionSpec] = None,
+    ) -> Tuple[Dict[str, List[List[str]]], Set[str]]:
+        """`download_all_sheets` plus the names of the sheets that failed to download."""
+        if bulk or (selection is not None and selection.narrows_cells):
+            # Column/range selections need targeted range requests
+            return self.download_all_sheets_bulk(
+                spreadsheet_id,
+                window_rows=window_rows,
+                ranges_per_batch=ranges_per_batch,
+                max_workers=max_workers,
+                selection=selection,
+            ), set()
         spreadsheet_info = self.get_spreadsheet_info(spreadsheet_id)
+        if selection is not None:
+            spreadsheet_info = selection.filter_info(spreadsheet_info)
+        cached = self._load_snapshot(spreadsheet_id, spreadsheet_info['sheets'])
+        if cached is not None:
+            return cached, set()
         all_data = {}
+        failed = set()
         for sheet_name in spreadsheet_info['sheets']:
             try:
                 data = self.download_sheet_data(spreadsheet_id, sheet_name)
                 all_data[sheet_name] = data
             except Exception as e:
                 all_data[sheet_name] = []
+                failed.add(sheet_name)
                 print(f"❌ {sheet_name} indirilemedi: {e}")
+        self._save_snapshot(spreadsheet_id, all_data, failed)
+        return all_data, failed
+
+    def download_all_tables(self, spreadsheet_id: str, **download_kwargs) -> Dict[str, SheetTable]:
+        """Download every sheet and keep it as a columnar SheetTable.
+
+        Each sheet's list-of-strings form is released as soon as its table
+        is built, so only one sheet is held in both forms at a time.
+        """
+        all_data = self.download_all_sheets(spreadsheet_id, **download_kwargs)
+        tables = {}
+        for sheet_name in list(all_data):
+            rows = all_data.pop(sheet_name)
+            tables[sheet_name] = SheetTable.from_rows(rows, header=len(rows) > 1)
+        return tables
+
+    def iter_sheet_windows(
+        self,
+        spreadsheet_id: str,
+        window_rows: int = WINDOW_ROWS,
+        spreadsheet_info: Optional[Dict[str, Any]] = None,
+        selection: Optional[SelectionSpec] = None,
+    ) -> Iterator[Tuple[str, List[str], int, List[List[str]]]]:
+        """Yield (sheet_name, header, first_row, rows) one row window at a time.
+
+        `first_row` is the 1-based sheet row of rows[0]; the header row is
+        split off the first window and repeated for every window of a sheet.
+        A sheet with a single row is yielded as data with no header (first_row
+        1), as `split_rows` and the batch paths index it. Only one window is held in memory at a time. A window that cannot be
+        downloaded raises, so the stream never ends early on a partial sheet.
+        """
+        if spreadsheet_info is None:
+            spreadsheet_info = self.get_spreadsheet_info(spreadsheet_id)
+        if selection is not None:
+            spreadsheet_info = selection.filter_info(spreadsheet_info)
+            if selection.narrows_cells:
+                yield from self._iter_selected_windows(spreadsheet_id, spreadsheet_info, selection, window_rows)
+                return
+        cached = self._load_snapshot(spreadsheet_id, spreadsheet_info['sheets'])
+        if cached is not None:
+            # Replay the snapshot in the same window shape
+            for sheet_name, rows in cached.items():
+                if not rows:
+                    continue
+                if len(rows) == 1:
+                    yield sheet_name, [], 1, rows
+                    continue
+                header, data = rows[0], rows[1:]
+                for start in range(0, len(data), window_rows):
+                    yield sheet_name, header, start + 2, data[start:start + window_rows]
+            return
+        grid_sizes = spreadsheet_info.get('grid_sizes', {})
+        for sheet_name in spreadsheet_info['sheets']:
+            quoted = quote_sheet_name(sheet_name)
+            row_count = grid_sizes.get(sheet_name, {}).get('rows', 0)
+            header: List[str] = []
+            has_data = False
+            for start in range(0, max(row_count, 1), window_rows):
+                end = start + window_rows
+                try:
+                    with metrics.span("download_window", sheet=sheet_name, first_row=start + 1) as span:
+                        result = self._worker_service().spreadsheets().values().get(
+                            spreadsheetId=spreadsheet_id,
+                            range=f"{quoted}!{start + 1}:{end}"
+                        ).execute()
+                        rows = result.get('values', [])
+                        span["rows"] = self._count_download(rows)
+                except Exception as e:
+                    # Stopping here would silently end the stream on a partial sheet
+                    raise Exception(f"{sheet_name} satır {start + 1}-{end} indirilemedi: {e}")
+                first_row = start + 1
+                if start == 0 and rows:
+                    header, rows, first_row = rows[0], rows[1:], 2
+                if rows:
+                    has_data = True
+                    yield sheet_name, header, first_row, rows
+            if header and not has_data:
+                yield sheet_name, [], 1, [header]
+
+    def _batch_get(self, spreadsheet_id: str, ranges: List[str]) -> List[List[List[str]]]:
+        with metrics.span("batch_get", ranges=len(ranges)) as span:
+            result = self._worker_service().spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=ranges
+            ).execute()
+            values = [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+            span["rows"] = sum(self._count_download(rows) for rows in values)
+        return values
+
+    @metrics.traced("download_bulk")
+    def download_all_sheets_bulk(
+        self,
+        spreadsheet_id: str,
+        window_rows: int = WINDOW_ROWS,
+        ranges_per_batch: int = RANGES_PER_BATCH,
+        max_workers: int = MAX_WORKERS,
+        spreadsheet_info: Optional[Dict[str, Any]] = None,
+        selection: Optional[SelectionSpec] = None,
+    ) -> Dict[str, List[List[str]]]:
+        """Download every sheet with a few `values().batchGet` calls.
+
+        Returns the same mapping as `download_all_sheets`, but the round-trips
+        run on a bounded thread pool instead of one after another. Raises if
+        any sheet could not be downloaded completely.
+        """
+        if spreadsheet_info is None:
+            spreadsheet_info = self.get_spreadsheet_info(spreadsheet_id)
+        if selection is not None:
+            spreadsheet_info = selection.filter_info(spreadsheet_info)
+            if selection.narrows_cells:
+                return self._download_selected(
+                    spreadsheet_id, spreadsheet_info, selection, window_rows, ranges_per_batch, max_workers
+                )
+        cached = self._load_snapshot(spreadsheet_id, spreadsheet_info['sheets'])
+        if cached is not None:
+            return cached
+        plan = plan_ranges(spreadsheet_info, window_rows)
+        batches = [plan[i:i + ranges_per_batch] for i in range(0, len(plan), ranges_per_batch)]
+        print(f"Downloading {len(plan)} range(s) in {len(batches)} batch request(s)")
+
+        windows: Dict[str, List[Tuple[int, List[List[str]]]]] = {name: [] for name in spreadsheet_info['sheets']}
+        errors = []
+
+        def fetch(batch):
+            return batch, self._batch_get(spreadsheet_id, [a1 for _, _, a1 in batch])
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(fetch, batch) for batch in batches]
+            for future in futures:
+                try:
+                    batch, values = future.result()
+                except Exception as e:
+                    print(f"❌ Batch indirilemedi: {e}")
+                    errors.append(e)
+                    continue
+                for (sheet_name, start, _), rows in zip(batch, values):
+                    windows[sheet_name].append((start, rows))
+
+        failed = [
+            sheet_name for sheet_name, parts in windows.items()
+            if len(parts) != sum(1 for name, _, _ in plan if name == sheet_name)
+        ]
+        if failed:
+            # An empty sheet here would be indexed (or rebuilt) as if it had no rows
+            raise Exception(f"{', '.join(failed)} indirilemedi: {errors[0] if errors else 'eksik aralık'}")
+        all_data = {sheet_name: assemble_windows(parts) for sheet_name, parts in windows.items()}
+        self._save_snapshot(spreadsheet_id, all_data)
+        return all_data
+
+    def _plan_selection(
+        self,
+        spreadsheet_id: str,
+        spreadsheet_info: Dict[str, Any],
+        selection: SelectionSpec,
+        headers: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, SheetPlan]:
+        """Compile `selection` into a SheetPlan per sheet.
+
+        Header names are resolved from row 1 of every sheet, fetched with
+        one batchGet per RANGES_PER_BATCH sheets unless `headers` is given.
+        """
+        sheets = spreadsheet_info['sheets']
+        if headers is None:
+            headers = {}
+            if selection.needs_headers:
+                for i in range(0, len(sheets), RANGES_PER_BATCH):
+                    batch = sheets[i:i + RANGES_PER_BATCH]
+                    values = self._batch_get(spreadsheet_id, [f"{quote_sheet_name(name)}!1:1" for name in batch])
+                    for name, rows in zip(batch, values):
+                        headers[name] = rows[0] if rows else []
+        grid_sizes = spreadsheet_info.get('grid_sizes', {})
+        plans = {}
+        for name in sheets:
+            plan = selection.plan_sheet(name, grid_sizes.get(name), headers.get(name, []))
+            if plan is not None:
+                plans[name] = plan
+        return plans
+
+    def _select_cached(
+        self,
+        spreadsheet_id: str,
+        spreadsheet_info: Dict[str, Any],
+        selection: SelectionSpec,
+    ) -> Optional[Dict[str, List[List[str]]]]:
+        """Apply the selection to a snapshot of the selected sheets, if the cache mode allows one."""
+        cached = self._load_snapshot(spreadsheet_id, spreadsheet_info['sheets'])
+        if cached is None:
+            return None
+        headers = {name: rows[0] if rows else [] for name, rows in cached.items()}
+        plans = self._plan_selection(spreadsheet_id, spreadsheet_info, selection, headers=headers)
+        return {name: plan.apply(cached[name]) for name, plan in plans.items()}
+
+    @metrics.traced("download_selected")
+    def _download_selected(
+        self,
+        spreadsheet_id: str,
+        spreadsheet_info: Dict[str, Any],
+        selection: SelectionSpec,
+        window_rows: int,
+        ranges_per_batch: int,
+        max_workers: int,
+    ) -> Dict[str, List[List[str]]]:
+        """Download only the selected columns/rows with targeted batchGet ranges.
+
+        Rows keep their sheet position (filtered rows become []), so row
+        numbers in node metadata still point at the source row. Partial
+        sheets are not saved as snapshots. Raises if any range failed.
+        """
+        cached = self._select_cached(spreadsheet_id, spreadsheet_info, selection)
+        if cached is not None:
+            return cached
+        plans = self._plan_selection(spreadsheet_id, spreadsheet_info, selection)
+        # One range per column block and row window
+        plan = [
+            (sheet_name, start, block, a1)
+            for sheet_name, sheet_plan in plans.items()
+            for start, end in sheet_plan.windows(window_rows)
+            for block, a1 in enumerate(sheet_plan.ranges(start, end))
+        ]
+        batches = [plan[i:i + ranges_per_batch] for i in range(0, len(plan), ranges_per_batch)]
+        print(f"Downloading {len(plan)} selected range(s) from {len(plans)} sheet(s) in {len(batches)} batch request(s)")
+
+        parts: Dict[Tuple[str, int], Dict[int, List[List[str]]]] = {}
+        errors = []
+
+        def fetch(batch):
+            return batch, self._batch_get(spreadsheet_id, [a1 for _, _, _, a1 in batch])
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(fetch, batch) for batch in batches]
+            for future in futures:
+                try:
+                    batch, values = future.result()
+                except Exception as e:
+                    print(f"❌ Batch indirilemedi: {e}")
+                    errors.append(e)
+                    continue
+                for (sheet_name, start, block, _), rows in zip(batch, values):
+                    parts.setdefault((sheet_name, start), {})[block] = rows
+
+        failed = [
+            sheet_name for sheet_name, sheet_plan in plans.items()
+            if any(
+                len(parts.get((sheet_name, start), {})) != len(sheet_plan.ranges(start, end))
+                for start, end in sheet_plan.windows(window_rows)
+            )
+        ]
+        if failed:
+            raise Exception(f"{', '.join(failed)} indirilemedi: {errors[0] if errors else 'eksik aralık'}")
+        all_data = {}
+        for sheet_name, sheet_plan in plans.items():
+            windows = []
+            for start, end in sheet_plan.windows(window_rows):
+                blocks = parts[(sheet_name, start)]
+                windows.append((start - 1, sheet_plan.merge([blocks[b] for b in sorted(blocks)])))
+            all_data[sheet_name] = sheet_plan.finish_rows(assemble_windows(windows), 1)
         return all_data
+
+    def _iter_selected_windows(
+        self,
+        spreadsheet_id: str,
+        spreadsheet_info: Dict[str, Any],
+        selection: SelectionSpec,
+        window_rows: int,
+    ) -> Iterator[Tuple[str, List[str], int, List[List[str]]]]:
+        """`iter_sheet_windows` for a narrowing selection: one batchGet per window."""
+        cached = self._select_cached(spreadsheet_id, spreadsheet_info, selection)
+        if cached is not None:
+            for sheet_name, rows in cached.items():
+                if not rows:
+                    continue
+                if len(rows) == 1:
+                    yield sheet_name, [], 1, rows
+                    continue
+                header, data = rows[0], rows[1:]
+                for start in range(0, len(data), window_rows):
+                    if any(data[start:start + window_rows]):
+                        yield sheet_name, header, start + 2, data[start:start + window_rows]
+            return
+        for sheet_name, sheet_plan in self._plan_selection(spreadsheet_id, spreadsheet_info, selection).items():
+            header: List[str] = []
+            has_rows = False
+            for start, end in sheet_plan.windows(window_rows):
+                try:
+                    values = self._batch_get(spreadsheet_id, sheet_plan.ranges(start, end))
+                except Exception as e:
+                    raise Exception(f"{sheet_name} satır {start}-{end or ''} indirilemedi: {e}")
+                rows = sheet_plan.finish_rows(sheet_plan.merge(values), start)
+                first_row = start
+                if start == 1 and rows:
+                    header, rows, first_row = rows[0], rows[1:], 2
+                # Rows dropped by a predicate still count: the sheet had more than a header
+                has_rows = has_rows or bool(rows)
+                if any(rows):
+                    yield sheet_name, header, first_row, rows
+            if header and not has_rows:
+                yield sheet_name, [], 1, [header]
+
+    def _drive(self):
+        if self._drive_service is not None:
+            return self._drive_service
+        return get_service('drive', 'v3', self.credentials_info, SCOPES)
+
+    def get_revision(self, spreadsheet_id: str) -> Dict[str, Any]:
+        """Drive modifiedTime/version of the spreadsheet: one cheap metadata call.
+
+        In offline mode the revision recorded with the snapshot is returned.
+        """
+        if self.cache_mode == OFFLINE:
+            meta = self.snapshot_store.load_meta(spreadsheet_id)
+            return meta['revision'] if meta else {}
+        with metrics.span("drive_revision"):
+            result = self._drive().files().get(
+                fileId=spreadsheet_id,
+                fields="modifiedTime,version",
+                supportsAllDrives=True
+            ).execute()
+        revision = {'modifiedTime': result.get('modifiedTime'), 'version': result.get('version')}
+        self._revisions[spreadsheet_id] = revision
+        return revision
+
+    def download_if_changed(
+        self,
+        spreadsheet_id: str,
+        state_key: str = "",
+        force: bool = False,
+        **download_kwargs,
+    ) -> Optional[Dict[str, Any]]:
+        """Download only when the spreadsheet changed since the last recorded run.
+
+        Returns None when the Drive revision matches the recorded one (a single
+        metadata call, nothing downloaded). Otherwise downloads all sheets and
+        returns {'all_data', 'changed_sheets', 'unchanged_sheets',
+        'failed_sheets', 'revision', 'fingerprints'}; sheets whose grid size
+        and content hash match the recorded fingerprint are listed as unchanged
+        so later stages can skip them. Failed sheets are [] in all_data and
+        must be left alone: they keep their previous fingerprint. Call
+        `record_state` once the pipeline has succeeded.
+
+        A `selection` download is tracked under its own state key, so
+        changing the selection triggers a new download.
+        """
+        if self.change_tracker is None:
+            self.change_tracker = ChangeTracker()
+        selection = download_kwargs.get('selection')
+        if selection is not None and not selection.is_empty:
+            state_key = f"{state_key}#{selection.fingerprint()}"
+        previous = None if force else self.change_tracker.get(spreadsheet_id, state_key)
+        try:
+            revision = self.get_revision(spreadsheet_id)
+        except Exception as e:
+            print(f"⚠️ Drive revision alınamadı, tam indirme yapılıyor: {e}")
+            revision = {}
+        if previous and revision and previous['revision'] == revision:
+            print(f"⏭️ {spreadsheet_id} değişmedi ({revision.get('modifiedTime')}), atlanıyor")
+            return None
+
+        info = self.get_spreadsheet_info(spreadsheet_id, refresh=True)
+        all_data, failed = self._download_all(spreadsheet_id, **download_kwargs)
+        old_fingerprints = previous['fingerprints'] if previous else {}
+        fingerprints = {
+            name: sheet_fingerprint(rows, info['grid_sizes'].get(name))
+            for name, rows in all_data.items()
+            if name not in failed
+        }
+        unchanged = [name for name, fp in fingerprints.items() if old_fingerprints.get(name) == fp]
+        changed = [name for name in fingerprints if name not in unchanged]
+        # A failed sheet was not looked at: keep what the last run recorded for it
+        fingerprints.update({name: old_fingerprints[name] for name in failed if name in old_fingerprints})
+        return {
+            'all_data': all_data,
+            'changed_sheets': changed,
+            'unchanged_sheets': unchanged,
+            'failed_sheets': sorted(failed),
+            'revision': revision,
+            'fingerprints': fingerprints,
+            'state_key': state_key,
+        }
+
+    def record_state(self, spreadsheet_id: str, result: Dict[str, Any], state_key: str = ""):
+        """Persist the revision and fingerprints returned by `download_if_changed`.
+
+        With failed sheets the revision is not recorded, so the next run
+        downloads again instead of skipping the spreadsheet as unchanged.
+        """
+        if self.change_tracker is None:
+            self.change_tracker = ChangeTracker()
+        revision = {} if result.get('failed_sheets') else result['revision']
+        self.change_tracker.record(
+            spreadsheet_id, revision, result['fingerprints'], result.get('state_key', state_key)
+        )
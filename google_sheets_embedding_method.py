@@ -1,44 +1,33 @@
-from typing import Sequence, List, Dict, Any, Optional
+from typing import Iterable, Iterator, Sequence, List, Dict, Any, Optional, Tuple
 from llama_index.core.schema import Document, BaseNode
-from llama_index.core.ingestion import IngestionPipeline
-from llama_index.core.node_parser import SentenceSplitter
 from llama_index.readers.google import GoogleSheetsReader
-import json
-import os
-import tempfile
-from contextlib import contextmanager
+from row_chunker import RowChunker, CHUNK_TOKENS
+from sheet_table import SheetTable, render_row
+from shared.config import get_snapshot_settings
+from shared.dedup import RowDeduplicator
+from shared.snapshot_store import CACHE_OFF
+from shared.metrics import metrics
+from selection import SelectionSpec
 
 
 class InvalidDataSourceConfigException(Exception):
     pass
 
-@contextmanager
-def credentials_context(config: Dict[str, Any]):
-    """Context manager to prepare temporary credentials environment.
-    Steps:
-      1. Save current working directory
-      2. Create a temporary directory
-      3. Chdir into it
-      4. Write credentials JSON (service_account_dict) to token.json
-      5. Set GOOGLE_APPLICATION_CREDENTIALS
-      6. Yield (path to token)
-      7. Revert cwd and cleanup env var automatically
-    """
-    original_cwd = os.getcwd()
-    with tempfile.TemporaryDirectory() as tmpdir:
-        os.chdir(tmpdir)
-        token_path = os.path.join(tmpdir, "token.json")
-        service_account_dict = config.get("service_account_dict", {})
-        with open(token_path, "w", encoding="utf-8") as f:
-            json.dump(service_account_dict, f)
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = token_path
-        try:
-            yield token_path
-        finally:
-            # Clean environment
-            if os.environ.get("GOOGLE_APPLICATION_CREDENTIALS") == token_path:
-                del os.environ["GOOGLE_APPLICATION_CREDENTIALS"]
-            os.chdir(original_cwd)
+
+def sheet_matches_rules(
+    sheet_name: str,
+    inclusion_rules: Optional[List[str]] = None,
+    exclusion_rules: Optional[List[str]] = None,
+) -> bool:
+    """Case-insensitive substring rules: exclusions win, empty inclusions keep all."""
+    name = sheet_name.lower()
+    # Exclusion rules kontrolü
+    if exclusion_rules and any(rule.lower() in name for rule in exclusion_rules):
+        return False
+    # Inclusion rules kontrolü (boşsa hepsini al)
+    if not inclusion_rules:
+        return True
+    return any(rule.lower() in name for rule in inclusion_rules)
 
 
 class GoogleSheetsEmbeddingMethod:
@@ -49,6 +38,13 @@ class GoogleSheetsEmbeddingMethod:
       - spreadsheet_id: ID of the target Google Sheet
       - inclusion_rules: Optional[List[str]]
       - exclusion_rules: Optional[List[str]]
+      - selection: Optional[Dict] sheet/column/range/row selection, see
+        selection.SelectionSpec; it is pushed down to the range requests,
+        so selected downloads always go through the downloader
+      - chunk_tokens: Optional[int] token budget per chunk (default 512)
+      - cache_mode: Optional[str] off | cache_first | offline snapshot cache
+        (default: SHEETS_CACHE_MODE); when enabled, documents are built from
+        the downloader so snapshots can be read and saved
     """
 
     def __init__(self, data_source_id: str, config: Dict[str, Any]):
@@ -59,6 +55,9 @@ class GoogleSheetsEmbeddingMethod:
         self.spreadsheet_id: str = config["spreadsheet_id"]
         self.inclusion_rules: List[str] = config.get("inclusion_rules", [])
         self.exclusion_rules: List[str] = config.get("exclusion_rules", [])
+        # Legacy rules are folded into the selection as sheet-name globs
+        self.selection = SelectionSpec.from_config(config)
+        self.chunker = RowChunker(chunk_tokens=config.get("chunk_tokens", CHUNK_TOKENS))
 
     def validate_config(self, config: Dict[str, Any]):
         required_keys = ["service_account_dict", "spreadsheet_id"]
@@ -107,69 +106,38 @@ class GoogleSheetsEmbeddingMethod:
         if not inclusion_rules and not exclusion_rules:
             return documents
             
-        filtered_docs = []
-        for doc in documents:
-            sheet_name = doc.metadata.get("sheet_name", "").lower()
-            
-            # Exclusion rules kontrolü
-            excluded = False
-            if exclusion_rules:
-                for rule in exclusion_rules:
-                    if rule.lower() in sheet_name:
-                        excluded = True
-                        break
-            
-            if excluded:
-                continue
-                
-            # Inclusion rules kontrolü (boşsa hepsini al)
-            if not inclusion_rules:
-                filtered_docs.append(doc)
-            else:
-                for rule in inclusion_rules:
-                    if rule.lower() in sheet_name:
-                        filtered_docs.append(doc)
-                        break
-        
-        return filtered_docs
+        return [
+            doc for doc in documents
+            if sheet_matches_rules(doc.metadata.get("sheet_name", ""), inclusion_rules, exclusion_rules)
+        ]
 
+    @metrics.traced("get_documents")
     def get_documents(self) -> Sequence[Document]:
-        """Get documents from Google Sheets (assumes credentials_context active)."""
+        """Get documents from Google Sheets using the in-memory service account."""
         try:
             print(f"🔍 Debug: Loading sheet: {self.spreadsheet_id}")
             documents: Sequence[Document] = []
-            try:
-                reader = GoogleSheetsReader()
-                documents = reader.load_data(spreadsheet_id=self.spreadsheet_id)
-                print(f"🔍 Debug: Reader returned {len(documents)} doc(s)")
-            except Exception as re:
-                print(f"⚠️ Debug: Primary reader exception: {re}")
-
-            # Fallback
+            cache_mode = self.config.get("cache_mode") or get_snapshot_settings()["cache_mode"]
+            if cache_mode == CACHE_OFF and self.selection.is_empty:
+                try:
+                    reader = GoogleSheetsReader(service_account_key=self.config["service_account_dict"])
+                    documents = reader.load_data(spreadsheet_id=self.spreadsheet_id)
+                    print(f"🔍 Debug: Reader returned {len(documents)} doc(s)")
+                except Exception as re:
+                    print(f"⚠️ Debug: Primary reader exception: {re}")
+
+            # Fallback (and the snapshot cache path)
             if not documents:
-                print("⚠️ Debug: Fallback manual download")
+                print(f"⚠️ Debug: Fallback manual download (cache_mode={cache_mode})")
                 try:
                     from downloader import GoogleSheetsDownloader
-                    cred_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-                    manual_downloader = GoogleSheetsDownloader(cred_path)
-                    all_data = manual_downloader.download_all_sheets(self.spreadsheet_id)
-                    from llama_index.core.schema import Document as LlamaDocument
-                    built_docs: List[Document] = []
-                    for sheet_name, rows in all_data.items():
-                        if not rows:
-                            continue
-                        text_rows = rows[1:] if len(rows) > 1 else rows
-                        joined = "\n".join([", ".join(r) for r in text_rows])
-                        built_docs.append(LlamaDocument(
-                            text=joined,
-                            metadata={
-                                "sheet_name": sheet_name,
-                                "row_count": len(text_rows),
-                                "column_count": len(rows[0]) if rows and rows[0] else 0,
-                                "fallback": True,
-                            }
-                        ))
-                    documents = built_docs
+                    manual_downloader = GoogleSheetsDownloader(
+                        credentials_info=self.config["service_account_dict"], cache_mode=cache_mode
+                    )
+                    all_data = manual_downloader.download_all_sheets(
+                        self.spreadsheet_id, selection=None if self.selection.is_empty else self.selection
+                    )
+                    documents = self.documents_from_sheets(all_data)
                     print(f"🔍 Debug: Fallback built {len(documents)} doc(s)")
                 except Exception as fe:
                     print(f"❌ Fallback failed: {fe}")
@@ -186,14 +154,88 @@ class GoogleSheetsEmbeddingMethod:
             print(f"❌ Error loading from Google Sheets: {e}")
             return []
 
-    def get_nodes(self, documents: Sequence[Document]) -> List[BaseNode]:
-        """Convert documents to nodes"""
-        pipeline = IngestionPipeline(
-            transformations=[
-                SentenceSplitter(chunk_size=1024, chunk_overlap=50)
-            ]
-        )
-        return pipeline.run(documents=documents)
+    def documents_from_sheets(self, all_data: Dict[str, List[List[str]]]) -> List[Document]:
+        """Build one document per sheet from downloaded values (header row split off)."""
+        documents: List[Document] = []
+        for sheet_name, rows in all_data.items():
+            if not rows:
+                continue
+            table = SheetTable.from_rows(rows, header=len(rows) > 1)
+            documents.append(Document(
+                text="\n".join(table.row_texts()),
+                metadata={
+                    "sheet_name": sheet_name,
+                    "row_count": table.n_rows,
+                    "column_count": len(rows[0]) if rows and rows[0] else 0,
+                    "columns": render_row(rows[0]) if table.has_header else "",
+                    "first_row": table.first_row,
+                    "fallback": True,
+                }
+            ))
+        return documents
+
+    def get_nodes(
+        self,
+        documents: Sequence[Document],
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> List[BaseNode]:
+        """Convert documents to nodes, packing whole rows into token-budgeted chunks
+
+        With a `deduplicator`, repeated rows are dropped before chunking and
+        the kept chunks carry back-references to them.
+        """
+        with metrics.span("chunk", documents=len(documents)) as span:
+            nodes = self.chunker.chunk_documents(documents, deduplicator)
+            if deduplicator is not None:
+                deduplicator.annotate(nodes)
+            span["nodes"] = len(nodes)
+        metrics.incr("nodes_chunked", len(nodes))
+        return nodes
+
+    def sheet_source_id(self, sheet_name: str) -> str:
+        """Source document ID shared by all streamed nodes of one sheet."""
+        return f"{self.spreadsheet_id}/{sheet_name}"
+
+    def iter_nodes(
+        self,
+        windows: Iterable[Tuple[str, List[str], int, Any]],
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> Iterator[BaseNode]:
+        """Turn (sheet_name, header, first_row, rows) windows into nodes lazily.
+
+        `rows` may also be a SheetTable window, in which case header and
+        first_row are taken from the table. Nodes are yielded before later
+        windows are deduplicated, so back-references that arrive afterwards
+        are written by the vector store (see `upsert_nodes`).
+        """
+        for sheet_name, header, first_row, rows in windows:
+            metadata = {
+                "data_source": self.data_source_id,
+                "source_type": "google_sheets",
+                "spreadsheet_id": self.spreadsheet_id,
+                "sheet_name": sheet_name,
+            }
+            # The span closes before yielding so consumer time is not counted
+            with metrics.span("chunk", sheet=sheet_name) as span:
+                if isinstance(rows, SheetTable):
+                    nodes = self.chunker.chunk_table(
+                        rows,
+                        metadata=metadata,
+                        source_id=self.sheet_source_id(sheet_name),
+                        deduplicator=deduplicator,
+                    )
+                else:
+                    nodes = self.chunker.chunk_rows(
+                        header,
+                        rows,
+                        first_row=first_row,
+                        metadata=metadata,
+                        source_id=self.sheet_source_id(sheet_name),
+                        deduplicator=deduplicator,
+                    )
+                span["nodes"] = len(nodes)
+            metrics.incr("nodes_chunked", len(nodes))
+            yield from nodes
 
     def create_nodes(self, documents: Sequence[Document]) -> List[BaseNode]:
         """Create nodes from documents - alias for get_nodes"""
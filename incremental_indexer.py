@@ -0,0 +1,267 @@
+from typing import Callable, Iterator, List, Dict, Any, Optional, Sequence, Set, Tuple
+from row_chunker import chunk_id
+from google_sheets_embedding_method import GoogleSheetsEmbeddingMethod
+from vector_store_manager import GoogleSheetsVectorStore
+from shared.manifest import IndexManifest, hash_row, hash_sheet
+
+
+def split_rows(rows: List[List[str]]) -> Tuple[List[str], List[Tuple[int, List[str]]]]:
+    """Split raw sheet values into (header, [(row_number, cells), ...]).
+
+    Row numbers are 1-based sheet rows, matching what users see in the UI.
+    Mirrors the fallback reader: a single-row sheet is indexed as data.
+    """
+    if not rows:
+        return [], []
+    if len(rows) == 1:
+        return [], [(1, rows[0])]
+    return rows[0], [(i + 2, cells) for i, cells in enumerate(rows[1:]) if cells]
+
+
+def match_rows(old_rows: Dict[int, Tuple[str, str]], row_hashes: Dict[int, str]) -> Dict[int, int]:
+    """Pair old and new rows with the same content hash, in sheet order: {old_row: new_row}.
+
+    Repeated identical rows are paired first with first, so deleting one
+    copy unpairs only the last one.
+    """
+    old_by_hash: Dict[str, List[int]] = {}
+    for row in sorted(old_rows):
+        old_by_hash.setdefault(old_rows[row][0], []).append(row)
+    new_by_hash: Dict[str, List[int]] = {}
+    for row in sorted(row_hashes):
+        new_by_hash.setdefault(row_hashes[row], []).append(row)
+    matched = {}
+    for row_hash, old in old_by_hash.items():
+        matched.update(zip(old, new_by_hash.get(row_hash, [])))
+    return matched
+
+
+def chunk_span(
+    rows_in_chunk: List[int],
+    matched: Dict[int, int],
+    position: Dict[int, int],
+) -> Optional[Tuple[int, int]]:
+    """New (first_row, last_row) of an old chunk, or None if its text would change.
+
+    The chunk is intact when all its rows still exist and are still adjacent
+    (only blank rows in between) in the same order.
+    """
+    if any(row not in matched for row in rows_in_chunk):
+        return None
+    new_rows = [matched[row] for row in rows_in_chunk]
+    positions = [position[row] for row in new_rows]
+    if positions != list(range(positions[0], positions[0] + len(positions))):
+        return None
+    return new_rows[0], new_rows[-1]
+
+
+def dirty_runs(
+    data_rows: List[Tuple[int, List[str]]],
+    dirty: Set[int],
+) -> Iterator[Tuple[int, List[List[str]]]]:
+    """(first_row, rows) runs of dirty rows not separated by a clean row; blank rows in between stay []."""
+    first, run = None, []
+    for row, cells in data_rows:
+        if row not in dirty:
+            if run:
+                yield first, run
+            first, run = None, []
+            continue
+        if first is None:
+            first = row
+        run.extend([] for _ in range(row - first - len(run)))
+        run.append(cells)
+    if run:
+        yield first, run
+
+
+class IncrementalIndexer:
+    """Keeps a Chroma collection in sync with downloaded sheet values.
+
+    Rows are packed into chunks exactly like streaming and batch mode
+    (header prefix, token budget). Rows are matched to the manifest by
+    content hash, not by row number: only the chunks holding new, changed
+    or removed rows are deleted and rebuilt, chunks whose rows merely
+    shifted (a row inserted or deleted above them) are re-keyed without
+    re-embedding, and sheets whose hash did not change are skipped.
+    """
+
+    def __init__(
+        self,
+        embedding_method: GoogleSheetsEmbeddingMethod,
+        vector_store: GoogleSheetsVectorStore,
+        manifest: Optional[IndexManifest] = None,
+    ):
+        self.embedding_method = embedding_method
+        self.vector_store = vector_store
+        self.manifest = manifest or IndexManifest()
+        self.collection = vector_store.collection_name
+        self.spreadsheet_id = embedding_method.spreadsheet_id
+
+    def chunk_id(self, sheet_name: str, first_row: int, last_row: int) -> str:
+        """ID the chunker gives a chunk of this sheet covering first_row..last_row."""
+        return chunk_id(
+            {"spreadsheet_id": self.spreadsheet_id, "sheet_name": sheet_name},
+            first_row,
+            last_row,
+            self.embedding_method.sheet_source_id(sheet_name),
+        )
+
+    def _reconcile_collection(self):
+        """Drop stale state when the manifest and the collection disagree."""
+        count = self.vector_store.get_stats()["document_count"]
+        has_manifest = self.manifest.has_collection(self.collection)
+        if count and not has_manifest:
+            # Records written by the old full-rebuild path have random IDs
+            print("⚠️ Collection has untracked records, rebuilding it")
+            self.vector_store.clear_collection()
+        elif not count and has_manifest:
+            print("⚠️ Collection is empty, resetting manifest")
+            self.manifest.clear_collection(self.collection)
+
+    def sync(
+        self,
+        all_data: Dict[str, List[List[str]]],
+        unchanged_sheets: Optional[Sequence[str]] = None,
+        progress: Optional[Callable[[str, str], None]] = None,
+        failed_sheets: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """Bring the collection up to date with `all_data` and return a summary.
+
+        Sheets in `unchanged_sheets` (e.g. from the downloader's fingerprint
+        check) are skipped without hashing their rows. Sheets in
+        `failed_sheets` could not be downloaded; their records and manifest
+        entries are left untouched rather than synced to []. `progress(sheet_name,
+        "skipped" | "updated")` is called once each sheet is committed to the
+        manifest; an exception raised from it stops the sync between sheets.
+        """
+        known_unchanged = set(unchanged_sheets or [])
+        failed = set(failed_sheets or [])
+        self._reconcile_collection()
+        stats = {
+            "sheets_skipped": [],
+            "sheets_updated": [],
+            "sheets_removed": [],
+            "sheets_failed": sorted(failed),
+            "rows_added": 0,
+            "rows_changed": 0,
+            "rows_removed": 0,
+            "rows_unchanged": 0,
+            "rows_moved": 0,
+            "rows_embedded": 0,
+            "nodes_embedded": 0,
+        }
+
+        for sheet_name, rows in all_data.items():
+            if sheet_name in failed:
+                continue
+            if sheet_name in known_unchanged and self.manifest.get_sheet_hash(
+                self.collection, self.spreadsheet_id, sheet_name
+            ) is not None:
+                stats["sheets_skipped"].append(sheet_name)
+                stats["rows_unchanged"] += max(0, len(rows) - 1)
+                if progress:
+                    progress(sheet_name, "skipped")
+                continue
+            header, data_rows = split_rows(rows)
+            row_hashes = {row: hash_row(cells) for row, cells in data_rows}
+            sheet_hash = hash_sheet(header, row_hashes)
+            if self.manifest.get_sheet_hash(self.collection, self.spreadsheet_id, sheet_name) == sheet_hash:
+                stats["sheets_skipped"].append(sheet_name)
+                stats["rows_unchanged"] += len(row_hashes)
+                if progress:
+                    progress(sheet_name, "skipped")
+                continue
+
+            old_rows = self.manifest.get_rows(self.collection, self.spreadsheet_id, sheet_name)
+            # Rows are identified by content, so a row that only shifted is not "changed"
+            matched = match_rows(old_rows, row_hashes)
+            kept_new = set(matched.values())
+            new_only = [row for row in row_hashes if row not in kept_new]
+            old_only = [row for row in old_rows if row not in matched]
+            # For reporting: a position whose old row was dropped and got a new row was edited
+            changed = set(new_only) & set(old_only)
+            added = [row for row in new_only if row not in changed]
+            removed = [row for row in old_only if row not in changed]
+            moved = [old for old, new in matched.items() if old != new]
+
+            header_hash = hash_row(header)
+            chunk_rows: Dict[str, List[int]] = {}
+            for row, (_, chunk) in old_rows.items():
+                chunk_rows.setdefault(chunk, []).append(row)
+            moves: Dict[str, Tuple[str, int, int]] = {}
+            # New column names (or rows indexed before chunks were tracked): rebuild the sheet
+            rebuild = "" in chunk_rows or self.manifest.get_header_hash(
+                self.collection, self.spreadsheet_id, sheet_name
+            ) != header_hash
+            if rebuild:
+                stale = set(chunk_rows)
+            else:
+                position = {row: i for i, (row, _) in enumerate(data_rows)}
+                stale = set()
+                for chunk, rows_in_chunk in chunk_rows.items():
+                    span = chunk_span(sorted(rows_in_chunk), matched, position)
+                    if span is None:
+                        stale.add(chunk)
+                    elif span != (min(rows_in_chunk), max(rows_in_chunk)):
+                        moves[chunk] = (self.chunk_id(sheet_name, *span),) + span
+
+            # Chunks are rebuilt whole, so unchanged rows sharing a chunk with a change are re-embedded too
+            dirty = set(new_only)
+            dirty.update(matched[row] for chunk in stale for row in chunk_rows[chunk] if row in matched)
+            new_rows = {
+                new: (row_hashes[new], moves.get(old_rows[old][1], (old_rows[old][1],))[0])
+                for old, new in matched.items()
+                if new not in dirty
+            }
+            nodes = list(self.embedding_method.iter_nodes(
+                (sheet_name, header, first, run) for first, run in dirty_runs(data_rows, dirty)
+            ))
+            for node in nodes:
+                for row in range(node.metadata["first_row"], node.metadata["last_row"] + 1):
+                    if row in dirty:
+                        new_rows[row] = (row_hashes[row], node.node_id)
+            # Embed before touching the store, so a model failure leaves the sheet as it was
+            self.vector_store.embed_nodes(nodes)
+            try:
+                if rebuild:
+                    self.vector_store.delete_sheet(self.spreadsheet_id, sheet_name)
+                else:
+                    self.vector_store.delete_nodes(sorted(stale))
+                    self.vector_store.move_nodes(moves)
+                self.vector_store.insert_nodes(nodes)
+                self.manifest.replace_sheet(
+                    self.collection, self.spreadsheet_id, sheet_name, sheet_hash, new_rows, header_hash
+                )
+            except Exception:
+                # The manifest may name chunks that were deleted or moved: forget the sheet so the
+                # next sync rebuilds it (a missing header hash takes the rebuild path)
+                self.manifest.remove_sheet(self.collection, self.spreadsheet_id, sheet_name)
+                print(f"❌ {sheet_name}: write failed, sheet will be rebuilt on the next sync")
+                raise
+
+            stats["sheets_updated"].append(sheet_name)
+            stats["rows_added"] += len(added)
+            stats["rows_changed"] += len(changed)
+            stats["rows_removed"] += len(removed)
+            stats["rows_moved"] += len(moved)
+            stats["rows_unchanged"] += len(matched)
+            stats["rows_embedded"] += len(dirty)
+            stats["nodes_embedded"] += len(nodes)
+            print(
+                f"✅ {sheet_name}: +{len(added)} ~{len(changed)} -{len(removed)} row(s), {len(moved)} moved, "
+                f"{len(nodes)} node(s) embedded"
+            )
+            if progress:
+                progress(sheet_name, "updated")
+
+        for sheet_name in self.manifest.list_sheets(self.collection, self.spreadsheet_id):
+            if sheet_name in all_data or sheet_name in failed:
+                continue
+            old_hashes = self.manifest.get_row_hashes(self.collection, self.spreadsheet_id, sheet_name)
+            self.vector_store.delete_sheet(self.spreadsheet_id, sheet_name)
+            self.manifest.remove_sheet(self.collection, self.spreadsheet_id, sheet_name)
+            stats["sheets_removed"].append(sheet_name)
+            stats["rows_removed"] += len(old_hashes)
+
+        return stats
@@ -0,0 +1,277 @@
+"""Background ingestion jobs, so UI requests only submit work and poll it.
+
+Jobs are recorded in a SQLite JobStore and run on a thread pool inside the
+server process. Identical in-flight requests share one job, running jobs can
+be cancelled between sheets, and a job interrupted by a crash or restart
+resumes from its last completed sheet when it is submitted again.
+
+    queue = JobQueue(workers=2)
+    job_id = queue.submit_ingest(credentials_info, spreadsheet_id)["job_id"]
+    queue.status(job_id)["progress"]
+"""
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+from shared.credentials import account_key
+from shared.job_store import JobStore, SUCCEEDED, FAILED, CANCELLED, ACTIVE_STATES
+from shared.metrics import metrics
+
+JOB_WORKERS = 2
+INGEST = "ingest"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Progress reporting and cancellation checks for one running job.
+
+    progress = {
+        "stage": current stage,
+        "stages": {stage: {"status", "started_at", "seconds"}},
+        "sheets": {sheet_name: "pending" | "skipped" | "updated"},
+        ...extra fields set by the job (revision, windows, rows)
+    }
+    """
+
+    def __init__(self, store: JobStore, job_id: str, progress: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.job_id = job_id
+        self.progress: Dict[str, Any] = progress or {}
+        self.progress.setdefault("stages", {})
+        self.progress.setdefault("sheets", {})
+
+    def flush(self):
+        self.store.update_progress(self.job_id, self.progress)
+
+    def check_cancelled(self):
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+
+    def set(self, **fields):
+        self.progress.update(fields)
+        self.flush()
+        self.check_cancelled()
+
+    @contextmanager
+    def stage(self, name: str):
+        self.check_cancelled()
+        entry = {"status": "running", "started_at": time.time()}
+        self.progress["stages"][name] = entry
+        self.progress["stage"] = name
+        self.flush()
+        start = time.perf_counter()
+        try:
+            with metrics.span(f"job_{name}", job_id=self.job_id):
+                yield
+        except JobCancelled:
+            entry["status"] = "cancelled"
+            raise
+        except Exception:
+            entry["status"] = "failed"
+            raise
+        else:
+            entry["status"] = "done"
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+            self.flush()
+
+    def sheet_done(self, sheet_name: str, status: str):
+        self.progress["sheets"][sheet_name] = status
+        self.flush()
+        self.check_cancelled()
+
+    def completed_sheets(self) -> List[str]:
+        return [name for name, status in self.progress["sheets"].items() if status != "pending"]
+
+
+def run_ingest(context: JobContext, credentials_info: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """The Start Process pipeline: download if changed, then incremental (or streaming) indexing."""
+    # Imported here so that creating a JobQueue (at app start) stays cheap
+    from batch_ingest import collection_name_for
+    from downloader import GoogleSheetsDownloader
+    from google_sheets_embedding_method import GoogleSheetsEmbeddingMethod
+    from incremental_indexer import IncrementalIndexer
+    from sheet_table import SheetTable
+    from streaming_pipeline import stream_ingest
+    from vector_store_manager import GoogleSheetsVectorStore
+
+    spreadsheet_id = params["spreadsheet_id"]
+    collection_name = collection_name_for(spreadsheet_id)
+    downloader = GoogleSheetsDownloader(credentials_info=credentials_info)
+    vector_store = GoogleSheetsVectorStore(collection_name=collection_name)
+    embedding_method = GoogleSheetsEmbeddingMethod(
+        data_source_id="google_sheets",
+        config={
+            "service_account_dict": credentials_info,
+            "spreadsheet_id": spreadsheet_id,
+            "inclusion_rules": params.get("inclusion_rules", []),
+            "exclusion_rules": params.get("exclusion_rules", []),
+            "selection": params.get("selection"),
+        },
+    )
+    selection = None if embedding_method.selection.is_empty else embedding_method.selection
+
+    if params.get("streaming"):
+        # Full rebuild; an interrupted stream starts over
+        with context.stage("stream"):
+            stream_stats = stream_ingest(
+                downloader, embedding_method, vector_store,
+                progress=lambda stats: context.set(windows=stats["windows"], rows=stats["rows"]),
+                dedup=params.get("dedup"),
+            )
+        return {"mode": "streaming", "stream": stream_stats, "vector_store": vector_store.get_stats()}
+
+    with context.stage("download"):
+        # An empty collection must be rebuilt even if the spreadsheet did not change
+        force = params.get("force", False) or vector_store.get_stats()["document_count"] == 0
+        change_set = downloader.download_if_changed(
+            spreadsheet_id, state_key=collection_name, force=force, selection=selection
+        )
+    if change_set is None:
+        return {"mode": "incremental", "unchanged": True, "vector_store": vector_store.get_stats()}
+
+    all_data = change_set["all_data"]
+    info = downloader.get_spreadsheet_info(spreadsheet_id)
+    tables = {name: SheetTable.from_rows(rows, header=len(rows) > 1) for name, rows in all_data.items()}
+
+    # Resume: sheets finished before an interruption are skipped if the revision is the same
+    revision = change_set["revision"]
+    resumed = context.completed_sheets() if revision and context.progress.get("revision") == revision else []
+    context.progress["sheets"] = {name: ("skipped" if name in resumed else "pending") for name in all_data}
+    context.set(revision=revision, sheets_total=len(all_data), resumed_sheets=len(resumed))
+
+    with context.stage("index"):
+        indexer = IncrementalIndexer(embedding_method, vector_store)
+        sync_stats = indexer.sync(
+            all_data,
+            unchanged_sheets=set(change_set["unchanged_sheets"]) | set(resumed),
+            progress=context.sheet_done,
+            failed_sheets=change_set["failed_sheets"],
+        )
+    downloader.record_state(spreadsheet_id, change_set, state_key=collection_name)
+    return {
+        "mode": "incremental",
+        "unchanged": False,
+        "title": info["title"],
+        "changed_sheets": change_set["changed_sheets"],
+        "failed_sheets": change_set["failed_sheets"],
+        "resumed_sheets": resumed,
+        "tables": {
+            name: {"rows": table.n_rows, "nbytes": table.nbytes, "column_stats": table.summary()["column_stats"]}
+            for name, table in tables.items()
+        },
+        "sync": sync_stats,
+        "vector_store": vector_store.get_stats(),
+    }
+
+
+JOB_RUNNERS = {INGEST: run_ingest}
+
+
+class JobQueue:
+    """Thread pool of ingestion workers backed by a JobStore.
+
+    Service account keys are held in memory only for as long as their job
+    runs. Jobs writing to the same collection are serialized. Use one
+    queue per jobs database: creating it marks leftover queued/running
+    jobs as interrupted.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS):
+        self.store = store or JobStore()
+        interrupted = self.store.mark_interrupted()
+        if interrupted:
+            print(f"⚠️ {interrupted} job(s) interrupted by the last shutdown; resubmit to resume")
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-job")
+        self._lock = threading.Lock()
+        self._secrets: Dict[str, Dict[str, Any]] = {}
+        self._collection_locks: Dict[str, threading.Lock] = {}
+
+    def submit_ingest(
+        self,
+        credentials_info: Dict[str, Any],
+        spreadsheet_id: str,
+        streaming: bool = False,
+        force: bool = False,
+        inclusion_rules: Optional[List[str]] = None,
+        exclusion_rules: Optional[List[str]] = None,
+        selection: Optional[Dict[str, Any]] = None,
+        dedup: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Queue an ingestion; returns {'job_id', 'created', 'resumed'}.
+
+        `selection` is a SelectionSpec dict (sheets, exclude_sheets, columns,
+        ranges, rows). `dedup` (off | exact | near) applies to streaming
+        rebuilds only.
+        """
+        params = {
+            "spreadsheet_id": spreadsheet_id,
+            "client_email": credentials_info.get("client_email", ""),
+            # Jobs are only shared between callers holding the same key
+            "account": account_key(credentials_info),
+            "streaming": streaming,
+            "force": force,
+            "inclusion_rules": inclusion_rules or [],
+            "exclusion_rules": exclusion_rules or [],
+            "selection": selection or {},
+            "dedup": dedup,
+        }
+        return self.submit(INGEST, params, credentials_info)
+
+    def submit(self, kind: str, params: Dict[str, Any], credentials_info: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            submitted = self.store.submit(kind, params)
+            if submitted["created"] or submitted["resumed"]:
+                self._secrets[submitted["job_id"]] = credentials_info
+                self._executor.submit(self._run, submitted["job_id"])
+        return submitted
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def list_jobs(self, active_only: bool = False, limit: int = 50) -> List[Dict[str, Any]]:
+        return self.store.list(list(ACTIVE_STATES) if active_only else None, limit)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        return self.store.request_cancel(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _collection_lock(self, params: Dict[str, Any]) -> threading.Lock:
+        from batch_ingest import collection_name_for
+        with self._lock:
+            return self._collection_locks.setdefault(
+                collection_name_for(params["spreadsheet_id"]), threading.Lock()
+            )
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or not self.store.claim(job_id):
+            # Cancelled while it was queued
+            self._secrets.pop(job_id, None)
+            return
+        context = JobContext(self.store, job_id, job["progress"])
+        try:
+            with self._collection_lock(job["params"]):
+                context.check_cancelled()
+                result = JOB_RUNNERS[job["kind"]](context, self._secrets[job_id], job["params"])
+            context.progress["stage"] = None
+            context.flush()
+            self.store.finish(job_id, SUCCEEDED, result=result)
+            print(f"✅ Job {job_id} finished")
+        except JobCancelled:
+            self.store.finish(job_id, CANCELLED, error="Cancelled by user")
+            print(f"🛑 Job {job_id} cancelled")
+        except Exception as e:
+            traceback.print_exc()
+            self.store.finish(job_id, FAILED, error=str(e))
+            print(f"❌ Job {job_id} failed: {e}")
+        finally:
+            self._secrets.pop(job_id, None)
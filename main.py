@@ -1,18 +1,199 @@
 import streamlit as st
 import json
-from downloader import GoogleSheetsDownloader
-from google_sheets_embedding_method import GoogleSheetsEmbeddingMethod, credentials_context
-from vector_store_manager import GoogleSheetsVectorStore
-from shared.config import setup_environment
-import os
+from selection import SelectionSpec, OPS
+from shared.config import setup_environment, get_embedding_settings, get_dedup_settings, RETRIEVAL_MODES, DEDUP_MODES
+from shared.embedding_registry import embedding_registry
+from shared.job_store import ACTIVE_STATES, SUCCEEDED, CANCELLED, INTERRUPTED
+from shared.metrics import metrics
 import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from job_queue import JobQueue
+    from retrieval_service import SheetsRetriever
+
+JOB_POLL_S = 1.0
+
+# Heavy dependencies (llama_index, chromadb, the Google API client, torch)
+# are imported on first use inside the cached factories below, so a cold
+# start renders the form without paying for them; see benchmarks/import_budget.py
+
+
+@st.cache_resource(show_spinner=False)
+def init_environment():
+    """Load .env once per server process instead of on every script run."""
+    setup_environment()
+    return True
+
+
+@st.cache_resource
+def warm_up_embedding_model():
+    """Start loading the shared embedding model once per server process."""
+    return embedding_registry.warm_up(background=True)
+
+@st.cache_resource
+def get_job_queue() -> "JobQueue":
+    """One ingestion worker pool per server process, shared by all sessions."""
+    from job_queue import JobQueue
+    return JobQueue()
+
+
+def render_job_result(job: dict):
+    """Summary of a finished ingestion job."""
+    result = job["result"] or {}
+    stats = result.get("vector_store", {})
+    if result.get("mode") == "streaming":
+        stream_stats = result["stream"]
+        st.success("✅ Streaming ingest completed")
+        st.json({
+            "🪟 Windows": stream_stats["windows"],
+            "📄 Rows": stream_stats["rows"],
+            "🧩 Nodes": stream_stats["nodes"],
+            "⏱️ Seconds": stream_stats["elapsed_s"],
+            "🗄️ Collection": stats["collection_name"],
+            "📈 Total Records": stats["document_count"]
+        })
+        if stream_stats.get("dedup"):
+            st.caption("🧬 Row dedup")
+            st.json(stream_stats["dedup"])
+    elif result.get("unchanged"):
+        st.success("⏭️ Spreadsheet unchanged since the last run; download and embedding skipped.")
+        st.json({
+            "🗄️ Collection": stats["collection_name"],
+            "📈 Total Records": stats["document_count"]
+        })
+        return
+    else:
+        tables = result["tables"]
+        sync_stats = result["sync"]
+        st.success(f"📄 Title: {result['title']}")
+        st.info(f"📑 Sheets: {list(tables.keys())}")
+        st.caption(
+            f"Summary: {len(tables)} sheet(s), {sum(t['rows'] for t in tables.values())} total data row(s) "
+            f"(headers excluded), {len(result['changed_sheets'])} changed since the last run."
+        )
+        if result.get("failed_sheets"):
+            st.warning(
+                f"⚠️ Could not download {', '.join(result['failed_sheets'])}; their indexed rows were kept "
+                "and they will be retried on the next run."
+            )
+        with st.expander("📐 Column Summary"):
+            for name, table in tables.items():
+                st.markdown(f"**{name}** ({table['nbytes'] / 1024:.1f} KiB columnar)")
+                st.json(table["column_stats"])
+        st.success("✅ Embedding and storage completed")
+        st.json({
+            "➕ Rows Added": sync_stats["rows_added"],
+            "✏️ Rows Changed": sync_stats["rows_changed"],
+            "➖ Rows Removed": sync_stats["rows_removed"],
+            "⏭️ Sheets Skipped (unchanged)": len(sync_stats["sheets_skipped"]),
+            "🔁 Sheets Resumed": len(result["resumed_sheets"]),
+            "🧩 Nodes Embedded": sync_stats["nodes_embedded"],
+            "🗄️ Collection": stats["collection_name"],
+            "📈 Total Records": stats["document_count"]
+        })
+    with st.expander("📈 Detailed Vector Store Statistics"):
+        st.json(stats)
+        if result.get("sync"):
+            st.json(result["sync"])
+
+
+def render_job(job_id: str) -> bool:
+    """Progress of the session's current job; returns True while it is still active."""
+    queue = get_job_queue()
+    job = queue.status(job_id)
+    if job is None:
+        return False
+    progress = job["progress"]
+    st.subheader(f"🧾 Job {job_id}")
+    active = job["state"] in ACTIVE_STATES
+    if active:
+        sheets = progress.get("sheets", {})
+        done = sum(1 for status in sheets.values() if status != "pending")
+        stage = progress.get("stage") or "queued"
+        if sheets:
+            st.progress(done / len(sheets), text=f"{stage}: {done}/{len(sheets)} sheet(s)")
+        elif "rows" in progress:
+            st.progress(0.0, text=f"{stage}: {progress['rows']} row(s) in {progress.get('windows', 0)} window(s)")
+        else:
+            st.progress(0.0, text=f"{stage}...")
+        if st.button("Cancel job", disabled=job["cancel_requested"]):
+            queue.cancel(job_id)
+            st.rerun()
+    elif job["state"] == SUCCEEDED:
+        render_job_result(job)
+    elif job["state"] == CANCELLED:
+        st.warning("🛑 Job cancelled. Sheets that finished before the cancel stay indexed.")
+    elif job["state"] == INTERRUPTED:
+        st.warning("⚠️ Job was interrupted by a server restart. Start it again to resume from the last finished sheet.")
+    else:
+        st.error(f"❌ Job failed: {job['error']}")
+    with st.expander("🧭 Job Progress"):
+        st.json({"state": job["state"], "attempts": job["attempts"], **progress})
+    if not active:
+        render_metrics()
+    return active
+
+
+def render_metrics():
+    """Per-stage spans and counters of this server process, with JSON / Prometheus export.
+
+    Jobs of all sessions share the registry, so it is reset by hand.
+    """
+    with st.expander("⏱️ Pipeline Metrics"):
+        snapshot = metrics.snapshot()
+        st.json({
+            "spans": snapshot["spans"],
+            "counters": snapshot["counters"],
+            "embed_texts_per_s": snapshot["embed_texts_per_s"],
+        })
+        col1, col2, col3 = st.columns(3)
+        col1.download_button("Download JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+        col2.download_button("Download Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        if col3.button("Reset metrics"):
+            metrics.reset()
+
+
+@st.cache_resource
+def get_retriever(collection_name: str) -> "SheetsRetriever":
+    """One retriever (and its query/result caches) per collection per server process."""
+    from retrieval_service import SheetsRetriever
+    return SheetsRetriever(collection_name)
+
+
+def render_search(spreadsheet_id: str):
+    """Similarity search over the spreadsheet's persisted collection."""
+    st.subheader("🔎 Search")
+    query = st.text_input("Search the indexed spreadsheet:", key="search_query")
+    col1, col2, col3 = st.columns(3)
+    sheet_filter = col1.text_input("Sheet name (optional):", key="search_sheet")
+    top_k = col2.number_input("Results:", min_value=1, max_value=50, value=5, key="search_top_k")
+    mode = col3.selectbox(
+        "Mode:", RETRIEVAL_MODES, key="search_mode",
+        help="hybrid fuses BM25 and vector rankings; lexical is fastest for exact IDs and codes."
+    )
+    if not query:
+        return
+    try:
+        retriever = get_retriever(f"sheets_{spreadsheet_id[:8]}")
+    except Exception:
+        st.info("No collection found for this spreadsheet yet. Run the process first.")
+        return
+    hits, elapsed = retriever.timed_search(query, top_k=int(top_k), sheet_name=sheet_filter or None, mode=mode)
+    st.caption(f"{len(hits)} result(s) in {elapsed * 1000:.1f} ms")
+    for hit in hits:
+        metadata = hit["metadata"] or {}
+        st.markdown(
+            f"**{metadata.get('sheet_name', '?')}** rows {metadata.get('first_row', '?')}–"
+            f"{metadata.get('last_row', '?')} · score {hit['score']:.3f}"
+        )
+        st.text(hit["text"])
 
-# Environment setup
-setup_environment()
 
 def main():
     st.set_page_config(page_title="Google Sheets Reader", layout="wide")
     st.title("📊 Google Sheets Reader")
+    init_environment()
 
     # Google credentials JSON input
     st.subheader("🔑 Google Service Account Credentials")
@@ -32,82 +213,80 @@ def main():
     )
 
     st.subheader("🚀 One-Click Run")
-    st.caption("This button will: download & display data, build embeddings, save to the vector store, then show statistics.")
+    st.caption("This button queues a background job that will: download & display data, build embeddings, save to the vector store, then show statistics.")
+
+    streaming = st.checkbox(
+        "Streaming mode (very large sheets)",
+        help="Rebuilds the collection window by window. Memory stays bounded by the batch size, "
+             "but the data preview and incremental re-index are skipped."
+    )
+
+    default_dedup = get_dedup_settings()["mode"]
+    dedup = st.selectbox(
+        "Row dedup (streaming)", DEDUP_MODES,
+        index=DEDUP_MODES.index(default_dedup) if default_dedup in DEDUP_MODES else 0,
+        disabled=not streaming,
+        help="Drop repeated rows before embedding: exact copies, or near-copies too (MinHash). "
+             "Kept chunks list the dropped rows under duplicate_rows."
+    )
+
+    force_refresh = st.checkbox(
+        "Force full refresh",
+        help="Download everything even if the spreadsheet's Drive revision has not changed."
+    )
+
+    with st.expander("🎯 Selection"):
+        st.caption("Only the selected sheets, columns and rows are downloaded and indexed.")
+        sheet_patterns = st.text_input(
+            "Sheets", placeholder="Sales*, re:^Q[1-4]",
+            help="Comma-separated globs or re:<regex>; empty selects every sheet."
+        )
+        exclude_patterns = st.text_input("Exclude sheets", placeholder="*archive*")
+        columns = st.text_input(
+            "Columns", placeholder="Date, Amount, C:E",
+            help="Header names or column letters; empty keeps every column."
+        )
+        a1_range = st.text_input("Range", placeholder="A1:F5000", help="A1 range applied to every selected sheet.")
+        row_filters = st.text_area(
+            "Row filters (one per line)", placeholder="Status == Open\nAmount > 100",
+            help="Operators: " + ", ".join(OPS)
+        )
 
     if credentials_text and spreadsheet_id and st.button("Start Process"):
-        
+        # Parse JSON
         try:
-            # Parse JSON
-            try:
-                credentials_data = json.loads(credentials_text)
-            except json.JSONDecodeError as e:
-                st.error(f"Invalid JSON format: {e}")
-                return
-            
-            # 1. DOWNLOAD & DISPLAY DATA
-            with st.spinner("📥 Downloading Google Sheets data..."):
-                import tempfile
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_file:
-                    json.dump(credentials_data, tmp_file)
-                    tmp_file_path = tmp_file.name
-                try:
-                    downloader = GoogleSheetsDownloader(tmp_file_path)
-                    spreadsheet_info = downloader.get_spreadsheet_info(spreadsheet_id)
-                    all_data = downloader.download_all_sheets(spreadsheet_id)
-                finally:
-                    os.unlink(tmp_file_path)
-
-            st.success(f"📄 Title: {spreadsheet_info['title']}")
-            sheet_names = list(all_data.keys())
-            sheet_count = len(sheet_names)
-            total_rows = sum(max(0, len(data) - 1) for data in all_data.values())  # exclude header row
-            st.info(f"� Sheets: {sheet_names}")
-            st.caption(f"Summary: {sheet_count} sheet(s), {total_rows} total data row(s) (headers excluded).")
-
-            # 2. EMBEDDING & VECTOR STORE
-            with st.spinner("🤖 Generating embeddings and saving to vector store..."):
-                try:
-                    # Build config dict
-                    config = {
-                        "service_account_dict": credentials_data,
-                        "spreadsheet_id": spreadsheet_id,
-                        "inclusion_rules": [],
-                        "exclusion_rules": [],
-                    }
-                    embedding_method = GoogleSheetsEmbeddingMethod(
-                        data_source_id="google_sheets",
-                        config=config
-                    )
-                    with credentials_context(config):
-                        documents = embedding_method.get_documents()
-                    if not documents:
-                        st.error("❌ No documents found, embedding skipped.")
-                        return
-                    nodes = embedding_method.create_nodes(documents)
-                    vector_store = GoogleSheetsVectorStore(
-                        collection_name=f"sheets_{spreadsheet_id[:8]}"
-                    )
-                    vector_store.create_index(nodes)
-                    stats = vector_store.get_stats()
-                except Exception as e:
-                    st.error(f"❌ Embedding/Vector store error: {e}")
-                    return
-
-            st.success("✅ Embedding and storage completed")
-            st.json({
-                "📊 Document Count": len(documents),
-                "🧩 Node Count": len(nodes),
-                "🗄️ Collection": stats["collection_name"],
-                "📈 Total Records": stats["document_count"]
-            })
-
-            # 3. STATS (optional detail)
-            with st.expander("📈 Detailed Vector Store Statistics"):
-                st.json(stats)
-                st.caption("All steps completed successfully.")
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-    else:
+            credentials_data = json.loads(credentials_text)
+        except json.JSONDecodeError as e:
+            st.error(f"Invalid JSON format: {e}")
+            return
+
+        def split(text):
+            return [part.strip() for part in text.split(",") if part.strip()]
+
+        selection = {
+            "sheets": split(sheet_patterns),
+            "exclude_sheets": split(exclude_patterns),
+            "columns": split(columns),
+            "ranges": a1_range.strip(),
+            "rows": [line.strip() for line in row_filters.splitlines() if line.strip()],
+        }
+        try:
+            SelectionSpec(**selection)
+        except ValueError as e:
+            st.error(f"Invalid selection: {e}")
+            return
+
+        # The pipeline runs on the background worker pool; this run only submits it
+        submitted = get_job_queue().submit_ingest(
+            credentials_data, spreadsheet_id, streaming=streaming, force=force_refresh, selection=selection,
+            dedup=dedup if streaming else None,
+        )
+        st.session_state["job_id"] = submitted["job_id"]
+        if submitted["resumed"]:
+            st.info("🔁 Resuming the interrupted job from its last finished sheet.")
+        elif not submitted["created"]:
+            st.info("⏳ The same ingestion is already running; following that job.")
+    elif "job_id" not in st.session_state:
         # Usage guidance
         if not credentials_text:
             st.info("🔑 Please enter the Google Service Account credentials JSON.")
@@ -148,5 +327,19 @@ def main():
 }
             ''', language='json')
 
+    job_active = "job_id" in st.session_state and render_job(st.session_state["job_id"])
+
+    if spreadsheet_id:
+        render_search(spreadsheet_id)
+
+    # Started after the form is on screen, so model loading never delays the first render
+    if get_embedding_settings()["warmup"]:
+        warm_up_embedding_model()
+
+    # Poll the running job without holding the server thread
+    if job_active:
+        time.sleep(JOB_POLL_S)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,260 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import chromadb
+
+from shared.config import get_retrieval_settings, RETRIEVAL_MODES
+from shared.embedding_registry import embedding_registry
+from shared.lexical_index import LexicalIndex, lexical_index_path
+from shared.metrics import metrics
+from vector_store_manager import CHROMA_PATH, GENERATION_KEY
+
+QUERY_CACHE_SIZE = 1024
+RESULT_CACHE_SIZE = 256
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+def build_where(
+    sheet_name: Optional[str] = None,
+    row_range: Optional[Tuple[int, int]] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Combine sheet/row-range filters into a Chroma `where` clause.
+
+    `row_range=(lo, hi)` keeps chunks whose [first_row, last_row] overlaps it.
+    """
+    clauses = []
+    if sheet_name:
+        clauses.append({"sheet_name": sheet_name})
+    if row_range:
+        lo, hi = row_range
+        clauses.append({"first_row": {"$lte": hi}})
+        clauses.append({"last_row": {"$gte": lo}})
+    if where:
+        clauses.append(where)
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, List[str]],
+    weights: Dict[str, float],
+    k: float = 60.0,
+) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: score(id) = sum of weight / (k + rank), best first.
+
+    Ranks ignore the raw scores, so cosine similarities and unbounded BM25
+    scores can be combined without calibrating one against the other.
+    """
+    fused: Dict[str, float] = {}
+    for name, ids in rankings.items():
+        for rank, node_id in enumerate(ids, start=1):
+            fused[node_id] = fused.get(node_id, 0.0) + weights.get(name, 1.0) / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class SheetsRetriever:
+    """Read-only hybrid search over an existing `sheets_<id>` collection.
+
+    Reopens the persisted collection without re-embedding anything. In
+    hybrid mode (default: RETRIEVAL_MODE) the vector ranking from Chroma
+    and the BM25 ranking from the collection's LexicalIndex are fused with
+    reciprocal rank fusion; lexical mode answers exact-key lookups (IDs,
+    SKUs, codes) without embedding the query at all. Query embeddings are
+    kept in an LRU cache, and recent result sets are cached until the
+    collection's write generation (bumped by GoogleSheetsVectorStore on
+    every write) changes.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        chroma_path: str = CHROMA_PATH,
+        query_cache_size: int = QUERY_CACHE_SIZE,
+        result_cache_size: int = RESULT_CACHE_SIZE,
+        mode: Optional[str] = None,
+    ):
+        settings = get_retrieval_settings()
+        self.mode = mode or settings["mode"]
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {self.mode!r} (expected: {', '.join(RETRIEVAL_MODES)})")
+        self.rrf_k = settings["rrf_k"]
+        self.weights = {"vector": settings["vector_weight"], "lexical": settings["lexical_weight"]}
+        self.candidates = max(1, settings["candidates"])
+        self.collection_name = collection_name
+        self.client = chromadb.PersistentClient(path=chroma_path)
+        # Fail early if the collection was never built
+        self.client.get_collection(collection_name)
+        self.lexical_index = LexicalIndex(lexical_index_path(chroma_path, collection_name))
+        self.query_cache = LRUCache(query_cache_size)
+        self.result_cache = LRUCache(result_cache_size)
+        self._version = None
+
+    def _collection(self):
+        """Current collection handle; drops cached results if it was written to."""
+        collection = self.client.get_collection(self.collection_name)
+        version = (str(collection.id), (collection.metadata or {}).get(GENERATION_KEY, 0))
+        if version != self._version:
+            self.result_cache.clear()
+            self._version = version
+            if self.lexical_index.count() == 0 and collection.count():
+                # Built before the lexical index existed: backfill it once from Chroma
+                self.lexical_index.rebuild_from(collection)
+        return collection
+
+    def embed_query(self, query: str) -> List[float]:
+        model = embedding_registry.get_model()
+        key = (model.model_name, query)
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = model.get_query_embedding(query)
+            self.query_cache.put(key, embedding)
+        return embedding
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        sheet_name: Optional[str] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-k chunks for `query` as [{id, text, score, scores, metadata}], best first.
+
+        `score` is the cosine similarity (vector), the BM25 score (lexical) or
+        the fused RRF score (hybrid); `scores` keeps the per-ranking values.
+        """
+        mode = mode or self.mode
+        collection = self._collection()
+        where_clause = build_where(sheet_name, row_range, where)
+        cache_key = (mode, query, top_k, json.dumps(where_clause, sort_keys=True))
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if mode == "vector":
+            hits = self._vector_hits(collection, query, top_k, where_clause)
+        elif mode == "lexical":
+            hits = self._lexical_hits(collection, query, top_k, sheet_name, row_range, where, where_clause)
+        else:
+            hits = self._hybrid_hits(collection, query, top_k, sheet_name, row_range, where, where_clause)
+        self.result_cache.put(cache_key, hits)
+        return hits
+
+    def _vector_hits(self, collection, query: str, n: int, where_clause) -> List[Dict[str, Any]]:
+        with metrics.span("vector_search"):
+            result = collection.query(
+                query_embeddings=[self.embed_query(query)],
+                n_results=n,
+                where=where_clause,
+                include=["documents", "metadatas", "distances"],
+            )
+        hits = []
+        for node_id, document, metadata, distance in zip(
+            result["ids"][0],
+            result["documents"][0],
+            result["metadatas"][0],
+            result["distances"][0],
+        ):
+            # Collections use Chroma's default squared-L2 space; for the
+            # normalized bge vectors this maps back to cosine similarity
+            score = 1.0 - distance / 2.0
+            hits.append({
+                "id": node_id, "text": document, "score": score, "scores": {"vector": score}, "metadata": metadata,
+            })
+        return hits
+
+    def _lexical_hits(
+        self, collection, query: str, n: int, sheet_name, row_range, where, where_clause
+    ) -> List[Dict[str, Any]]:
+        # Sheet and row filters run inside the index; other `where` clauses are
+        # checked against Chroma afterwards, so fetch extra candidates for them
+        ranked = self.lexical_index.search(query, n * self.candidates if where else n, sheet_name, row_range)
+        if not ranked:
+            return []
+        records = collection.get(
+            ids=[node_id for node_id, _ in ranked],
+            where=where_clause if where else None,
+            include=["documents", "metadatas"],
+        )
+        found = {node_id: (document, metadata) for node_id, document, metadata in zip(
+            records["ids"], records["documents"], records["metadatas"]
+        )}
+        hits = []
+        for node_id, score in ranked:
+            if node_id in found:
+                document, metadata = found[node_id]
+                hits.append({
+                    "id": node_id, "text": document, "score": score, "scores": {"lexical": score}, "metadata": metadata,
+                })
+        return hits[:n]
+
+    def _hybrid_hits(
+        self, collection, query: str, top_k: int, sheet_name, row_range, where, where_clause
+    ) -> List[Dict[str, Any]]:
+        n = top_k * self.candidates
+        lexical = self._lexical_hits(collection, query, n, sheet_name, row_range, where, where_clause)
+        vector = self._vector_hits(collection, query, n, where_clause)
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for hit in vector + lexical:
+            entry = by_id.setdefault(hit["id"], dict(hit, scores={}))
+            entry["scores"].update(hit["scores"])
+        fused = reciprocal_rank_fusion(
+            {"vector": [h["id"] for h in vector], "lexical": [h["id"] for h in lexical]},
+            self.weights,
+            self.rrf_k,
+        )
+        return [dict(by_id[node_id], score=score) for node_id, score in fused[:top_k]]
+
+    def timed_search(self, query: str, **kwargs) -> Tuple[List[Dict[str, Any]], float]:
+        start = time.perf_counter()
+        hits = self.search(query, **kwargs)
+        return hits, time.perf_counter() - start
+
+    def stats(self) -> dict:
+        return {
+            "collection_name": self.collection_name,
+            "mode": self.mode,
+            "lexical_index": self.lexical_index.stats(),
+            "query_embedding_cache": self.query_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+        }
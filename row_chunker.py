@@ -0,0 +1,192 @@
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Sequence, Tuple
+from llama_index.core.schema import Document, TextNode, NodeRelationship, RelatedNodeInfo
+from sheet_table import SheetTable, render_row
+from shared.dedup import RowDeduplicator
+
+# bge-small-en-v1.5 truncates input at 512 tokens, so chunks are sized to fit it.
+CHUNK_TOKENS = 512
+CHARS_PER_TOKEN = 4
+
+# Bookkeeping keys that describe the chunk but should not be embedded
+ROW_METADATA_KEYS = ["first_row", "last_row"]
+DOCUMENT_ONLY_KEYS = ("columns", "row_count", "row")
+
+
+def chunk_id(metadata: Dict[str, Any], first_row: int, last_row: int, source_id: Optional[str] = None) -> Optional[str]:
+    """Deterministic node ID: spreadsheet_id/sheet_name/first-last.
+
+    Chunks of one sheet cover disjoint row ranges, so the ID is unique and a
+    re-run of the same rows maps onto the same record (upsert, not append).
+    """
+    spreadsheet_id = metadata.get("spreadsheet_id")
+    sheet_name = metadata.get("sheet_name")
+    if spreadsheet_id and sheet_name:
+        return f"{spreadsheet_id}/{sheet_name}/{first_row}-{last_row}"
+    if source_id:
+        return f"{source_id}/{first_row}-{last_row}"
+    return None
+
+
+class RowChunker:
+    """Table-native node builder.
+
+    Packs whole rows into chunks of at most `chunk_tokens` (estimated as
+    characters / CHARS_PER_TOKEN) in one linear pass. Each chunk starts with
+    the column names and carries the 1-based sheet row range it covers as
+    `first_row` / `last_row` metadata. Rows are never split; a single row
+    longer than the budget becomes its own chunk.
+
+    Every chunk_* method takes an optional `deduplicator`
+    (shared.dedup.RowDeduplicator) that drops repeated rows before packing.
+    """
+
+    def __init__(self, chunk_tokens: int = CHUNK_TOKENS, chars_per_token: int = CHARS_PER_TOKEN):
+        self.chunk_tokens = chunk_tokens
+        self.max_chars = chunk_tokens * chars_per_token
+
+    def pack(
+        self,
+        lines: Iterable[str],
+        first_row: int = 1,
+        header_line: str = "",
+    ) -> Iterator[Tuple[int, int, str]]:
+        """Yield (first_row, last_row, text) windows from rendered row lines."""
+        prefix = f"Columns: {header_line}\n" if header_line else ""
+        budget = self.max_chars - len(prefix)
+        buffer: List[str] = []
+        size = 0
+        start = None
+        row = first_row - 1
+        last = row
+        for line in lines:
+            row += 1
+            if not line:
+                continue
+            if buffer and size + len(line) + 1 > budget:
+                yield start, last, prefix + "\n".join(buffer)
+                buffer, size = [], 0
+            if not buffer:
+                start = row
+            buffer.append(line)
+            size += len(line) + 1
+            last = row
+        if buffer:
+            yield start, last, prefix + "\n".join(buffer)
+
+    def _make_node(
+        self,
+        text: str,
+        first_row: int,
+        last_row: int,
+        metadata: Dict[str, Any],
+        source: Optional[Document] = None,
+        source_id: Optional[str] = None,
+    ) -> TextNode:
+        node_metadata = {k: v for k, v in metadata.items() if k not in DOCUMENT_ONLY_KEYS}
+        node_metadata["first_row"] = first_row
+        node_metadata["last_row"] = last_row
+        relationships = {}
+        if source is not None:
+            relationships[NodeRelationship.SOURCE] = source.as_related_node_info()
+            source_id = source.doc_id
+        elif source_id is not None:
+            relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=source_id)
+        node_id = chunk_id(node_metadata, first_row, last_row, source_id)
+        extra = {"id_": node_id} if node_id else {}
+        return TextNode(
+            **extra,
+            text=text,
+            metadata=node_metadata,
+            relationships=relationships,
+            excluded_embed_metadata_keys=list(ROW_METADATA_KEYS),
+            excluded_llm_metadata_keys=list(ROW_METADATA_KEYS),
+        )
+
+    def _chunk_lines(
+        self,
+        lines: Iterable[str],
+        first_row: int,
+        header_line: str,
+        metadata: Dict[str, Any],
+        source: Optional[Document] = None,
+        source_id: Optional[str] = None,
+        deduplicator: Optional[RowDeduplicator] = None,
+        rows: Optional[Sequence[Sequence[str]]] = None,
+        header: Optional[Sequence[str]] = None,
+    ) -> List[TextNode]:
+        chunks_before = chars_before = 0
+        if deduplicator is not None:
+            lines = list(lines)
+            # What the rows would have cost without dedup, for the savings report
+            for _, _, text in self.pack(lines, first_row, header_line):
+                chunks_before += 1
+                chars_before += len(text)
+            lines = deduplicator.filter_lines(
+                metadata.get("sheet_name", ""), header_line, first_row, lines, rows, header
+            )
+        nodes = [
+            self._make_node(text, start, end, metadata, source, source_id)
+            for start, end, text in self.pack(lines, first_row, header_line)
+        ]
+        if deduplicator is not None:
+            deduplicator.assign(nodes, chunks_before, chars_before)
+        return nodes
+
+    def chunk_rows(
+        self,
+        header: Sequence[str],
+        rows: Iterable[Sequence[str]],
+        first_row: int = 2,
+        metadata: Optional[Dict[str, Any]] = None,
+        source: Optional[Document] = None,
+        source_id: Optional[str] = None,
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> List[TextNode]:
+        """Chunk raw sheet values. `first_row` is the sheet row number of rows[0]."""
+        if deduplicator is not None:
+            # Near-dup key columns are compared on the cells, not the rendered text
+            rows = list(rows)
+        lines = (render_row(cells) for cells in rows)
+        return self._chunk_lines(
+            lines, first_row, render_row(header), metadata or {}, source, source_id, deduplicator, rows, header
+        )
+
+    def chunk_table(
+        self,
+        table: SheetTable,
+        metadata: Optional[Dict[str, Any]] = None,
+        source: Optional[Document] = None,
+        source_id: Optional[str] = None,
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> List[TextNode]:
+        """Chunk a SheetTable (or a zero-copy `table.slice()` window of one)."""
+        header_line = render_row(table.header) if table.has_header else ""
+        rows = table.to_rows() if deduplicator is not None else None
+        lines = table.row_texts() if rows is None else [render_row(cells) for cells in rows]
+        return self._chunk_lines(
+            lines, table.first_row, header_line, metadata or {}, source, source_id, deduplicator,
+            rows, table.header if table.has_header else [],
+        )
+
+    def chunk_document(
+        self,
+        document: Document,
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> List[TextNode]:
+        """Chunk a document whose text holds one rendered row per line."""
+        metadata = document.metadata
+        first_row = metadata.get("first_row", metadata.get("row", 1))
+        return self._chunk_lines(
+            document.text.split("\n"), first_row, metadata.get("columns", ""), metadata, document,
+            deduplicator=deduplicator,
+        )
+
+    def chunk_documents(
+        self,
+        documents: Iterable[Document],
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> List[TextNode]:
+        nodes: List[TextNode] = []
+        for document in documents:
+            nodes.extend(self.chunk_document(document, deduplicator))
+        return nodes
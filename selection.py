@@ -0,0 +1,403 @@
+import fnmatch
+import glob
+import hashlib
+import json
+import re
+from typing import Iterable, List, Dict, Any, Optional, Sequence, Tuple, Union
+
+_LETTERS_RE = re.compile(r"^([A-Za-z]{1,3})(?::([A-Za-z]{1,3}))?$")
+_A1_RE = re.compile(r"^([A-Za-z]{0,3})(\d*)(?::([A-Za-z]{0,3})(\d*))?$")
+_PREDICATE_RE = re.compile(
+    r"^\s*(.+?)\s+(==|!=|>=|<=|>|<|contains|startswith|regex|in|not_empty|empty)\s*(.*?)\s*$"
+)
+OPS = ("==", "!=", ">", ">=", "<", "<=", "contains", "startswith", "regex", "in", "not_empty", "empty")
+
+
+def quote_sheet_name(sheet_name: str) -> str:
+    """Quote a sheet title for use in A1 notation."""
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+def column_index(letters: str) -> int:
+    """0-based index of a column letter ("A" -> 0, "AA" -> 26)."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def column_letters(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def parse_a1(a1: str) -> Dict[str, Optional[int]]:
+    """Bounds of an A1 range within one sheet: 0-based columns, 1-based rows, None = open.
+
+    "B2:F500", "A:C", "2:500", "B2:F" and "C" are accepted; a sheet prefix
+    ("Sales!A1:C9") is ignored.
+    """
+    a1 = a1.split("!", 1)[-1].replace("$", "").strip()
+    match = _A1_RE.match(a1)
+    if not a1 or not match:
+        raise ValueError(f"Invalid A1 range: {a1!r}")
+    col0, row0, col1, row1 = match.groups()
+    if col1 is None and row1 is None:
+        col1, row1 = col0, row0
+    return {
+        "first_column": column_index(col0) if col0 else None,
+        "last_column": column_index(col1) if col1 else None,
+        "first_row": int(row0) if row0 else None,
+        "last_row": int(row1) if row1 else None,
+    }
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value.replace(",", "")) if value.strip() else None
+    except ValueError:
+        return None
+
+
+class RowPredicate:
+    """`column op value` test on one row; the column is a header name or a letter."""
+
+    def __init__(self, column: str, op: str, value: Any = None):
+        if op not in OPS:
+            raise ValueError(f"Unknown row predicate operator {op!r} (expected: {', '.join(OPS)})")
+        self.column = column
+        self.op = op
+        self.value = value
+        if op == "regex":
+            self._pattern = re.compile(str(value))
+        elif op == "in":
+            self.value = value if isinstance(value, (list, tuple, set)) else [v.strip() for v in str(value).split(",")]
+
+    @classmethod
+    def parse(cls, predicate: Union[str, Dict[str, Any], Sequence[Any], "RowPredicate"]) -> "RowPredicate":
+        """From "Status == Open", {"column", "op", "value"} or (column, op, value)."""
+        if isinstance(predicate, RowPredicate):
+            return predicate
+        if isinstance(predicate, dict):
+            return cls(predicate["column"], predicate["op"], predicate.get("value"))
+        if isinstance(predicate, str):
+            match = _PREDICATE_RE.match(predicate)
+            if not match:
+                raise ValueError(f"Invalid row predicate: {predicate!r}")
+            column, op, value = match.groups()
+            return cls(column, op, value.strip("\"'"))
+        return cls(*predicate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        value = list(self.value) if isinstance(self.value, (set, tuple)) else self.value
+        return {"column": self.column, "op": self.op, "value": value}
+
+    def matches(self, cell: str) -> bool:
+        op, value = self.op, self.value
+        if op == "empty":
+            return not cell.strip()
+        if op == "not_empty":
+            return bool(cell.strip())
+        if op == "contains":
+            return str(value).lower() in cell.lower()
+        if op == "startswith":
+            return cell.lower().startswith(str(value).lower())
+        if op == "regex":
+            return bool(self._pattern.search(cell))
+        if op == "in":
+            return cell in value
+        left, right = _number(cell), _number(str(value))
+        if left is None or right is None:
+            left, right = cell, str(value)
+        if op == "==":
+            return left == right
+        if op == "!=":
+            return left != right
+        if isinstance(left, str) != isinstance(right, str):
+            return False
+        return {">": left > right, ">=": left >= right, "<": left < right, "<=": left <= right}[op]
+
+
+def _match_pattern(pattern: str, sheet_name: str) -> bool:
+    """"re:<regex>" is a case-insensitive regex search, anything else a case-insensitive glob."""
+    if pattern.startswith("re:"):
+        return re.search(pattern[3:], sheet_name, re.IGNORECASE) is not None
+    return fnmatch.fnmatchcase(sheet_name.lower(), pattern.lower())
+
+
+class SheetPlan:
+    """What to fetch from one sheet: column blocks, row bounds and predicates."""
+
+    def __init__(
+        self,
+        sheet_name: str,
+        blocks: List[Tuple[int, int]],
+        keep: Optional[List[int]],
+        first_row: int,
+        last_row: Optional[int],
+        predicates: List[Tuple[int, RowPredicate]],
+        last_column: int,
+    ):
+        self.sheet_name = sheet_name
+        self.blocks = blocks          # [(first_column, last_column)] 0-based inclusive; [] = every column
+        self.keep = keep              # positions of the fetched cells to keep, None = all
+        self.first_row = first_row    # 1-based, first data row fetched (the header is always row 1)
+        self.last_row = last_row      # None when the grid size is unknown
+        self.predicates = predicates  # (position in the fetched row, predicate)
+        self.last_column = last_column
+
+    def ranges(self, start: int, end: Optional[int]) -> List[str]:
+        """A1 ranges for rows start..end (1-based, inclusive), one per column block."""
+        quoted = quote_sheet_name(self.sheet_name)
+        stop = "" if end is None else str(end)
+        if not self.blocks:
+            if end is None:
+                return [quoted if start == 1 else f"{quoted}!A{start}:{column_letters(self.last_column)}"]
+            return [f"{quoted}!{start}:{end}"]
+        return [f"{quoted}!{column_letters(c0)}{start}:{column_letters(c1)}{stop}" for c0, c1 in self.blocks]
+
+    def windows(self, window_rows: int) -> List[Tuple[int, Optional[int]]]:
+        """Row windows to request: the header row, then first_row..last_row in window_rows steps."""
+        windows: List[Tuple[int, Optional[int]]] = [] if self.first_row <= 1 else [(1, 1)]
+        if self.last_row is None:
+            return windows + [(self.first_row, None)]
+        for start in range(self.first_row, self.last_row + 1, window_rows):
+            windows.append((start, min(start + window_rows - 1, self.last_row)))
+        return windows
+
+    def merge(self, block_values: List[List[List[str]]]) -> List[List[str]]:
+        """Join the rows of each column block side by side, padding short rows."""
+        if len(block_values) == 1:
+            return block_values[0]
+        widths = [c1 - c0 + 1 for c0, c1 in self.blocks]
+        merged = []
+        for r in range(max((len(values) for values in block_values), default=0)):
+            row: List[str] = []
+            for b, values in enumerate(block_values):
+                cells = values[r] if r < len(values) else []
+                if b < len(block_values) - 1:
+                    cells = list(cells) + [""] * (widths[b] - len(cells))
+                row.extend(cells)
+            while row and row[-1] == "":
+                row.pop()
+            merged.append(row)
+        return merged
+
+    def apply(self, rows: List[List[str]]) -> List[List[str]]:
+        """The same selection on rows already in memory (e.g. a snapshot)."""
+        end = len(rows) if self.last_row is None else min(self.last_row, len(rows))
+        selected = []
+        for number in range(1, end + 1):
+            row = rows[number - 1]
+            if 1 < number < self.first_row:
+                row = []
+            elif self.blocks:
+                cells: List[str] = []
+                for c0, c1 in self.blocks:
+                    part = list(row[c0:c1 + 1])
+                    cells.extend(part + [""] * (c1 - c0 + 1 - len(part)))
+                while cells and cells[-1] == "":
+                    cells.pop()
+                row = cells
+            selected.append(row)
+        return self.finish_rows(selected, 1)
+
+    def finish_rows(self, rows: List[List[str]], first_row: int) -> List[List[str]]:
+        """Apply row predicates and drop helper columns; rows[0] is sheet row `first_row`.
+
+        Rows that fail a predicate become [] so every kept row keeps its
+        sheet row number; the header row is never filtered.
+        """
+        result = []
+        for offset, row in enumerate(rows):
+            if row and first_row + offset > 1 and self.predicates:
+                if not all(p.matches(row[pos] if pos < len(row) else "") for pos, p in self.predicates):
+                    row = []
+            if row and self.keep is not None:
+                row = [row[pos] if pos < len(row) else "" for pos in self.keep]
+                while row and row[-1] == "":
+                    row.pop()
+            result.append(row)
+        return result
+
+
+class SelectionSpec:
+    """Which sheets, columns and rows of a spreadsheet to download.
+
+    - sheets / exclude_sheets: glob patterns ("Sales*") or "re:<regex>";
+      exclusions win, an empty include list keeps every sheet
+    - columns: header names or letters ("A", "C:E"), applied to every sheet
+    - ranges: an A1 range ("A1:F500") for every sheet, or {pattern: A1}
+    - rows: predicates such as "Status == Open" or {"column", "op", "value"};
+      rows that fail any of them are dropped after download (the Sheets API
+      cannot filter by value), before chunking and embedding
+
+    Sheet, column and range selections are pushed into the range requests,
+    so excluded tabs and columns are never downloaded.
+    """
+
+    def __init__(
+        self,
+        sheets: Optional[List[str]] = None,
+        exclude_sheets: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+        ranges: Optional[Union[str, Dict[str, str]]] = None,
+        rows: Optional[List[Any]] = None,
+    ):
+        self.sheets = list(sheets or [])
+        self.exclude_sheets = list(exclude_sheets or [])
+        self.columns = list(columns or [])
+        self.ranges = ranges or {}
+        for a1 in [self.ranges] if isinstance(self.ranges, str) else self.ranges.values():
+            parse_a1(a1)  # fail early on a malformed range
+        self.rows = [RowPredicate.parse(p) for p in rows or []]
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "SelectionSpec":
+        """From a `selection` dict plus the legacy substring inclusion/exclusion rules."""
+        config = config or {}
+        selection = dict(config.get("selection") or {})
+        # Old rules were case-insensitive substrings; as globs they become *rule*
+        sheets = list(selection.get("sheets", [])) + [
+            f"*{glob.escape(rule)}*" for rule in config.get("inclusion_rules") or []
+        ]
+        exclude = list(selection.get("exclude_sheets", [])) + [
+            f"*{glob.escape(rule)}*" for rule in config.get("exclusion_rules") or []
+        ]
+        return cls(sheets, exclude, selection.get("columns"), selection.get("ranges"), selection.get("rows"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sheets": self.sheets,
+            "exclude_sheets": self.exclude_sheets,
+            "columns": self.columns,
+            "ranges": self.ranges,
+            "rows": [p.to_dict() for p in self.rows],
+        }
+
+    def fingerprint(self) -> str:
+        """Short stable hash, used to keep change-tracking state per selection."""
+        payload = json.dumps(self.to_dict(), sort_keys=True, default=list)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.sheets or self.exclude_sheets or self.narrows_cells)
+
+    @property
+    def narrows_cells(self) -> bool:
+        """True when only part of a sheet is downloaded (columns, ranges or row predicates)."""
+        return bool(self.columns or self.ranges or self.rows)
+
+    @property
+    def needs_headers(self) -> bool:
+        """Whether header row 1 must be read to resolve columns or predicates.
+
+        Only letter ranges ("C:E") are unambiguous; a single name such as
+        "ID" may be a header or a column letter, and headers win.
+        """
+        names = list(self.columns) + [p.column for p in self.rows]
+        return any(":" not in name for name in names)
+
+    def matches_sheet(self, sheet_name: str) -> bool:
+        if any(_match_pattern(p, sheet_name) for p in self.exclude_sheets):
+            return False
+        return not self.sheets or any(_match_pattern(p, sheet_name) for p in self.sheets)
+
+    def select_sheets(self, sheet_names: Iterable[str]) -> List[str]:
+        return [name for name in sheet_names if self.matches_sheet(name)]
+
+    def filter_info(self, spreadsheet_info: Dict[str, Any]) -> Dict[str, Any]:
+        """spreadsheet_info restricted to the selected sheets."""
+        return dict(spreadsheet_info, sheets=self.select_sheets(spreadsheet_info["sheets"]))
+
+    def range_for(self, sheet_name: str) -> Optional[str]:
+        if isinstance(self.ranges, str):
+            return self.ranges
+        for pattern, a1 in self.ranges.items():
+            if pattern == sheet_name or _match_pattern(pattern, sheet_name):
+                return a1
+        return None
+
+    def _resolve(self, name: str, header: Sequence[str]) -> Optional[int]:
+        """Column index of a header name, falling back to a column letter."""
+        lowered = [h.strip().lower() for h in header]
+        if name.strip().lower() in lowered:
+            return lowered.index(name.strip().lower())
+        if _LETTERS_RE.match(name) and ":" not in name:
+            return column_index(name)
+        return None
+
+    def plan_sheet(
+        self,
+        sheet_name: str,
+        grid_size: Optional[Dict[str, int]] = None,
+        header: Sequence[str] = (),
+    ) -> Optional[SheetPlan]:
+        """Compile the spec for one sheet into column blocks and row bounds.
+
+        Returns None when the sheet lacks every selected column or a row
+        filter column.
+        """
+        grid_size = grid_size or {}
+        grid_rows = grid_size.get("rows", 0)
+        grid_columns = grid_size.get("columns", 0) or max(len(header), 1)
+        a1 = self.range_for(sheet_name)
+        bounds = parse_a1(a1) if a1 else {}
+        c_min = bounds.get("first_column") or 0
+        c_max = bounds.get("last_column")
+        column_bounded = c_min > 0 or c_max is not None
+        c_max = grid_columns - 1 if c_max is None else c_max
+        first_row = max(bounds.get("first_row") or 1, 1)
+        last_row = bounds.get("last_row") or grid_rows or None
+        if last_row is not None:
+            last_row = max(min(last_row, grid_rows) if grid_rows else last_row, first_row)
+
+        base = None
+        if self.columns:
+            base = set()
+            for name in self.columns:
+                letters = _LETTERS_RE.match(name)
+                if letters and letters.group(2):
+                    base.update(range(column_index(letters.group(1)), column_index(letters.group(2)) + 1))
+                    continue
+                index = self._resolve(name, header)
+                if index is None:
+                    print(f"⚠️ {sheet_name}: column '{name}' not found, skipped")
+                else:
+                    base.add(index)
+            base = {c for c in base if c_min <= c <= c_max}
+            if not base:
+                print(f"⚠️ {sheet_name}: none of the selected columns exist, sheet skipped")
+                return None
+        elif column_bounded:
+            base = set(range(c_min, c_max + 1))
+
+        predicate_columns = []
+        for predicate in self.rows:
+            index = self._resolve(predicate.column, header)
+            if index is None:
+                print(f"⚠️ {sheet_name}: row filter column '{predicate.column}' not found, sheet skipped")
+                return None
+            predicate_columns.append((index, predicate))
+
+        keep = None
+        position: Dict[int, int] = {}
+        blocks: List[Tuple[int, int]] = []
+        if base is not None:
+            # Predicate columns are fetched too, then dropped after filtering
+            fetched = sorted(base | {c for c, _ in predicate_columns})
+            position = {c: i for i, c in enumerate(fetched)}
+            if set(fetched) != base:
+                keep = [position[c] for c in fetched if c in base]
+            for c in fetched:
+                if blocks and blocks[-1][1] == c - 1:
+                    blocks[-1] = (blocks[-1][0], c)
+                else:
+                    blocks.append((c, c))
+        predicates = [(position.get(c, c), p) for c, p in predicate_columns]
+        return SheetPlan(sheet_name, blocks, keep, first_row, last_row, predicates, grid_columns - 1)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from shared.manifest import hash_row
+
+CHANGE_STATE_PATH = "./chroma_db/change_state.sqlite3"
+
+
+def sheet_fingerprint(rows: List[List[str]], grid_size: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Grid size plus a content hash of the downloaded values."""
+    h = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        h.update(hash_row(row).encode("ascii"))
+    grid_size = grid_size or {}
+    return {
+        "rows": grid_size.get("rows", len(rows)),
+        "columns": grid_size.get("columns", max((len(r) for r in rows), default=0)),
+        "hash": h.hexdigest(),
+    }
+
+
+class ChangeTracker:
+    """Last-seen Drive revision and per-sheet fingerprints per spreadsheet.
+
+    `state_key` separates consumers of the same spreadsheet (e.g. different
+    collections), so clearing one target does not make another skip.
+    """
+
+    def __init__(self, path: str = CHANGE_STATE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spreadsheet_state (
+                spreadsheet_id TEXT NOT NULL,
+                state_key TEXT NOT NULL,
+                revision TEXT NOT NULL,
+                fingerprints TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (spreadsheet_id, state_key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, spreadsheet_id: str, state_key: str = "") -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT revision, fingerprints, recorded_at FROM spreadsheet_state "
+                "WHERE spreadsheet_id = ? AND state_key = ?",
+                (spreadsheet_id, state_key),
+            )
+            row = cur.fetchone()
+        if not row:
+            return None
+        return {"revision": json.loads(row[0]), "fingerprints": json.loads(row[1]), "recorded_at": row[2]}
+
+    def record(
+        self,
+        spreadsheet_id: str,
+        revision: Dict[str, Any],
+        fingerprints: Dict[str, Dict[str, Any]],
+        state_key: str = "",
+    ):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spreadsheet_state "
+                "(spreadsheet_id, state_key, revision, fingerprints, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (spreadsheet_id, state_key, json.dumps(revision), json.dumps(fingerprints), time.time()),
+            )
+
+    def forget(self, spreadsheet_id: str, state_key: str = ""):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM spreadsheet_state WHERE spreadsheet_id = ? AND state_key = ?",
+                (spreadsheet_id, state_key),
+            )
@@ -1,6 +1,13 @@
 import os
 from dotenv import load_dotenv
 
+DEFAULT_EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+DEFAULT_SNAPSHOT_DIR = "./chroma_db/snapshots"
+DEFAULT_ONNX_DIR = "./models/onnx"
+EMBED_BACKENDS = ("torch", "onnx", "onnx-int8")
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+DEDUP_MODES = ("off", "exact", "near")
+
 def setup_environment():
     """Set up the environment variables."""
     # Load .env file
@@ -11,4 +18,72 @@ def setup_environment():
     
     # Ensure OpenAI API key is set
     if not os.getenv("OPENAI_API_KEY"):
-        print("⚠️ Warning: OPENAI_API_KEY not found in environment")
\ No newline at end of file
+        print("⚠️ Warning: OPENAI_API_KEY not found in environment")
+
+def get_embedding_settings() -> dict:
+    """Embedding model settings, read from the environment at call time.
+
+    EMBED_MODEL_NAME   HuggingFace model id (default: BAAI/bge-small-en-v1.5)
+    EMBED_BATCH_SIZE   Texts per forward pass (default: 32)
+    EMBED_NUM_THREADS  torch CPU threads, 0 keeps the torch default
+    EMBED_WARMUP       Load the model when the app starts (default: 1)
+    EMBED_BACKEND      torch | onnx | onnx-int8 (default: torch)
+    EMBED_ONNX_DIR     Where exported/quantized ONNX models are kept (default: ./models/onnx)
+    """
+    return {
+        "model_name": os.getenv("EMBED_MODEL_NAME", DEFAULT_EMBED_MODEL),
+        "embed_batch_size": int(os.getenv("EMBED_BATCH_SIZE", "32")),
+        "num_threads": int(os.getenv("EMBED_NUM_THREADS", "0")),
+        "warmup": os.getenv("EMBED_WARMUP", "1").lower() in ("1", "true", "yes"),
+        "backend": os.getenv("EMBED_BACKEND", "torch").lower(),
+        "onnx_dir": os.getenv("EMBED_ONNX_DIR", DEFAULT_ONNX_DIR),
+    }
+
+
+def get_snapshot_settings() -> dict:
+    """Snapshot cache settings, read from the environment at call time.
+
+    SHEETS_CACHE_MODE        off | cache_first | offline (default: off)
+    SHEETS_SNAPSHOT_DIR      Snapshot directory (default: ./chroma_db/snapshots)
+    SHEETS_SNAPSHOT_TTL_S    Seconds a snapshot stays fresh, 0 = never expires (default: 86400)
+    SHEETS_SNAPSHOT_MAX_MB   Size budget before LRU eviction, 0 = unlimited (default: 1024)
+    """
+    return {
+        "cache_mode": os.getenv("SHEETS_CACHE_MODE", "off").lower(),
+        "snapshot_dir": os.getenv("SHEETS_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR),
+        "ttl_s": float(os.getenv("SHEETS_SNAPSHOT_TTL_S", "86400")),
+        "max_bytes": int(float(os.getenv("SHEETS_SNAPSHOT_MAX_MB", "1024")) * 1024 * 1024),
+    }
+
+
+def get_retrieval_settings() -> dict:
+    """Search settings, read from the environment at call time.
+
+    RETRIEVAL_MODE        hybrid | vector | lexical (default: hybrid)
+    HYBRID_RRF_K          Reciprocal rank fusion constant (default: 60)
+    HYBRID_VECTOR_WEIGHT  Weight of the vector ranking in the fusion (default: 1.0)
+    HYBRID_LEXICAL_WEIGHT Weight of the BM25 ranking in the fusion (default: 1.0)
+    HYBRID_CANDIDATES     Candidates taken from each ranking per result (default: 4)
+    """
+    return {
+        "mode": os.getenv("RETRIEVAL_MODE", "hybrid").lower(),
+        "rrf_k": float(os.getenv("HYBRID_RRF_K", "60")),
+        "vector_weight": float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0")),
+        "lexical_weight": float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0")),
+        "candidates": int(os.getenv("HYBRID_CANDIDATES", "4")),
+    }
+
+
+def get_dedup_settings() -> dict:
+    """Row deduplication settings for full rebuilds, read from the environment at call time.
+
+    EMBED_DEDUP            off | exact | near (default: off)
+    EMBED_DEDUP_THRESHOLD  Estimated Jaccard similarity at which rows count as near-duplicates (default: 0.85)
+    EMBED_DEDUP_KEY_COLUMNS  Comma-separated key columns (header names or letters) that near-duplicates
+                           must match exactly, e.g. "SKU,Order ID" (default: none)
+    """
+    return {
+        "mode": os.getenv("EMBED_DEDUP", "off").lower(),
+        "threshold": float(os.getenv("EMBED_DEDUP_THRESHOLD", "0.85")),
+        "key_columns": [c.strip() for c in os.getenv("EMBED_DEDUP_KEY_COLUMNS", "").split(",") if c.strip()],
+    }
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Sequence, Tuple
+
+_lock = threading.Lock()
+_credentials: Dict[Tuple, Any] = {}
+_refresh_locks: Dict[Tuple, threading.Lock] = {}
+_local = threading.local()
+# Bumped by clear(); per-thread clients built under an older generation are dropped
+_generation = 0
+
+
+def account_key(credentials_info: Dict[str, Any]) -> str:
+    """Identify a service account key by a digest of the whole key JSON.
+
+    client_email and private_key_id are public, so keying on them alone
+    would hand one caller's authorized credentials to anyone who sends the
+    same two values with a different private_key.
+    """
+    payload = json.dumps(credentials_info, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=20).hexdigest()
+
+
+def _cache_key(credentials_info: Dict[str, Any], scopes: Sequence[str]) -> Tuple:
+    return account_key(credentials_info), tuple(sorted(scopes))
+
+
+def get_credentials(credentials_info: Dict[str, Any], scopes: Sequence[str]):
+    """Service account credentials built from memory, one instance per account and scopes.
+
+    Sharing the instance means an access token fetched by one session or
+    thread is reused by the others until it expires. Nothing is written to
+    disk and no environment variable is read or set.
+    """
+    key = _cache_key(credentials_info, scopes)
+    with _lock:
+        credentials = _credentials.get(key)
+        if credentials is None:
+            from google.oauth2 import service_account
+            credentials = service_account.Credentials.from_service_account_info(
+                credentials_info, scopes=list(scopes)
+            )
+            _credentials[key] = credentials
+    return credentials
+
+
+def refresh_if_needed(credentials_info: Dict[str, Any], scopes: Sequence[str], request):
+    """Refresh the shared token at most once when several threads find it expired."""
+    credentials = get_credentials(credentials_info, scopes)
+    if credentials.valid:
+        return credentials
+    with _lock:
+        refresh_lock = _refresh_locks.setdefault(_cache_key(credentials_info, scopes), threading.Lock())
+    with refresh_lock:
+        if not credentials.valid:
+            credentials.refresh(request)
+    return credentials
+
+
+def get_service(api: str, version: str, credentials_info: Dict[str, Any], scopes: Sequence[str]):
+    """Discovery client for the current thread, authorized with the shared credentials.
+
+    httplib2 clients are not thread-safe, so each thread builds its own
+    client once per account and API and reuses it afterwards.
+    """
+    services = getattr(_local, "services", None)
+    if services is None or _local.generation != _generation:
+        services = _local.services = {}
+        _local.generation = _generation
+    key = (_cache_key(credentials_info, scopes), api, version)
+    service = services.get(key)
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build(api, version, credentials=get_credentials(credentials_info, scopes), cache_discovery=False)
+        services[key] = service
+    return service
+
+
+def clear():
+    """Forget cached credentials (e.g. after a key was revoked), in every thread.
+
+    Clients held by other threads (job and download pools) are rebuilt the
+    next time those threads call `get_service`.
+    """
+    global _generation
+    with _lock:
+        _credentials.clear()
+        _refresh_locks.clear()
+        _generation += 1
+    _local.services = {}
@@ -0,0 +1,302 @@
+import re
+import zlib
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shared.config import DEDUP_MODES, get_dedup_settings
+from shared.embedding_cache import normalize_text, text_hash
+from shared.metrics import metrics
+from selection import column_index
+from sheet_table import render_row
+
+# MinHash / LSH parameters: 8 bands of 4 rows put pairs above ~0.6 Jaccard
+# into a shared bucket; candidates are then checked against the threshold
+NUM_PERM = 32
+LSH_BANDS = 8
+SHINGLE_CHARS = 5
+NEAR_THRESHOLD = 0.85
+_PRIME = (1 << 31) - 1
+
+# Back-reference keys written on the chunk that holds a kept row
+DUPLICATE_KEYS = ["duplicate_rows", "duplicate_count"]
+# Chroma metadata is flat and stored per record, so the reference list is capped
+MAX_REF_CHARS = 1000
+
+
+@lru_cache(maxsize=None)
+def _permutations(num_perm: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+    return a[:, None], b[:, None]
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM, shingle_chars: int = SHINGLE_CHARS, seed: int = 1) -> np.ndarray:
+    """MinHash of the character shingles of a whitespace-normalized, lowercased text."""
+    text = normalize_text(text).lower()
+    shingles = {text[i:i + shingle_chars] for i in range(max(1, len(text) - shingle_chars + 1))}
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    a, b = _permutations(num_perm, seed)
+    return ((a * hashes[None, :] + b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def format_refs(refs: Sequence[Tuple[str, int]], max_chars: int = MAX_REF_CHARS) -> str:
+    """Render (sheet_name, row) references as "Sheet2!14-16; Sheet3!9", consecutive rows merged."""
+    spans: List[List[Any]] = []
+    for sheet_name, row in refs:
+        if spans and spans[-1][0] == sheet_name and spans[-1][2] == row - 1:
+            spans[-1][2] = row
+        else:
+            spans.append([sheet_name, row, row])
+    parts = [f"{name}!{first}" if first == last else f"{name}!{first}-{last}" for name, first, last in spans]
+    text = "; ".join(parts)
+    if len(text) <= max_chars:
+        return text
+    kept: List[str] = []
+    size = 0
+    for part in parts:
+        if size + len(part) + 2 > max_chars - 20:
+            break
+        kept.append(part)
+        size += len(part) + 2
+    return "; ".join(kept) + f"; ... (+{len(parts) - len(kept)} more)"
+
+
+class RowDeduplicator:
+    """Drops repeated rows between rendering and chunking, so they are never embedded or stored.
+
+    Rows are compared per header: a row is an exact duplicate when its
+    whitespace-normalized text (the embedding cache's hash) was seen before
+    under the same column names, and in "near" mode also when its MinHash
+    signature agrees with an earlier row's on at least `threshold` of the
+    permutations (candidates come from LSH buckets, so each row is compared
+    with a handful of rows, not all of them). The first occurrence is kept.
+
+    Dropped rows are blanked rather than removed, so the chunker keeps the
+    real sheet row numbers. The chunk holding the kept row gets the dropped
+    rows as `duplicate_rows` ("Sheet2!14-16; Sheet3!9") and `duplicate_count`
+    metadata; both keys are excluded from the embedded text.
+
+    Near mode is lossy for lookups: a dropped row's own values are not
+    indexed, so a search for the ID, SKU or date that made it differ finds
+    only the kept row. `key_columns` (header names or column letters) guard
+    against this: near-duplicates must match exactly on them, and they are
+    left out of the shingles. Exact mode loses nothing but row positions.
+
+    One instance covers one full build: the references are only complete
+    when every row of the collection went through the same instance.
+    """
+
+    def __init__(
+        self,
+        mode: str = "exact",
+        threshold: float = NEAR_THRESHOLD,
+        num_perm: int = NUM_PERM,
+        bands: int = LSH_BANDS,
+        key_columns: Optional[Sequence[str]] = None,
+    ):
+        if mode not in ("exact", "near"):
+            raise ValueError(f"Unknown dedup mode {mode!r} (expected: exact, near)")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.mode = mode
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.key_columns = list(key_columns or [])
+        self._key_indexes: Dict[Tuple[str, ...], List[int]] = {}
+        self._exact: Dict[str, int] = {}
+        self._buckets: Dict[int, int] = {}
+        self._signatures: List[np.ndarray] = []
+        # Kept row slot -> ID of the chunk that holds it
+        self._node_of: List[Optional[str]] = []
+        self._refs: Dict[str, List[Tuple[str, int]]] = {}
+        self._annotated: Dict[str, int] = {}
+        self._pending_rows: List[Tuple[int, int]] = []
+        self._pending_refs: List[Tuple[int, Tuple[str, int]]] = []
+        self.counters = {
+            "rows": 0,
+            "exact_duplicates": 0,
+            "near_duplicates": 0,
+            "chunks_before": 0,
+            "chunks_after": 0,
+            "chars_before": 0,
+            "chars_after": 0,
+        }
+
+    def key_indexes(self, header: Sequence[str]) -> List[int]:
+        """Positions of the key columns under `header`; a header name wins over a column letter."""
+        cached = self._key_indexes.get(tuple(header))
+        if cached is not None:
+            return cached
+        names: Dict[str, int] = {}
+        for i, name in enumerate(header):
+            names.setdefault(name.strip().lower(), i)
+        indexes = []
+        for column in self.key_columns:
+            if column.strip().lower() in names:
+                indexes.append(names[column.strip().lower()])
+            elif re.fullmatch(r"[A-Za-z]{1,3}", column.strip()):
+                indexes.append(column_index(column.strip()))
+        self._key_indexes[tuple(header)] = indexes
+        return indexes
+
+    def _near_match(self, header_line: str, key: Tuple[str, ...], signature: np.ndarray) -> Tuple[Optional[int], List[int]]:
+        width = self.num_perm // self.bands
+        # The key values are part of every bucket, so rows with different keys never collide
+        keys = [
+            hash((header_line, key, band, signature[band * width:(band + 1) * width].tobytes()))
+            for band in range(self.bands)
+        ]
+        for key in keys:
+            slot = self._buckets.get(key)
+            if slot is not None and np.mean(self._signatures[slot] == signature) >= self.threshold:
+                return slot, keys
+        return None, keys
+
+    def filter_lines(
+        self,
+        sheet_name: str,
+        header_line: str,
+        first_row: int,
+        lines: Sequence[str],
+        rows: Optional[Sequence[Sequence[str]]] = None,
+        header: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """`lines` with duplicate rows replaced by "" (the chunker skips them but keeps counting rows).
+
+        `rows` / `header` are the cells the lines were rendered from; without
+        them key columns are found by splitting the rendered text on ", ".
+        """
+        key_indexes: List[int] = []
+        if self.mode == "near" and self.key_columns:
+            key_indexes = self.key_indexes(header if header is not None else header_line.split(", "))
+        kept: List[str] = []
+        with metrics.span("dedup", sheet=sheet_name, rows=len(lines)) as span:
+            dropped = {"exact": 0, "near": 0}
+            for row, line in enumerate(lines, start=first_row):
+                if not line:
+                    kept.append(line)
+                    continue
+                self.counters["rows"] += 1
+                digest = text_hash(f"{header_line}\n{line}")
+                slot = self._exact.get(digest)
+                kind = "exact"
+                keys: List[int] = []
+                signature = None
+                if slot is None and self.mode == "near":
+                    key: Tuple[str, ...] = ()
+                    text = line
+                    if key_indexes:
+                        cells = rows[row - first_row] if rows is not None else line.split(", ")
+                        key = tuple(cells[i] if i < len(cells) else "" for i in key_indexes)
+                        text = render_row([c for i, c in enumerate(cells) if i not in key_indexes])
+                    signature = minhash_signature(text, self.num_perm)
+                    slot, keys = self._near_match(header_line, key, signature)
+                    kind = "near"
+                if slot is not None:
+                    dropped[kind] += 1
+                    self._pending_refs.append((slot, (sheet_name, row)))
+                    kept.append("")
+                    continue
+                slot = len(self._node_of)
+                self._node_of.append(None)
+                self._exact[digest] = slot
+                if signature is not None:
+                    self._signatures.append(signature)
+                    for key in keys:
+                        self._buckets.setdefault(key, slot)
+                self._pending_rows.append((slot, row))
+                kept.append(line)
+            self.counters["exact_duplicates"] += dropped["exact"]
+            self.counters["near_duplicates"] += dropped["near"]
+            span.update(dropped)
+        for kind, count in dropped.items():
+            if count:
+                metrics.incr("dedup_rows_dropped", count, kind=kind)
+        return kept
+
+    def assign(self, nodes: Sequence[Any], chunks_before: int = 0, chars_before: int = 0):
+        """Link the rows kept by the last `filter_lines` call to the `nodes` chunked from them."""
+        starts = [node.metadata["first_row"] for node in nodes]
+        for slot, row in self._pending_rows:
+            self._node_of[slot] = nodes[bisect_right(starts, row) - 1].node_id
+        for slot, ref in self._pending_refs:
+            self._refs.setdefault(self._node_of[slot], []).append(ref)
+        self._pending_rows = []
+        self._pending_refs = []
+        self.counters["chunks_before"] += chunks_before
+        self.counters["chunks_after"] += len(nodes)
+        self.counters["chars_before"] += chars_before
+        self.counters["chars_after"] += sum(len(node.text) for node in nodes)
+
+    def ref_metadata(self, node_id: str) -> Dict[str, Any]:
+        refs = self._refs.get(node_id, [])
+        return {"duplicate_rows": format_refs(refs), "duplicate_count": len(refs)}
+
+    def annotate(self, nodes: Sequence[Any]):
+        """Write the back-references known so far onto the given nodes (before they are embedded)."""
+        for node in nodes:
+            if node.node_id not in self._refs:
+                continue
+            node.metadata.update(self.ref_metadata(node.node_id))
+            for keys in (node.excluded_embed_metadata_keys, node.excluded_llm_metadata_keys):
+                keys.extend(key for key in DUPLICATE_KEYS if key not in keys)
+            self._annotated[node.node_id] = len(self._refs[node.node_id])
+
+    def pending_updates(self) -> Dict[str, Dict[str, Any]]:
+        """Back-references of nodes annotated (or written) before their last duplicate was seen."""
+        return {
+            node_id: self.ref_metadata(node_id)
+            for node_id, refs in self._refs.items()
+            if self._annotated.get(node_id) != len(refs)
+        }
+
+    def mark_written(self, node_ids: Sequence[str]):
+        for node_id in node_ids:
+            self._annotated[node_id] = len(self._refs.get(node_id, []))
+
+    def summary(self) -> Dict[str, Any]:
+        """Rows dropped and what it saved; every chunk is one embedding and one stored vector."""
+        c = self.counters
+        saved = c["chunks_before"] - c["chunks_after"]
+        return {
+            "mode": self.mode,
+            "rows": c["rows"],
+            "exact_duplicates": c["exact_duplicates"],
+            "near_duplicates": c["near_duplicates"],
+            "chunks_before": c["chunks_before"],
+            "chunks_after": c["chunks_after"],
+            "embeddings_saved": saved,
+            "vectors_saved": saved,
+            "vectors_saved_pct": round(100.0 * saved / c["chunks_before"], 1) if c["chunks_before"] else 0.0,
+            "embed_chars_saved_pct": round(
+                100.0 * (c["chars_before"] - c["chars_after"]) / c["chars_before"], 1
+            ) if c["chars_before"] else 0.0,
+        }
+
+
+def make_deduplicator(
+    mode: Optional[str] = None,
+    key_columns: Optional[Sequence[str]] = None,
+) -> Optional[RowDeduplicator]:
+    """RowDeduplicator for `mode` (default: EMBED_DEDUP), or None when deduplication is off.
+
+    `key_columns` defaults to EMBED_DEDUP_KEY_COLUMNS.
+    """
+    settings = get_dedup_settings()
+    mode = (mode or settings["mode"]).lower()
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode {mode!r} (expected: {', '.join(DEDUP_MODES)})")
+    if mode == "off":
+        return None
+    return RowDeduplicator(
+        mode,
+        threshold=settings["threshold"],
+        key_columns=settings["key_columns"] if key_columns is None else key_columns,
+    )
@@ -0,0 +1,193 @@
+import threading
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from shared.config import get_embedding_settings, EMBED_BACKENDS
+from shared.embedding_cache import EmbeddingCache
+from shared.metrics import metrics as pipeline_metrics
+
+
+def model_key(model_name: str, backend: str) -> str:
+    """Registry/cache key: the plain model id for torch, "<id>@<backend>" otherwise."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def split_model_key(key: str, default_backend: str = "torch") -> Tuple[str, str]:
+    if "@" in key:
+        model_name, backend = key.rsplit("@", 1)
+        return model_name, backend
+    return key, default_backend
+
+
+class EmbeddingModelRegistry:
+    """Process-wide, lazily loaded embedding models.
+
+    Each model is loaded once per process and shared by every
+    GoogleSheetsVectorStore and Streamlit session. Loading is guarded by a
+    lock so concurrent first calls do not load the model twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Any] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._threads_configured = False
+
+    def _configure_threads(self, num_threads: int):
+        if self._threads_configured or num_threads <= 0:
+            return
+        import torch
+        torch.set_num_threads(num_threads)
+        self._threads_configured = True
+
+    def get_model(
+        self,
+        model_name: Optional[str] = None,
+        embed_batch_size: Optional[int] = None,
+        backend: Optional[str] = None,
+    ):
+        """Return the shared model, loading it on first use.
+
+        `model_name` may already carry a backend suffix (a model's own
+        `model_name`, e.g. "BAAI/bge-small-en-v1.5@onnx"); otherwise
+        `backend` or EMBED_BACKEND picks torch, onnx or onnx-int8.
+        """
+        settings = get_embedding_settings()
+        model_name, backend = split_model_key(
+            model_name or settings["model_name"], backend or settings["backend"]
+        )
+        if backend not in EMBED_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}' (expected: {', '.join(EMBED_BACKENDS)})")
+        if backend != "torch":
+            from shared.onnx_embedding import missing_dependencies
+            missing = missing_dependencies()
+            if missing:
+                print(
+                    f"⚠️ Embedding backend '{backend}' needs {', '.join(missing)} "
+                    f"(pip install {' '.join(missing)}); falling back to torch"
+                )
+                backend = "torch"
+        key = model_key(model_name, backend)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                batch_size = embed_batch_size or settings["embed_batch_size"]
+                start = time.perf_counter()
+                with pipeline_metrics.span("model_load", model=key):
+                    if backend == "torch":
+                        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+                        self._configure_threads(settings["num_threads"])
+                        model = HuggingFaceEmbedding(model_name=model_name, embed_batch_size=batch_size)
+                    else:
+                        from shared.onnx_embedding import OnnxEmbedding
+                        model = OnnxEmbedding(
+                            model_name,
+                            cache_dir=settings["onnx_dir"],
+                            quantized=backend == "onnx-int8",
+                            embed_batch_size=batch_size,
+                            num_threads=settings["num_threads"],
+                        )
+                load_time = time.perf_counter() - start
+                self._models[key] = model
+                self._metrics[key] = {
+                    "load_time_s": round(load_time, 3),
+                    "embed_batch_size": model.embed_batch_size,
+                    "batches": 0,
+                    "texts": 0,
+                    "embed_time_s": 0.0,
+                    "last_batch_texts_per_s": 0.0,
+                }
+                print(f"✅ Embedding model loaded: {key} ({load_time:.2f}s)")
+        return model
+
+    def warm_up(self, model_name: Optional[str] = None, background: bool = False):
+        """Load the model and run one tiny batch so the first real call is fast."""
+        def run():
+            try:
+                self.embed_texts(["warm-up"], model_name=model_name)
+            except Exception as e:
+                print(f"⚠️ Embedding warm-up failed: {e}")
+
+        if background:
+            thread = threading.Thread(target=run, name="embedding-warmup", daemon=True)
+            thread.start()
+            return thread
+        run()
+
+    def embed_texts(
+        self,
+        texts: Sequence[str],
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> List[List[float]]:
+        """Embed texts in batches of the configured size, recording throughput.
+
+        Texts are batched in length order so each batch pads to similar
+        lengths; results are returned in the original order.
+        """
+        model = self.get_model(model_name, backend=backend)
+        model_name = model.model_name
+        batch_size = model.embed_batch_size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings: List[List[float]] = [None] * len(texts)
+        for i in range(0, len(order), batch_size):
+            indices = order[i:i + batch_size]
+            batch = [texts[j] for j in indices]
+            start = time.perf_counter()
+            with pipeline_metrics.span("embed_batch", texts=len(batch)):
+                for j, embedding in zip(indices, model.get_text_embedding_batch(batch)):
+                    embeddings[j] = embedding
+            elapsed = time.perf_counter() - start
+            pipeline_metrics.incr("texts_embedded", len(batch))
+            with self._lock:
+                metrics = self._metrics[model_name]
+                metrics["batches"] += 1
+                metrics["texts"] += len(batch)
+                metrics["embed_time_s"] += elapsed
+                metrics["last_batch_texts_per_s"] = round(len(batch) / elapsed, 1) if elapsed else 0.0
+        return embeddings
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for name, metrics in self._metrics.items():
+                m = dict(metrics)
+                m["embed_time_s"] = round(m["embed_time_s"], 3)
+                m["avg_texts_per_s"] = round(m["texts"] / metrics["embed_time_s"], 1) if metrics["embed_time_s"] else 0.0
+                result[name] = m
+            return result
+
+
+# Shared instance for the whole process
+embedding_registry = EmbeddingModelRegistry()
+
+
+def embed_nodes(nodes: Sequence[Any], embedding_cache: Optional[EmbeddingCache] = None, model_name: Optional[str] = None):
+    """Fill node.embedding for nodes that have none, using the cache when given.
+
+    Only cache misses are sent to the shared model; new vectors are written
+    back to the cache.
+    """
+    from llama_index.core.schema import MetadataMode
+    pending = [node for node in nodes if node.embedding is None]
+    if not pending:
+        return
+    model_name = model_name or embedding_registry.get_model().model_name
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in pending]
+    if embedding_cache is None:
+        embeddings = embedding_registry.embed_texts(texts, model_name=model_name)
+    else:
+        embeddings = embedding_cache.get_many(model_name, texts)
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            computed = embedding_registry.embed_texts([texts[i] for i in missing], model_name=model_name)
+            embedding_cache.put_many(model_name, [texts[i] for i in missing], computed)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+        print(f"🔍 Debug: Embedding cache {len(pending) - len(missing)} hit(s), {len(missing)} miss(es)")
+        pipeline_metrics.incr("embedding_cache_hits", len(pending) - len(missing))
+        pipeline_metrics.incr("embedding_cache_misses", len(missing))
+    for node, embedding in zip(pending, embeddings):
+        node.embedding = embedding
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional
+from urllib.parse import urlparse, parse_qs, unquote
+
+from shared.sheets_stub import StubSheetsService
+
+
+class FakeSheetsServer:
+    """Local HTTP server speaking the subset of the Sheets REST API we use.
+
+    Serves `GET /v4/spreadsheets/{id}` and `GET /v4/spreadsheets/{id}/values:batchGet`
+    from in-memory workbooks, with optional latency and injected failures
+    (`fail_every` returns `fail_status` for every n-th request) so retries and
+    rate limiting can be exercised without network access.
+
+        with FakeSheetsServer({"id": workbook}, fail_every=5) as server:
+            AsyncGoogleSheetsDownloader(base_url=server.base_url)
+    """
+
+    def __init__(
+        self,
+        workbooks: Dict[str, Dict[str, List[List[str]]]],
+        latency: float = 0.0,
+        fail_every: int = 0,
+        fail_status: int = 429,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.stub = StubSheetsService(workbooks)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.request_count = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            fail = bool(self.fail_every) and self.request_count % self.fail_every == 0
+            if fail:
+                self.failures += 1
+            return fail
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                if server._should_fail():
+                    self._send(server.fail_status, {"error": {"code": server.fail_status}}, {"Retry-After": "0"})
+                    return
+                parsed = urlparse(self.path)
+                parts = [unquote(p) for p in parsed.path.split("/") if p]
+                query = parse_qs(parsed.query)
+                try:
+                    if len(parts) == 3 and parts[:2] == ["v4", "spreadsheets"]:
+                        self._send(200, server.stub._metadata(parts[2]))
+                    elif len(parts) == 4 and parts[3] == "values:batchGet":
+                        ranges = query.get("ranges", [])
+                        self._send(200, {
+                            "spreadsheetId": parts[2],
+                            "valueRanges": [server.stub._value_range(parts[2], r) for r in ranges],
+                        })
+                    else:
+                        self._send(404, {"error": {"code": 404, "message": self.path}})
+                except Exception as e:
+                    self._send(404, {"error": {"code": 404, "message": str(e)}})
+
+        return Handler
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+JOBS_PATH = "./chroma_db/jobs.sqlite3"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"  # was queued/running when the process stopped
+ACTIVE_STATES = (QUEUED, RUNNING)
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_COLUMNS = (
+    "job_id", "kind", "dedupe_key", "params", "state", "progress", "result", "error",
+    "cancel_requested", "attempts", "created_at", "started_at", "finished_at", "updated_at",
+)
+
+
+def dedupe_key(kind: str, params: Dict[str, Any]) -> str:
+    """Hash of the job kind and its (JSON-serializable) parameters."""
+    payload = json.dumps([kind, params], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class JobStore:
+    """Persistent job records: state, per-stage/per-sheet progress and result.
+
+    Only parameters are stored; secrets such as service account keys are
+    kept in memory by the queue, so nothing sensitive reaches the disk.
+    A job that was queued or running when the process stopped is marked
+    `interrupted` and keeps its progress, so it can be resumed.
+    """
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                dedupe_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                state TEXT NOT NULL,
+                progress TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, state);
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, states: Optional[List[str]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        args: List[Any] = []
+        if states:
+            query += f" WHERE state IN ({', '.join('?' * len(states))})"
+            args.extend(states)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job, or return the matching one that is already in flight.
+
+        Returns {'job_id', 'created', 'resumed'}. An interrupted job with the
+        same parameters is queued again and keeps its progress.
+        """
+        key = dedupe_key(kind, params)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT job_id, state FROM jobs WHERE dedupe_key = ? AND state IN (?, ?, ?) "
+                f"ORDER BY created_at DESC LIMIT 1",
+                (key, QUEUED, RUNNING, INTERRUPTED),
+            ).fetchone()
+            if row and row[1] in ACTIVE_STATES:
+                return {"job_id": row[0], "created": False, "resumed": False}
+            if row:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, cancel_requested = 0, error = NULL, updated_at = ? WHERE job_id = ?",
+                    (QUEUED, now, row[0]),
+                )
+                return {"job_id": row[0], "created": False, "resumed": True}
+            job_id = uuid.uuid4().hex[:12]
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, dedupe_key, params, state, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, json.dumps(params), QUEUED, json.dumps({}), now, now),
+            )
+        return {"job_id": job_id, "created": True, "resumed": False}
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it was cancelled meanwhile."""
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, started_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND state = ?",
+                (RUNNING, now, now, job_id, QUEUED),
+            )
+        return cur.rowcount == 1
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(progress), time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, state: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, finished_at = ?, updated_at = ? WHERE job_id = ?",
+                (state, json.dumps(result, default=str) if result is not None else None, error, now, now, job_id),
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job right away, or flag a running one; returns the new state."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, cancel_requested = 1, finished_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND state IN (?, ?)",
+                (CANCELLED, now, now, job_id, QUEUED, INTERRUPTED),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE job_id = ? AND state = ?",
+                (now, job_id, RUNNING),
+            )
+            row = self._conn.execute("SELECT state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_interrupted(self) -> int:
+        """Called at startup: jobs left queued/running by a previous process."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state IN (?, ?)",
+                (INTERRUPTED, time.time(), QUEUED, RUNNING),
+            )
+        return cur.rowcount
+
+    def prune(self, older_than_s: float = 7 * 24 * 3600) -> int:
+        """Delete finished jobs older than `older_than_s`."""
+        cutoff = time.time() - older_than_s
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                f"DELETE FROM jobs WHERE state IN ({', '.join('?' * len(FINISHED_STATES))}) AND finished_at < ?",
+                (*FINISHED_STATES, cutoff),
+            )
+        return cur.rowcount
@@ -0,0 +1,286 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+
+from shared.metrics import metrics
+
+LEXICAL_DIR = "lexical"
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Terms in more than this share of the chunks (and more than COMMON_TERM_MIN_DF
+# chunks) do not select candidates on their own
+COMMON_TERM_RATIO = 0.05
+COMMON_TERM_MIN_DF = 1000
+
+# Words joined by -, ., /, : or @ stay one token ("SKU-1042-B") and are also
+# indexed part by part, so both the exact key and its pieces match
+_TOKEN_RE = re.compile(r"\w+(?:[-./:@]\w+)*")
+_PART_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of a chunk or query, compound keys plus their parts."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group(0)
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in _PART_RE.findall(token) if part != token)
+    return tokens
+
+
+def lexical_index_path(chroma_path: str, collection_name: str) -> str:
+    """Index file kept next to the Chroma data of a collection."""
+    return os.path.join(chroma_path, LEXICAL_DIR, f"{collection_name}.sqlite3")
+
+
+class LexicalIndex:
+    """On-disk BM25 inverted index over the chunk texts of one collection.
+
+    Terms and documents are interned to integer IDs and postings are a
+    (term_id, doc) keyed table, so a query touches only the postings of its
+    own terms: lookups of rare keys (IDs, SKUs, codes) stay in the
+    millisecond range however large the collection is. Document frequencies
+    and length totals are maintained on every write.
+
+    Candidates come from the query's selective terms only (those in at most
+    COMMON_TERM_RATIO of the chunks, or COMMON_TERM_MIN_DF chunks); common terms ("sku", "total") still add
+    to the score of those candidates, but their long posting lists are never
+    scanned. A query made only of common terms scans them all.
+    """
+
+    def __init__(self, path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # The UI process reads while ingestion writes, so wait for locks instead of failing
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                node_id TEXT NOT NULL UNIQUE,
+                document_id TEXT NOT NULL DEFAULT '',
+                sheet_name TEXT NOT NULL DEFAULT '',
+                first_row INTEGER,
+                last_row INTEGER,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_docs_document ON docs (document_id);
+            CREATE INDEX IF NOT EXISTS idx_docs_sheet ON docs (sheet_name);
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE,
+                df INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                doc INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term_id, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc);
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats VALUES ('doc_count', 0), ('total_length', 0);
+            """
+        )
+        self._conn.commit()
+
+    def _stats(self) -> Tuple[int, int]:
+        values = dict(self._conn.execute("SELECT key, value FROM stats").fetchall())
+        return values["doc_count"], values["total_length"]
+
+    def _remove(self, doc_ids: List[int]):
+        """Drop documents and their postings; caller holds the lock and a transaction."""
+        if not doc_ids:
+            return
+        for i in range(0, len(doc_ids), 500):
+            batch = doc_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(
+                f"""
+                UPDATE terms SET df = df - (
+                    SELECT COUNT(*) FROM postings p WHERE p.term_id = terms.id AND p.doc IN ({placeholders})
+                ) WHERE id IN (SELECT term_id FROM postings WHERE doc IN ({placeholders}))
+                """,
+                batch + batch,
+            )
+            removed, length = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE id IN ({placeholders})", batch
+            ).fetchone()
+            self._conn.execute(f"DELETE FROM postings WHERE doc IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", batch)
+            self._conn.execute("UPDATE stats SET value = value - ? WHERE key = 'doc_count'", (removed,))
+            self._conn.execute("UPDATE stats SET value = value - ? WHERE key = 'total_length'", (length,))
+        self._conn.execute("DELETE FROM terms WHERE df <= 0")
+
+    def _doc_ids(self, column: str, values: List[str]) -> List[int]:
+        ids: List[int] = []
+        for i in range(0, len(values), 500):
+            batch = values[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            ids.extend(r[0] for r in self._conn.execute(
+                f"SELECT id FROM docs WHERE {column} IN ({placeholders})", batch
+            ))
+        return ids
+
+    def upsert(self, entries: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Index (node_id, text, metadata) entries, replacing earlier versions of the same node IDs."""
+        entries = list({node_id: (node_id, text, metadata) for node_id, text, metadata in entries}.values())
+        if not entries:
+            return 0
+        with metrics.span("lexical_write", nodes=len(entries)), self._lock, self._conn:
+            self._remove(self._doc_ids("node_id", [node_id for node_id, _, _ in entries]))
+            total_length = 0
+            for node_id, text, metadata in entries:
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                total_length += length
+                doc = self._conn.execute(
+                    "INSERT INTO docs (node_id, document_id, sheet_name, first_row, last_row, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        node_id,
+                        metadata.get("document_id") or metadata.get("ref_doc_id") or "",
+                        metadata.get("sheet_name", ""),
+                        metadata.get("first_row"),
+                        metadata.get("last_row"),
+                        length,
+                    ),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(term,) for term in counts],
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term_id, doc, tf) SELECT id, ?, ? FROM terms WHERE term = ?",
+                    [(doc, tf, term) for term, tf in counts.items()],
+                )
+            self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'doc_count'", (len(entries),))
+            self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
+        return len(entries)
+
+    def delete_nodes(self, node_ids: List[str]):
+        with self._lock, self._conn:
+            self._remove(self._doc_ids("node_id", list(node_ids)))
+
+    def delete_documents(self, document_ids: List[str]):
+        """Drop every chunk of the given source document IDs (the Chroma `document_id`)."""
+        with self._lock, self._conn:
+            self._remove(self._doc_ids("document_id", list(document_ids)))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("UPDATE stats SET value = 0")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._stats()[0]
+
+    def rebuild_from(self, collection, page_size: int = 1000) -> int:
+        """Re-index every chunk stored in a Chroma collection (backfill for older collections)."""
+        self.clear()
+        total = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            total += self.upsert(zip(page["ids"], page["documents"], page["metadatas"]))
+            offset += len(page["ids"])
+        print(f"✅ Lexical index rebuilt from {collection.name}: {total} chunk(s)")
+        return total
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        sheet_name: Optional[str] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> List[Tuple[str, float]]:
+        """BM25 top-k as [(node_id, score)], best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with metrics.span("lexical_search", terms=len(terms)) as span, self._lock:
+            doc_count, total_length = self._stats()
+            if not doc_count:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            found = self._conn.execute(
+                f"SELECT id, df FROM terms WHERE term IN ({placeholders})", terms
+            ).fetchall()
+            if not found:
+                span["hits"] = 0
+                return []
+            avg_length = total_length / doc_count or 1.0
+            limit = max(COMMON_TERM_MIN_DF, int(doc_count * COMMON_TERM_RATIO))
+            selective = [term_id for term_id, df in found if df <= limit] or [term_id for term_id, _ in found]
+            params: List[Any] = []
+            for term_id, df in found:
+                params.extend([term_id, math.log(1 + (doc_count - df + 0.5) / (df + 0.5))])
+            values = ",".join("(?, ?)" for _ in found)
+            params.extend(selective)
+            filters = []
+            if sheet_name:
+                filters.append("d.sheet_name = ?")
+            if row_range:
+                filters.append("d.first_row <= ? AND d.last_row >= ?")
+            where = f"WHERE {' AND '.join(filters)}" if filters else ""
+            params.extend([self.k1 + 1, self.k1, self.b, self.b, avg_length])
+            if sheet_name:
+                params.append(sheet_name)
+            if row_range:
+                params.extend([row_range[1], row_range[0]])
+            params.append(top_k)
+            rows = self._conn.execute(
+                f"""
+                WITH q(term_id, idf) AS (VALUES {values}),
+                candidates(doc) AS (
+                    SELECT DISTINCT doc FROM postings WHERE term_id IN ({",".join("?" * len(selective))})
+                )
+                SELECT d.node_id,
+                       SUM(q.idf * p.tf * ? / (p.tf + ? * (1 - ? + ? * d.length / ?))) AS score
+                FROM candidates c
+                JOIN docs d ON d.id = c.doc
+                CROSS JOIN q
+                JOIN postings p ON p.term_id = q.term_id AND p.doc = c.doc
+                {where}
+                GROUP BY d.id
+                ORDER BY score DESC
+                LIMIT ?
+                """,
+                params,
+            ).fetchall()
+            span["hits"] = len(rows)
+        return [(node_id, float(score)) for node_id, score in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            doc_count, total_length = self._stats()
+            term_count = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {
+            "path": self.path,
+            "chunks": doc_count,
+            "terms": term_count,
+            "avg_chunk_tokens": round(total_length / doc_count, 1) if doc_count else 0.0,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Optional, Tuple
+
+MANIFEST_PATH = "./chroma_db/index_manifest.sqlite3"
+
+
+def hash_row(row: List[str]) -> str:
+    """Stable content hash of a single row of cells."""
+    h = hashlib.blake2b(digest_size=16)
+    for cell in row:
+        h.update(str(cell).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def hash_sheet(header: List[str], row_hashes: Dict[int, str]) -> str:
+    """Hash of a whole sheet, derived from the header and the per-row hashes."""
+    h = hashlib.blake2b(hash_row(header).encode("ascii"), digest_size=16)
+    for row in sorted(row_hashes):
+        h.update(f"{row}:{row_hashes[row]};".encode("ascii"))
+    return h.hexdigest()
+
+
+class IndexManifest:
+    """Persistent record of what has been embedded into each collection.
+
+    Keeps one content hash per (collection, spreadsheet_id, sheet_name, row)
+    plus a hash per sheet, so a re-run can tell which rows are new, changed
+    or removed without touching the vector store. Each row also records the
+    chunk (node ID) it was packed into and each sheet the hash of its header,
+    so only the chunks touched by a change are rebuilt.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sheets (
+                collection TEXT NOT NULL,
+                spreadsheet_id TEXT NOT NULL,
+                sheet_name TEXT NOT NULL,
+                sheet_hash TEXT NOT NULL,
+                PRIMARY KEY (collection, spreadsheet_id, sheet_name)
+            );
+            CREATE TABLE IF NOT EXISTS rows (
+                collection TEXT NOT NULL,
+                spreadsheet_id TEXT NOT NULL,
+                sheet_name TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                row_hash TEXT NOT NULL,
+                PRIMARY KEY (collection, spreadsheet_id, sheet_name, row)
+            );
+            """
+        )
+        # Manifests written before rows were packed into chunks lack these columns;
+        # "" makes the next sync rebuild those sheets
+        for table, column in (("sheets", "header_hash"), ("rows", "chunk_id")):
+            columns = [r[1] for r in self._conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def has_collection(self, collection: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT 1 FROM sheets WHERE collection = ? LIMIT 1", (collection,)
+            )
+            return cur.fetchone() is not None
+
+    def list_sheets(self, collection: str, spreadsheet_id: str) -> List[str]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT sheet_name FROM sheets WHERE collection = ? AND spreadsheet_id = ?",
+                (collection, spreadsheet_id),
+            )
+            return [r[0] for r in cur.fetchall()]
+
+    def get_sheet_hash(self, collection: str, spreadsheet_id: str, sheet_name: str) -> Optional[str]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT sheet_hash FROM sheets WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?",
+                (collection, spreadsheet_id, sheet_name),
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def get_header_hash(self, collection: str, spreadsheet_id: str, sheet_name: str) -> Optional[str]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT header_hash FROM sheets WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?",
+                (collection, spreadsheet_id, sheet_name),
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def get_rows(self, collection: str, spreadsheet_id: str, sheet_name: str) -> Dict[int, Tuple[str, str]]:
+        """{row: (row_hash, chunk_id)} of one sheet."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT row, row_hash, chunk_id FROM rows "
+                "WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?",
+                (collection, spreadsheet_id, sheet_name),
+            )
+            return {r[0]: (r[1], r[2]) for r in cur.fetchall()}
+
+    def get_row_hashes(self, collection: str, spreadsheet_id: str, sheet_name: str) -> Dict[int, str]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT row, row_hash FROM rows WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?",
+                (collection, spreadsheet_id, sheet_name),
+            )
+            return {r[0]: r[1] for r in cur.fetchall()}
+
+    def replace_sheet(
+        self,
+        collection: str,
+        spreadsheet_id: str,
+        sheet_name: str,
+        sheet_hash: str,
+        rows: Dict[int, Tuple[str, str]],
+        header_hash: str = "",
+    ):
+        """Overwrite the stored state of one sheet ({row: (row_hash, chunk_id)}) in a single transaction."""
+        key = (collection, spreadsheet_id, sheet_name)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM rows WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?", key
+            )
+            self._conn.executemany(
+                "INSERT INTO rows (collection, spreadsheet_id, sheet_name, row, row_hash, chunk_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [key + (row, row_hash, chunk_id) for row, (row_hash, chunk_id) in rows.items()],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sheets (collection, spreadsheet_id, sheet_name, sheet_hash, header_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                key + (sheet_hash, header_hash),
+            )
+
+    def remove_sheet(self, collection: str, spreadsheet_id: str, sheet_name: str):
+        key = (collection, spreadsheet_id, sheet_name)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM rows WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?", key
+            )
+            self._conn.execute(
+                "DELETE FROM sheets WHERE collection = ? AND spreadsheet_id = ? AND sheet_name = ?", key
+            )
+
+    def clear_collection(self, collection: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rows WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM sheets WHERE collection = ?", (collection,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,216 @@
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+PROMETHEUS_PREFIX = "sheets"
+RECENT_SPANS = 200
+
+
+def get_profile_settings() -> Dict[str, Any]:
+    """Opt-in cProfile hook, read from the environment at call time.
+
+    SHEETS_PROFILE      Comma-separated stage names to profile, or "*" for all (default: off)
+    SHEETS_PROFILE_DIR  Where .prof files are written (default: ./profiles)
+    """
+    stages = os.getenv("SHEETS_PROFILE", "").strip()
+    return {
+        "stages": {s.strip() for s in stages.split(",") if s.strip()},
+        "profile_dir": os.getenv("SHEETS_PROFILE_DIR", "./profiles"),
+    }
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{PROMETHEUS_PREFIX}_{name}")
+
+
+def _prom_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_prom_escape(v)}"' for k, v in key) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide stage spans and counters.
+
+    `span("download_sheet")` times a block and aggregates calls, total and
+    max seconds per stage; `incr("rows_downloaded", n)` adds to a counter.
+    Spans nest per thread, and the most recent ones are kept with their
+    parent stage for a simple trace view. Everything can be exported as a
+    dict/JSON (`snapshot`, `to_json`) or Prometheus text (`to_prometheus`).
+    """
+
+    def __init__(self, recent: int = RECENT_SPANS):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans: Dict[str, Dict[str, float]] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=recent)
+        self.started_at = time.time()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[Dict[str, Any]]:
+        """Time a stage. The yielded dict can be filled with attributes (rows, bytes...)."""
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        stack.append(stage)
+        profiler = self._start_profiler(stage)
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                self._dump_profile(profiler, stage)
+            stack.pop()
+            with self._lock:
+                agg = self._spans.setdefault(stage, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+                agg["calls"] += 1
+                agg["total_s"] += elapsed
+                agg["max_s"] = max(agg["max_s"], elapsed)
+                self._recent.append({
+                    "stage": stage,
+                    "parent": parent,
+                    "duration_s": round(elapsed, 6),
+                    "thread": threading.current_thread().name,
+                    **attributes,
+                })
+
+    def traced(self, stage: str):
+        """Decorator form of `span`; keeps the wrapped function's own frame for samplers like py-spy."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _start_profiler(self, stage: str) -> Optional[cProfile.Profile]:
+        stages = get_profile_settings()["stages"]
+        if not stages or ("*" not in stages and stage not in stages):
+            return None
+        # cProfile cannot nest; profile the outermost selected stage only
+        if getattr(self._local, "profiling", False):
+            return None
+        self._local.profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            self._local.profiling = False
+            return None
+        return profiler
+
+    def _dump_profile(self, profiler: cProfile.Profile, stage: str):
+        profiler.disable()
+        self._local.profiling = False
+        profile_dir = get_profile_settings()["profile_dir"]
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{stage}-{int(time.time() * 1000)}-{threading.get_ident()}.prof")
+        profiler.dump_stats(path)
+        print(f"🔬 Profile written: {path}")
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._recent.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {
+                stage: {
+                    "calls": int(agg["calls"]),
+                    "total_s": round(agg["total_s"], 4),
+                    "avg_s": round(agg["total_s"] / agg["calls"], 4) if agg["calls"] else 0.0,
+                    "max_s": round(agg["max_s"], 4),
+                }
+                for stage, agg in self._spans.items()
+            }
+            counters: Dict[str, Any] = {}
+            for (name, key), value in self._counters.items():
+                label = ",".join(f"{k}={v}" for k, v in key)
+                counters[f"{name}{{{label}}}" if label else name] = value
+            recent = list(self._recent)
+        embed = spans.get("embed_batch")
+        texts = counters.get("texts_embedded", 0)
+        return {
+            "since": self.started_at,
+            "spans": spans,
+            "counters": counters,
+            "embed_texts_per_s": round(texts / embed["total_s"], 1) if embed and embed["total_s"] else 0.0,
+            "recent_spans": recent,
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent, default=str)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (counters and per-stage summaries)."""
+        lines = []
+        with self._lock:
+            spans = {stage: dict(agg) for stage, agg in self._spans.items()}
+            counters = dict(self._counters)
+        if spans:
+            for metric, field, kind, help_text in (
+                ("stage_seconds_total", "total_s", "counter", "Total seconds spent per pipeline stage"),
+                ("stage_calls_total", "calls", "counter", "Number of times each pipeline stage ran"),
+                ("stage_seconds_max", "max_s", "gauge", "Longest single run of each pipeline stage"),
+            ):
+                name = _prom_name(metric)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for stage, agg in sorted(spans.items()):
+                    lines.append(f"{name}{_prom_labels((('stage', stage),))} {agg[field]}")
+        by_name: Dict[str, list] = {}
+        for (counter, key), value in counters.items():
+            by_name.setdefault(counter, []).append((key, value))
+        for counter, samples in sorted(by_name.items()):
+            name = _prom_name(f"{counter}_total")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(samples):
+                lines.append(f"{name}{_prom_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def count_values(rows) -> Tuple[int, int]:
+    """(cells, UTF-8 bytes) of downloaded values."""
+    cells = 0
+    size = 0
+    for row in rows:
+        cells += len(row)
+        for cell in row:
+            size += len(cell.encode("utf-8"))
+    return cells, size
+
+
+# Shared instance for the whole process
+metrics = MetricsRegistry()
@@ -0,0 +1,208 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, List, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+ONNX_OPSET = 14
+# onnx is needed by torch.onnx.export and by onnxruntime.quantization
+REQUIRED_MODULES = ("onnxruntime", "onnx")
+
+_export_lock = threading.Lock()
+
+
+def missing_dependencies() -> List[str]:
+    """Modules the ONNX backends need that are not installed."""
+    return [name for name in REQUIRED_MODULES if importlib.util.find_spec(name) is None]
+
+
+def onnx_model_dir(model_name: str, root: str) -> str:
+    return os.path.join(root, model_name.replace("/", "__"))
+
+
+def export_onnx(model_name: str, output_dir: str) -> str:
+    """Export the HuggingFace encoder to ONNX (fp32) next to its tokenizer.json.
+
+    Needs torch and transformers, which the default backend installs anyway;
+    only the first run pays for the export.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample", "a slightly longer export sample"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    staging = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(output_dir))
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                os.path.join(staging, MODEL_FILE),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET,
+            )
+        tokenizer.save_pretrained(staging)
+        if os.path.isdir(output_dir):
+            shutil.rmtree(output_dir)
+        os.replace(staging, output_dir)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+    return os.path.join(output_dir, MODEL_FILE)
+
+
+def quantize_onnx(model_path: str, output_path: str) -> str:
+    """Dynamic int8 quantization of the weights (activations stay fp32)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    staging = output_path + ".tmp"
+    quantize_dynamic(model_path, staging, weight_type=QuantType.QInt8)
+    os.replace(staging, output_path)
+    return output_path
+
+
+def ensure_onnx_model(model_name: str, root: str, quantized: bool = False) -> str:
+    """Path of the exported (and optionally quantized) model, creating it on first use."""
+    directory = onnx_model_dir(model_name, root)
+    model_path = os.path.join(directory, MODEL_FILE)
+    with _export_lock:
+        if not os.path.exists(model_path) or not os.path.exists(os.path.join(directory, TOKENIZER_FILE)):
+            os.makedirs(root, exist_ok=True)
+            print(f"📦 Exporting {model_name} to ONNX: {directory}")
+            export_onnx(model_name, directory)
+        if not quantized:
+            return model_path
+        quantized_path = os.path.join(directory, QUANTIZED_MODEL_FILE)
+        if not os.path.exists(quantized_path):
+            print(f"📦 Quantizing {model_name} to int8")
+            quantize_onnx(model_path, quantized_path)
+        return quantized_path
+
+
+class OnnxEmbedding(BaseEmbedding):
+    """ONNX Runtime CPU backend for BERT-style sentence embedding models.
+
+    Matches the sentence-transformers setup of bge models (CLS pooling,
+    L2 normalization, query instruction), so vectors stay comparable with
+    HuggingFaceEmbedding. Texts are tokenized without padding, sorted by
+    token length and padded only to the longest text of each batch.
+    `model_name` carries the backend suffix (e.g. "BAAI/bge-small-en-v1.5@onnx-int8")
+    so embedding and query caches never mix vectors of different backends.
+    """
+
+    base_model_name: str = Field(description="HuggingFace model id the ONNX graph was exported from.")
+    max_length: int = Field(default=512, description="Maximum tokens per text.")
+    normalize: bool = Field(default=True, description="L2-normalize the vectors.")
+    query_instruction: str = Field(default="", description="Prefix added to queries.")
+    text_instruction: str = Field(default="", description="Prefix added to documents.")
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: Any = PrivateAttr()
+    _pad_id: int = PrivateAttr()
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str,
+        quantized: bool = False,
+        embed_batch_size: int = 32,
+        num_threads: int = 0,
+        max_length: int = 512,
+        normalize: bool = True,
+        **kwargs: Any,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from llama_index.embeddings.huggingface.utils import (
+            get_query_instruct_for_model_name,
+            get_text_instruct_for_model_name,
+        )
+
+        model_path = ensure_onnx_model(model_name, cache_dir, quantized=quantized)
+        super().__init__(
+            model_name=f"{model_name}@{'onnx-int8' if quantized else 'onnx'}",
+            base_model_name=model_name,
+            embed_batch_size=embed_batch_size,
+            max_length=max_length,
+            normalize=normalize,
+            query_instruction=get_query_instruct_for_model_name(model_name),
+            text_instruction=get_text_instruct_for_model_name(model_name),
+            **kwargs,
+        )
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        tokenizer = Tokenizer.from_file(os.path.join(os.path.dirname(model_path), TOKENIZER_FILE))
+        tokenizer.enable_truncation(max_length=max_length)
+        tokenizer.no_padding()
+        self._tokenizer = tokenizer
+        self._pad_id = tokenizer.token_to_id("[PAD]") or 0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    def _encode(self, texts: Sequence[str]) -> List[List[float]]:
+        encodings = self._tokenizer.encode_batch(list(texts))
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        vectors: List[List[float]] = [None] * len(encodings)
+        for start in range(0, len(order), self.embed_batch_size):
+            batch = order[start:start + self.embed_batch_size]
+            width = max(len(encodings[i].ids) for i in batch)
+            input_ids = np.full((len(batch), width), self._pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            token_type_ids = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                encoding = encodings[i]
+                length = len(encoding.ids)
+                input_ids[row, :length] = encoding.ids
+                attention_mask[row, :length] = encoding.attention_mask
+                token_type_ids[row, :length] = encoding.type_ids
+            feeds = {
+                name: array for name, array in (
+                    ("input_ids", input_ids),
+                    ("attention_mask", attention_mask),
+                    ("token_type_ids", token_type_ids),
+                ) if name in self._input_names
+            }
+            hidden = self._session.run(None, feeds)[0]
+            # CLS pooling, as configured for bge in sentence-transformers
+            pooled = hidden[:, 0]
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for row, i in enumerate(batch):
+                vectors[i] = pooled[row].tolist()
+        return vectors
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._encode([self.query_instruction + query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._encode([self.text_instruction + text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._encode([self.text_instruction + text for text in texts])
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
@@ -0,0 +1,52 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+# Sheets API read quota: 60 requests per minute per user (a service account
+# counts as one user) and 300 per minute per project.
+SHEETS_READ_REQUESTS_PER_MINUTE = 60
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncTokenBucket:
+    """Token bucket for asyncio code.
+
+    Tokens refill continuously at `rate_per_minute / 60` per second up to
+    `burst`. `acquire()` waits until a token is available, so callers share
+    one quota no matter how many requests are in flight.
+    """
+
+    def __init__(self, rate_per_minute: float = SHEETS_READ_REQUESTS_PER_MINUTE, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_minute // 6)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited_s = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                self.waited_s += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self.tokens -= 1
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 64.0, retry_after: Optional[str] = None) -> float:
+    """Exponential backoff with full jitter; honours a numeric Retry-After header."""
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
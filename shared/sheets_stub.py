@@ -0,0 +1,206 @@
+import re
+import random
+import string
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from selection import column_index
+
+
+def _unquote_sheet_name(name: str) -> str:
+    if len(name) >= 2 and name[0] == "'" and name[-1] == "'":
+        return name[1:-1].replace("''", "'")
+    return name
+
+
+_CELL_RE = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+
+def parse_a1_range(a1: str) -> Tuple[str, Optional[int], Optional[int], Optional[int], Optional[int]]:
+    """Parse an A1 range into (sheet, first_row, last_row, first_col, last_col).
+
+    Rows and columns are 0-based and inclusive; None means unbounded.
+    """
+    if "!" in a1:
+        sheet_part, cells = a1.rsplit("!", 1)
+    else:
+        sheet_part, cells = a1, ""
+    sheet_name = _unquote_sheet_name(sheet_part)
+    if not cells:
+        return sheet_name, None, None, None, None
+
+    start, _, end = cells.partition(":")
+    end = end or start
+    start_m, end_m = _CELL_RE.match(start), _CELL_RE.match(end)
+    if not start_m or not end_m:
+        raise ValueError(f"Unsupported A1 range: {a1}")
+
+    first_col = column_index(start_m.group(1)) if start_m.group(1) else None
+    last_col = column_index(end_m.group(1)) if end_m.group(1) else None
+    first_row = int(start_m.group(2)) - 1 if start_m.group(2) else None
+    last_row = int(end_m.group(2)) - 1 if end_m.group(2) else None
+    return sheet_name, first_row, last_row, first_col, last_col
+
+
+def _trim(rows: List[List[str]]) -> List[List[str]]:
+    """Mimic the API: trailing empty cells and trailing empty rows are dropped."""
+    trimmed = []
+    for row in rows:
+        end = len(row)
+        while end and row[end - 1] == "":
+            end -= 1
+        trimmed.append(row[:end])
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class _Request:
+    def __init__(self, service: "StubSheetsService", fn, kind: str):
+        self._service = service
+        self._fn = fn
+        self._kind = kind
+
+    def execute(self, num_retries: int = 0):
+        self._service._round_trip(self._kind)
+        return self._fn()
+
+
+class _Values:
+    def __init__(self, service: "StubSheetsService"):
+        self._service = service
+
+    def get(self, spreadsheetId: str, range: str, **kwargs):
+        return _Request(self._service, lambda: self._service._value_range(spreadsheetId, range), "values.get")
+
+    def batchGet(self, spreadsheetId: str, ranges: List[str], **kwargs):
+        def run():
+            return {
+                "spreadsheetId": spreadsheetId,
+                "valueRanges": [self._service._value_range(spreadsheetId, r) for r in ranges],
+            }
+        return _Request(self._service, run, "values.batchGet")
+
+
+class _Spreadsheets:
+    def __init__(self, service: "StubSheetsService"):
+        self._service = service
+
+    def get(self, spreadsheetId: str, **kwargs):
+        return _Request(self._service, lambda: self._service._metadata(spreadsheetId), "spreadsheets.get")
+
+    def values(self):
+        return _Values(self._service)
+
+
+class _Files:
+    def __init__(self, service: "StubSheetsService"):
+        self._service = service
+
+    def get(self, fileId: str, **kwargs):
+        def run():
+            self._service._workbook(fileId)
+            version = self._service.revisions.get(fileId, 1)
+            return {"modifiedTime": f"2024-01-01T00:00:{version:02d}.000Z", "version": str(version)}
+        return _Request(self._service, run, "drive.files.get")
+
+
+class StubDriveService:
+    """Drive v3 stand-in exposing `files().get` revision metadata of a StubSheetsService."""
+
+    def __init__(self, sheets_service: "StubSheetsService"):
+        self._sheets = sheets_service
+
+    def files(self):
+        return _Files(self._sheets)
+
+
+class StubSheetsService:
+    """In-memory stand-in for the `sheets` v4 discovery client.
+
+    Supports the calls the downloader makes (`spreadsheets().get`,
+    `values().get`, `values().batchGet`) and adds a fixed per-request
+    latency so round-trip bound code paths can be benchmarked offline.
+    """
+
+    def __init__(self, workbooks: Dict[str, Dict[str, List[List[str]]]], latency: float = 0.0):
+        self.workbooks = workbooks
+        self.latency = latency
+        self.titles: Dict[str, str] = {}
+        self.revisions: Dict[str, int] = {}
+        self.call_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    def touch(self, spreadsheet_id: str):
+        """Bump the Drive revision after editing a workbook in place."""
+        self.revisions[spreadsheet_id] = self.revisions.get(spreadsheet_id, 1) + 1
+
+    def _round_trip(self, kind: str):
+        with self._lock:
+            self.call_counts[kind] = self.call_counts.get(kind, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _workbook(self, spreadsheet_id: str) -> Dict[str, List[List[str]]]:
+        if spreadsheet_id not in self.workbooks:
+            raise Exception(f"Requested entity was not found: {spreadsheet_id}")
+        return self.workbooks[spreadsheet_id]
+
+    def _metadata(self, spreadsheet_id: str) -> Dict[str, Any]:
+        workbook = self._workbook(spreadsheet_id)
+        sheets = []
+        for sheet_id, (title, rows) in enumerate(workbook.items()):
+            sheets.append({
+                "properties": {
+                    "sheetId": sheet_id,
+                    "title": title,
+                    "gridProperties": {
+                        "rowCount": max(len(rows), 1000),
+                        "columnCount": max((len(r) for r in rows), default=0) or 26,
+                    },
+                }
+            })
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "properties": {"title": self.titles.get(spreadsheet_id, spreadsheet_id)},
+            "sheets": sheets,
+        }
+
+    def _value_range(self, spreadsheet_id: str, a1: str) -> Dict[str, Any]:
+        sheet_name, first_row, last_row, first_col, last_col = parse_a1_range(a1)
+        workbook = self._workbook(spreadsheet_id)
+        if sheet_name not in workbook:
+            raise Exception(f"Unable to parse range: {a1}")
+        rows = workbook[sheet_name]
+        start = first_row or 0
+        stop = len(rows) if last_row is None else last_row + 1
+        col_start = first_col or 0
+        col_stop = None if last_col is None else last_col + 1
+        values = _trim([row[col_start:col_stop] for row in rows[start:stop]])
+        result = {"range": a1, "majorDimension": "ROWS"}
+        if values:
+            result["values"] = values
+        return result
+
+
+def generate_workbook(
+    sheet_count: int = 5,
+    rows: int = 1000,
+    columns: int = 10,
+    cell_size: int = 8,
+    seed: int = 0,
+) -> Dict[str, List[List[str]]]:
+    """Build a synthetic workbook: a header row plus `rows` data rows per sheet."""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    workbook = {}
+    for s in range(sheet_count):
+        header = [f"col_{c}" for c in range(columns)]
+        data = [header]
+        for _ in range(rows):
+            data.append(["".join(rng.choices(alphabet, k=cell_size)) for _ in range(columns)])
+        workbook[f"Sheet{s + 1}"] = data
+    return workbook
@@ -0,0 +1,232 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from shared.config import get_snapshot_settings
+
+# Cache modes understood by GoogleSheetsDownloader and GoogleSheetsEmbeddingMethod
+CACHE_OFF = "off"
+CACHE_FIRST = "cache_first"  # serve fresh snapshots, download (and save) on a miss
+OFFLINE = "offline"          # serve snapshots even when expired, never touch the network
+CACHE_MODES = (CACHE_OFF, CACHE_FIRST, OFFLINE)
+
+META_FILE = "meta.json"
+_SCHEMA = pa.schema([("cells", pa.list_(pa.string()))])
+
+
+def _write_options() -> ipc.IpcWriteOptions:
+    codec = "lz4" if pa.Codec.is_available("lz4") else None
+    return ipc.IpcWriteOptions(compression=codec)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+class SnapshotStore:
+    """On-disk snapshots of downloaded spreadsheets.
+
+    Each spreadsheet gets a directory with one Arrow IPC file per sheet (a
+    single `list<string>` column, so ragged rows round-trip exactly) and a
+    `meta.json` holding the title, sheet order, grid sizes, Drive revision
+    and save time. Snapshots older than `ttl_s` are expired; when the store
+    grows beyond `max_bytes` the least recently read snapshots are removed.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl_s: Optional[float] = None, max_bytes: Optional[int] = None):
+        settings = get_snapshot_settings()
+        self.root = root or settings["snapshot_dir"]
+        self.ttl_s = settings["ttl_s"] if ttl_s is None else ttl_s
+        self.max_bytes = settings["max_bytes"] if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, spreadsheet_id: str) -> str:
+        return os.path.join(self.root, spreadsheet_id)
+
+    def load_meta(self, spreadsheet_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._dir(spreadsheet_id), META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        return not self.ttl_s or time.time() - meta["saved_at"] <= self.ttl_s
+
+    def load(
+        self,
+        spreadsheet_id: str,
+        sheet_names: Optional[List[str]] = None,
+        allow_expired: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Return {'all_data', 'title', 'sheets', 'grid_sizes', 'revision', 'saved_at'} or None.
+
+        `sheet_names` defaults to every sheet of the spreadsheet; the snapshot
+        only counts as a hit if all of them were saved.
+        """
+        meta = self.load_meta(spreadsheet_id)
+        wanted = sheet_names if sheet_names is not None else (meta or {}).get("sheet_order", [])
+        if (
+            meta is None
+            or not (allow_expired or self.is_fresh(meta))
+            or any(name not in meta["sheets"] for name in wanted)
+        ):
+            self.misses += 1
+            return None
+
+        directory = self._dir(spreadsheet_id)
+        all_data = {}
+        try:
+            for name in wanted:
+                with pa.memory_map(os.path.join(directory, meta["sheets"][name]["file"])) as source:
+                    all_data[name] = ipc.open_file(source).read_all().column("cells").to_pylist()
+        except (FileNotFoundError, pa.ArrowInvalid) as e:
+            print(f"⚠️ Unreadable snapshot for {spreadsheet_id}: {e}")
+            self.misses += 1
+            return None
+        # meta.json mtime doubles as the last-read time for LRU eviction
+        os.utime(os.path.join(directory, META_FILE))
+        self.hits += 1
+        return {
+            "all_data": all_data,
+            "title": meta["title"],
+            "sheets": meta["sheet_order"],
+            "grid_sizes": meta["grid_sizes"],
+            "revision": meta["revision"],
+            "saved_at": meta["saved_at"],
+        }
+
+    def save(
+        self,
+        spreadsheet_id: str,
+        all_data: Dict[str, List[List[str]]],
+        spreadsheet_info: Dict[str, Any],
+        revision: Optional[Dict[str, Any]] = None,
+    ):
+        """Write `all_data` (all or some sheets) for one spreadsheet.
+
+        Sheets saved earlier under the same revision are kept, so filtered
+        downloads can fill a snapshot piece by piece.
+        """
+        with self._lock:
+            previous = self.load_meta(spreadsheet_id)
+            revision = revision or {}
+            kept = {}
+            if previous and previous["revision"] == revision and self.is_fresh(previous):
+                kept = {
+                    name: entry for name, entry in previous["sheets"].items()
+                    if name not in all_data and name in spreadsheet_info["sheets"]
+                }
+
+            directory = self._dir(spreadsheet_id)
+            staging = os.path.join(self.root, f".tmp-{spreadsheet_id}-{uuid.uuid4().hex}")
+            os.makedirs(staging)
+            try:
+                for name, entry in kept.items():
+                    shutil.copy2(os.path.join(directory, entry["file"]), os.path.join(staging, entry["file"]))
+                used = {entry["file"] for entry in kept.values()}
+                sheets = dict(kept)
+                options = _write_options()
+                for name, rows in all_data.items():
+                    index = len(used)
+                    while f"sheet_{index}.arrow" in used:
+                        index += 1
+                    file_name = f"sheet_{index}.arrow"
+                    used.add(file_name)
+                    table = pa.table({"cells": pa.array(rows, type=pa.list_(pa.string()))}, schema=_SCHEMA)
+                    with ipc.new_file(os.path.join(staging, file_name), _SCHEMA, options=options) as writer:
+                        writer.write_table(table)
+                    sheets[name] = {"file": file_name, "rows": len(rows)}
+                meta = {
+                    "spreadsheet_id": spreadsheet_id,
+                    "title": spreadsheet_info.get("title", ""),
+                    "sheet_order": list(spreadsheet_info["sheets"]),
+                    "grid_sizes": spreadsheet_info.get("grid_sizes", {}),
+                    "revision": revision,
+                    "saved_at": time.time(),
+                    "sheets": sheets,
+                }
+                with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+                if os.path.isdir(directory):
+                    shutil.rmtree(directory)
+                os.replace(staging, directory)
+            finally:
+                if os.path.isdir(staging):
+                    shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def delete(self, spreadsheet_id: str):
+        with self._lock:
+            shutil.rmtree(self._dir(spreadsheet_id), ignore_errors=True)
+
+    def _entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or entry.name.startswith(".tmp-"):
+                continue
+            meta_path = os.path.join(entry.path, META_FILE)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    saved_at = json.load(f)["saved_at"]
+                last_read = os.path.getmtime(meta_path)
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append({
+                "spreadsheet_id": entry.name,
+                "bytes": _dir_size(entry.path),
+                "saved_at": saved_at,
+                "last_read": last_read,
+            })
+        return entries
+
+    def evict(self) -> List[str]:
+        """Remove expired snapshots, then least recently read ones above `max_bytes`."""
+        removed = []
+        with self._lock:
+            entries = self._entries()
+            now = time.time()
+            for entry in entries:
+                if self.ttl_s and now - entry["saved_at"] > self.ttl_s:
+                    removed.append(entry["spreadsheet_id"])
+            remaining = [e for e in entries if e["spreadsheet_id"] not in removed]
+            total = sum(e["bytes"] for e in remaining)
+            for entry in sorted(remaining, key=lambda e: e["last_read"]):
+                if not self.max_bytes or total <= self.max_bytes:
+                    break
+                removed.append(entry["spreadsheet_id"])
+                total -= entry["bytes"]
+            for spreadsheet_id in removed:
+                shutil.rmtree(self._dir(spreadsheet_id), ignore_errors=True)
+        self.evictions += len(removed)
+        if removed:
+            print(f"🧹 Evicted {len(removed)} snapshot(s)")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            "root": self.root,
+            "snapshots": len(entries),
+            "bytes": sum(e["bytes"] for e in entries),
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,235 @@
+import re
+import sys
+from typing import Iterator, List, Dict, Any, Optional, Sequence, Union
+
+import numpy as np
+
+# Only canonical numbers are stored as floats, so rendering them back gives the
+# exact original text ("007", "1.50" or "1,234" stay strings).
+_NUMBER_RE = re.compile(r"(?!-0$)-?(0|[1-9]\d{0,14})(\.\d*[1-9])?")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_DATETIME_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+
+NUMBER = "number"
+INTEGER = "integer"
+DATE = "date"
+DATETIME = "datetime"
+TEXT = "text"
+
+
+def render_row(cells: Sequence[str]) -> str:
+    """Cells joined with ", " on one line; line breaks inside cells become spaces.
+
+    Row documents are split back into rows on newlines, so a multi-line cell
+    must not look like extra rows.
+    """
+    text = ", ".join(cells)
+    if "\n" in text or "\r" in text:
+        text = text.replace("\r\n", " ").replace("\n", " ").replace("\r", " ")
+    return text
+
+
+class Column:
+    """One typed column.
+
+    number/integer -> float64 values (NaN for empty cells)
+    date/datetime  -> datetime64[s] values (NaT for empty cells)
+    text           -> int32 codes into a categories array ("" is code 0)
+    """
+
+    __slots__ = ("name", "kind", "values", "categories")
+
+    def __init__(self, name: str, kind: str, values: np.ndarray, categories: Optional[np.ndarray] = None):
+        self.name = name
+        self.kind = kind
+        self.values = values
+        self.categories = categories
+
+    def slice(self, start: int, stop: int) -> "Column":
+        # Basic slicing returns a view, so windows share memory with the table
+        return Column(self.name, self.kind, self.values[start:stop], self.categories)
+
+    @property
+    def nbytes(self) -> int:
+        size = self.values.nbytes
+        if self.categories is not None:
+            size += self.categories.nbytes + sum(sys.getsizeof(c) for c in self.categories)
+        return size
+
+    def render(self) -> List[str]:
+        """Cells back as the original strings."""
+        if self.kind == TEXT:
+            return self.categories[self.values].tolist()
+        if self.kind in (NUMBER, INTEGER):
+            empty = np.isnan(self.values)
+            if self.kind == INTEGER:
+                rendered = np.where(empty, 0, self.values).astype(np.int64).astype(str)
+            else:
+                rendered = np.array(
+                    [str(int(v)) if v.is_integer() else repr(v) for v in np.where(empty, 0, self.values).tolist()],
+                    dtype=object,
+                )
+            return np.where(empty, "", rendered).tolist()
+        empty = np.isnat(self.values)
+        rendered = np.datetime_as_string(self.values, unit="D" if self.kind == DATE else "s")
+        return np.where(empty, "", rendered).tolist()
+
+
+def _infer(name: str, cells: List[str]) -> Column:
+    non_empty = [c for c in cells if c != ""]
+    if non_empty and all(
+        _NUMBER_RE.fullmatch(c) and ("." not in c or repr(float(c)) == c) for c in non_empty
+    ):
+        kind = INTEGER if all("." not in c for c in non_empty) else NUMBER
+        values = np.array([c if c != "" else "nan" for c in cells], dtype=object).astype(np.float64)
+        return Column(name, kind, values)
+    for kind, pattern in ((DATE, _DATE_RE), (DATETIME, _DATETIME_RE)):
+        if non_empty and all(pattern.fullmatch(c) for c in non_empty):
+            try:
+                return Column(name, kind, np.array([c or "NaT" for c in cells], dtype="datetime64[s]"))
+            except ValueError:
+                # ISO-shaped but impossible ("2024-02-30"): keep the column as text
+                break
+    index = {"": 0}
+    codes = np.fromiter((index.setdefault(c, len(index)) for c in cells), dtype=np.int32, count=len(cells))
+    categories = np.empty(len(index), dtype=object)
+    categories[:] = list(index)
+    return Column(name, TEXT, codes, categories)
+
+
+def _looks_like_header(first: Sequence[str], rest: Sequence[Sequence[str]]) -> bool:
+    names = [c for c in first if c != ""]
+    if not names or not rest:
+        return False
+    if len(set(names)) != len(names):
+        return False
+    return not any(
+        _NUMBER_RE.fullmatch(c) or _DATE_RE.fullmatch(c) or _DATETIME_RE.fullmatch(c) for c in names
+    )
+
+
+class SheetTable:
+    """Compact columnar view of one sheet.
+
+    Built from the ragged `List[List[str]]` the API returns: rows are padded
+    to the widest row, the header row is detected (or forced), and each
+    column is stored as a typed NumPy array. `slice()` returns zero-copy row
+    windows for the chunker, and `summary()` computes per-column statistics
+    without walking Python lists.
+    """
+
+    def __init__(self, columns: List[Column], n_rows: int, first_row: int = 2, has_header: bool = True):
+        self.columns = columns
+        self.n_rows = n_rows
+        # 1-based sheet row number of the first data row
+        self.first_row = first_row
+        # False when column names were generated (col_1, col_2, ...)
+        self.has_header = has_header
+
+    @classmethod
+    def from_rows(cls, rows: List[List[str]], header: Union[bool, str] = "auto") -> "SheetTable":
+        if header == "auto":
+            header = _looks_like_header(rows[0], rows[1:]) if rows else False
+        header_row = list(rows[0]) if header and rows else []
+        data = rows[1:] if header else rows
+        width = max([len(header_row)] + [len(r) for r in data]) if (data or header_row) else 0
+        names = [
+            (header_row[i] if i < len(header_row) and header_row[i] else f"col_{i + 1}")
+            for i in range(width)
+        ]
+        columns = []
+        for i, name in enumerate(names):
+            cells = [r[i] if i < len(r) else "" for r in data]
+            columns.append(_infer(name, cells))
+        return cls(columns, len(data), first_row=2 if header else 1, has_header=bool(header))
+
+    @property
+    def n_columns(self) -> int:
+        return len(self.columns)
+
+    @property
+    def header(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.columns)
+
+    def slice(self, start: int, stop: int) -> "SheetTable":
+        """Rows [start, stop) as a new table sharing this table's buffers."""
+        start, stop = max(0, start), min(self.n_rows, stop)
+        return SheetTable(
+            [c.slice(start, stop) for c in self.columns],
+            max(0, stop - start),
+            first_row=self.first_row + start,
+            has_header=self.has_header,
+        )
+
+    def iter_windows(self, window_rows: int) -> Iterator["SheetTable"]:
+        for start in range(0, self.n_rows, window_rows):
+            yield self.slice(start, start + window_rows)
+
+    def to_rows(self) -> List[List[str]]:
+        """Rows back as lists of strings, with trailing empty cells trimmed like the API."""
+        rendered = [c.render() for c in self.columns]
+        rows = []
+        for cells in zip(*rendered):
+            end = len(cells)
+            while end and cells[end - 1] == "":
+                end -= 1
+            rows.append(list(cells[:end]))
+        if not rendered:
+            rows = [[] for _ in range(self.n_rows)]
+        return rows
+
+    def row_texts(self) -> List[str]:
+        """Each row rendered with `render_row`, as the chunker and fallback reader render it."""
+        return [render_row(cells) for cells in self.to_rows()]
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-column stats keyed by column name; repeated names become "Name (2)", "Name (3)"."""
+        columns = {}
+        for c in self.columns:
+            if c.kind in (NUMBER, INTEGER):
+                valid = ~np.isnan(c.values)
+                count = int(valid.sum())
+                stats = {"non_empty": count}
+                if count:
+                    stats.update({
+                        "min": float(np.nanmin(c.values)),
+                        "max": float(np.nanmax(c.values)),
+                        "mean": float(np.nanmean(c.values)),
+                        "sum": float(np.nansum(c.values)),
+                    })
+            elif c.kind in (DATE, DATETIME):
+                valid = ~np.isnat(c.values)
+                count = int(valid.sum())
+                stats = {"non_empty": count}
+                if count:
+                    unit = "D" if c.kind == DATE else "s"
+                    stats["min"] = str(np.datetime_as_string(c.values[valid].min(), unit=unit))
+                    stats["max"] = str(np.datetime_as_string(c.values[valid].max(), unit=unit))
+            else:
+                used = np.bincount(c.values, minlength=len(c.categories))
+                stats = {
+                    "non_empty": int(self.n_rows - used[0]) if len(used) else 0,
+                    "distinct": int((used[1:] > 0).sum()),
+                }
+            key, n = c.name, 2
+            while key in columns:
+                key, n = f"{c.name} ({n})", n + 1
+            columns[key] = dict(type=c.kind, **stats)
+        return {
+            "rows": self.n_rows,
+            "columns": self.n_columns,
+            "nbytes": self.nbytes,
+            "column_stats": columns,
+        }
+
+
+def rows_nbytes(rows: List[List[str]]) -> int:
+    """Approximate memory of the ragged list-of-strings form, for comparison."""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row) + sum(sys.getsizeof(c) for c in row)
+    return total
@@ -0,0 +1,67 @@
+import time
+from typing import Callable, Dict, Any, Optional
+from downloader import GoogleSheetsDownloader, WINDOW_ROWS
+from google_sheets_embedding_method import GoogleSheetsEmbeddingMethod
+from vector_store_manager import GoogleSheetsVectorStore
+from shared.dedup import make_deduplicator
+from shared.manifest import IndexManifest
+
+EMBED_BATCH_NODES = 256
+
+
+def stream_ingest(
+    downloader: GoogleSheetsDownloader,
+    embedding_method: GoogleSheetsEmbeddingMethod,
+    vector_store: GoogleSheetsVectorStore,
+    window_rows: int = WINDOW_ROWS,
+    batch_size: int = EMBED_BATCH_NODES,
+    spreadsheet_info: Optional[Dict[str, Any]] = None,
+    manifest: Optional[IndexManifest] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    dedup: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Rebuild a collection by streaming row windows end to end.
+
+    Windows are downloaded one at a time, chunked into nodes, embedded in
+    batches of `batch_size` and written before the next window is fetched,
+    so peak memory is bounded by the window and batch sizes.
+
+    This is a full rebuild: the collection and its incremental manifest
+    entries are cleared first. `progress(stats)` is called after each
+    downloaded window; an exception raised from it stops the stream.
+
+    `dedup` (off | exact | near, default: EMBED_DEDUP) drops repeated rows
+    before they are embedded; savings are reported under stats["dedup"].
+    """
+    spreadsheet_id = embedding_method.spreadsheet_id
+    if spreadsheet_info is None:
+        spreadsheet_info = downloader.get_spreadsheet_info(spreadsheet_id)
+
+    vector_store.clear_collection()
+    (manifest or IndexManifest()).clear_collection(vector_store.collection_name)
+
+    stats = {"windows": 0, "rows": 0, "nodes": 0}
+
+    def counted_windows():
+        for window in downloader.iter_sheet_windows(
+            spreadsheet_id, window_rows, spreadsheet_info, selection=embedding_method.selection
+        ):
+            stats["windows"] += 1
+            stats["rows"] += len(window[3])
+            if progress:
+                progress(dict(stats, sheet_name=window[0]))
+            yield window
+
+    deduplicator = make_deduplicator(dedup)
+    start = time.perf_counter()
+    stats["nodes"] = vector_store.add_node_stream(
+        embedding_method.iter_nodes(counted_windows(), deduplicator),
+        batch_size=batch_size,
+        deduplicator=deduplicator,
+    )
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    if deduplicator is not None:
+        stats["dedup"] = deduplicator.summary()
+        print(f"✅ Dedup: {stats['dedup']}")
+    print(f"✅ Streamed {stats['rows']} row(s) in {stats['windows']} window(s) -> {stats['nodes']} node(s)")
+    return stats
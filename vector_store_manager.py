@@ -1,26 +1,54 @@
+import json
+import time
 import chromadb
+from concurrent.futures import ThreadPoolExecutor
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import VectorStoreIndex, StorageContext
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.core.schema import BaseNode
-from typing import List
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from shared.dedup import DUPLICATE_KEYS, RowDeduplicator
+from shared.embedding_cache import EmbeddingCache
+from shared.embedding_registry import embedding_registry, embed_nodes
+from shared.lexical_index import LexicalIndex, lexical_index_path
+from shared.metrics import metrics
 import os
 
+CHROMA_PATH = "./chroma_db"
+UPSERT_BATCH_SIZE = 256
+# Collection metadata key bumped on every write; readers use it to invalidate caches
+GENERATION_KEY = "generation"
+
 class GoogleSheetsVectorStore:
-    """Vector store manager for Google Sheets documents"""
+    """Vector store manager for Google Sheets documents
+
+    Every write is mirrored into a BM25 LexicalIndex kept next to the
+    collection, which the retriever fuses with vector search.
+    """
     
-    def __init__(self, collection_name: str = "google_sheets_docs"):
+    def __init__(
+        self,
+        collection_name: str = "google_sheets_docs",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        use_embedding_cache: bool = True,
+        chroma_path: str = CHROMA_PATH,
+    ):
         self.collection_name = collection_name
+        self.chroma_path = chroma_path
         self.chroma_client = None
         self.vector_store = None
         self.index = None
+        self.embedding_cache = embedding_cache
+        if self.embedding_cache is None and use_embedding_cache:
+            self.embedding_cache = EmbeddingCache()
+        self.lexical_index = LexicalIndex(lexical_index_path(chroma_path, collection_name))
         self._setup_vector_store()
     
     def _setup_vector_store(self):
         """Initialize ChromaDB and vector store"""
         try:
             # ChromaDB client oluştur
-            self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
+            self.chroma_client = chromadb.PersistentClient(path=self.chroma_path)
             
             # Collection oluştur veya mevcut olanı al
             collection = self.chroma_client.get_or_create_collection(self.collection_name)
@@ -37,22 +65,17 @@ class GoogleSheetsVectorStore:
     def create_index(self, nodes: List[BaseNode]) -> VectorStoreIndex:
         """Create or update vector index with new nodes"""
         try:
-            # Storage context oluştur
-            storage_context = StorageContext.from_defaults(vector_store=self.vector_store)
-            
-            # OpenAI embedding kullan
-            # Ücretsiz HuggingFace embedding modeli kullan
-            embed_model = HuggingFaceEmbedding(
-                model_name="BAAI/bge-small-en-v1.5"
-            )
-            
-            # Index oluştur
-            self.index = VectorStoreIndex(
-                nodes=nodes,
-                storage_context=storage_context,
+            # Ücretsiz HuggingFace embedding modeli, süreç genelinde tek sefer yüklenir
+            embed_model = embedding_registry.get_model()
+
+            # Sabit ID'li node'lar upsert edilir; tekrar çalıştırmak kayıt çoğaltmaz
+            self.upsert_nodes(nodes)
+
+            # Index mevcut koleksiyonun üzerine kurulur, embedding tekrar hesaplanmaz
+            self.index = VectorStoreIndex.from_vector_store(
+                self.vector_store,
                 embed_model=embed_model
             )
-            
             print(f"✅ Created index with {len(nodes)} nodes")
             return self.index
             
@@ -60,6 +83,237 @@ class GoogleSheetsVectorStore:
             print(f"❌ Index creation error: {e}")
             raise
     
+    def _embed_nodes(self, nodes: List[BaseNode], embed_model):
+        """Fill node.embedding from the embedding cache, embedding only the misses"""
+        embed_nodes(nodes, self.embedding_cache, model_name=embed_model.model_name)
+
+    def embed_nodes(self, nodes: List[BaseNode]):
+        """Embed nodes ahead of a write; `insert_nodes` then skips the nodes that have vectors."""
+        if nodes:
+            self._embed_nodes(nodes, embedding_registry.get_model())
+
+    def insert_nodes(self, nodes: List[BaseNode], batch_size: int = UPSERT_BATCH_SIZE):
+        """Embed and upsert nodes into the existing collection"""
+        if not nodes:
+            return
+        self.upsert_nodes(nodes, batch_size=batch_size)
+
+    def add_node_stream(
+        self,
+        nodes: Iterable[BaseNode],
+        batch_size: int = UPSERT_BATCH_SIZE,
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> int:
+        """Embed and write nodes in fixed-size batches; returns the node count.
+
+        At most two batches are held in memory at a time (one embedding, one
+        being written), so peak memory depends on `batch_size` rather than on
+        the size of the source sheet.
+        """
+        total = self.upsert_nodes(nodes, batch_size=batch_size, deduplicator=deduplicator)
+        print(f"✅ Streamed {total} nodes into {self.collection_name}")
+        return total
+
+    def upsert_nodes(
+        self,
+        nodes: Iterable[BaseNode],
+        batch_size: int = UPSERT_BATCH_SIZE,
+        deduplicator: Optional[RowDeduplicator] = None,
+    ) -> int:
+        """Embed and upsert nodes in batches; returns the node count.
+
+        Records are keyed by node ID, so nodes with deterministic IDs (see
+        `row_chunker.chunk_id`) overwrite their previous version instead of
+        being appended again. Each batch is written on a background thread
+        while the next one is being embedded.
+
+        Pass the `deduplicator` the nodes were chunked with when they are
+        produced lazily: duplicates found after a chunk was written are added
+        to its back-references once the stream ends.
+        """
+        embed_model = embedding_registry.get_model()
+        collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        total = 0
+        timings = {"embed_s": 0.0, "write_s": 0.0}
+        pending = None
+        batch: List[BaseNode] = []
+
+        def flush(batch, pending):
+            if deduplicator is not None:
+                deduplicator.annotate(batch)
+            start = time.perf_counter()
+            with metrics.span("embed", nodes=len(batch)):
+                self._embed_nodes(batch, embed_model)
+            timings["embed_s"] += time.perf_counter() - start
+            if pending is not None:
+                # Time spent here means writes are slower than embedding
+                with metrics.span("chroma_write_wait"):
+                    pending.result()
+            return writer.submit(self._upsert_batch, collection, batch, timings)
+
+        # One writer thread: Chroma writes stay ordered, embedding runs alongside
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            for node in nodes:
+                batch.append(node)
+                if len(batch) >= batch_size:
+                    pending = flush(batch, pending)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                pending = flush(batch, pending)
+                total += len(batch)
+            if pending is not None:
+                pending.result()
+        if deduplicator is not None:
+            self._write_duplicate_refs(collection, deduplicator)
+        if total:
+            self._mark_changed()
+        print(
+            f"✅ Upserted {total} nodes into {self.collection_name} "
+            f"(embed {timings['embed_s']:.2f}s, write {timings['write_s']:.2f}s)"
+        )
+        return total
+
+    def _upsert_batch(self, collection, batch: List[BaseNode], timings: Dict[str, float]):
+        start = time.perf_counter()
+        # Same record layout as ChromaVectorStore.add, so LlamaIndex can still query it;
+        # a repeated ID inside one call is rejected by Chroma, the last one wins
+        records = {node.node_id: node for node in batch}
+        metadatas = [node_to_metadata_dict(node, remove_text=True, flat_metadata=True) for node in records.values()]
+        documents = [node.get_content(metadata_mode=MetadataMode.NONE) for node in records.values()]
+        with metrics.span("chroma_write", nodes=len(records)):
+            collection.upsert(
+                ids=list(records),
+                embeddings=[node.get_embedding() for node in records.values()],
+                metadatas=metadatas,
+                documents=documents,
+            )
+        self.lexical_index.upsert(zip(records, documents, metadatas))
+        metrics.incr("nodes_written", len(records))
+        timings["write_s"] += time.perf_counter() - start
+
+    def _write_duplicate_refs(self, collection, deduplicator: RowDeduplicator, batch_size: int = 500):
+        """Update the back-references of chunks written before their last duplicate was seen"""
+        updates = deduplicator.pending_updates()
+        ids = list(updates)
+        for i in range(0, len(ids), batch_size):
+            records = collection.get(ids=ids[i:i + batch_size], include=["metadatas"])
+            metadatas = []
+            for node_id, metadata in zip(records["ids"], records["metadatas"]):
+                metadata = dict(metadata, **updates[node_id])
+                # LlamaIndex rebuilds node.metadata from the serialized node, keep it in step
+                if "_node_content" in metadata:
+                    content = json.loads(metadata["_node_content"])
+                    content.setdefault("metadata", {}).update(updates[node_id])
+                    for key in ("excluded_embed_metadata_keys", "excluded_llm_metadata_keys"):
+                        excluded = content.setdefault(key, [])
+                        excluded.extend(k for k in DUPLICATE_KEYS if k not in excluded)
+                    metadata["_node_content"] = json.dumps(content)
+                metadatas.append(metadata)
+            if records["ids"]:
+                collection.update(ids=records["ids"], metadatas=metadatas)
+        deduplicator.mark_written(ids)
+        if ids:
+            print(f"✅ Updated duplicate references on {len(ids)} chunk(s)")
+
+    def delete_documents(self, ref_doc_ids: List[str], batch_size: int = 500):
+        """Delete all vectors that belong to the given source document IDs"""
+        if not ref_doc_ids or not self.chroma_client:
+            return
+        try:
+            collection = self.chroma_client.get_or_create_collection(self.collection_name)
+            with metrics.span("chroma_delete", documents=len(ref_doc_ids)):
+                for i in range(0, len(ref_doc_ids), batch_size):
+                    batch = list(ref_doc_ids[i:i + batch_size])
+                    collection.delete(where={"document_id": {"$in": batch}})
+            self.lexical_index.delete_documents(ref_doc_ids)
+            self._mark_changed()
+            print(f"✅ Deleted vectors for {len(ref_doc_ids)} document(s)")
+        except Exception as e:
+            print(f"❌ Delete documents error: {e}")
+            raise
+
+    def delete_nodes(self, node_ids: List[str], batch_size: int = 500):
+        """Delete vectors by node ID"""
+        if not node_ids:
+            return
+        collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        with metrics.span("chroma_delete", nodes=len(node_ids)):
+            for i in range(0, len(node_ids), batch_size):
+                collection.delete(ids=list(node_ids[i:i + batch_size]))
+        self.lexical_index.delete_nodes(node_ids)
+        self._mark_changed()
+
+    def move_nodes(self, moves: Dict[str, Tuple[str, int, int]], batch_size: int = 500):
+        """Re-key stored chunks whose rows shifted: {old_id: (new_id, first_row, last_row)}.
+
+        The stored vector and text are reused, only the ID and row metadata
+        change, so nothing is embedded again.
+        """
+        if not moves:
+            return
+        collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        old_ids = list(moves)
+        records = []
+        # Read everything before writing: a new ID may be the old ID of another moved chunk
+        for i in range(0, len(old_ids), batch_size):
+            page = collection.get(ids=old_ids[i:i + batch_size], include=["embeddings", "documents", "metadatas"])
+            records.extend(zip(page["ids"], page["embeddings"], page["documents"], page["metadatas"]))
+        with metrics.span("chroma_move", nodes=len(records)):
+            for i in range(0, len(old_ids), batch_size):
+                collection.delete(ids=old_ids[i:i + batch_size])
+            self.lexical_index.delete_nodes(old_ids)
+            for i in range(0, len(records), batch_size):
+                ids, embeddings, documents, metadatas = [], [], [], []
+                for old_id, embedding, document, metadata in records[i:i + batch_size]:
+                    new_id, first_row, last_row = moves[old_id]
+                    metadata = dict(metadata, first_row=first_row, last_row=last_row)
+                    if "_node_content" in metadata:
+                        content = json.loads(metadata["_node_content"])
+                        content["id_"] = new_id
+                        content.setdefault("metadata", {}).update(first_row=first_row, last_row=last_row)
+                        metadata["_node_content"] = json.dumps(content)
+                    ids.append(new_id)
+                    embeddings.append(embedding)
+                    documents.append(document)
+                    metadatas.append(metadata)
+                collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+                self.lexical_index.upsert(zip(ids, documents, metadatas))
+        self._mark_changed()
+
+    def delete_where(self, where: Dict[str, Any]):
+        """Delete all vectors whose metadata matches a Chroma `where` filter"""
+        try:
+            collection = self.chroma_client.get_or_create_collection(self.collection_name)
+            with metrics.span("chroma_delete"):
+                # Resolve the IDs first so the lexical index drops the same chunks
+                ids = collection.get(where=where, include=[])["ids"]
+                if ids:
+                    collection.delete(ids=ids)
+            self.lexical_index.delete_nodes(ids)
+            self._mark_changed()
+        except Exception as e:
+            print(f"❌ Delete by metadata error: {e}")
+            raise
+
+    def delete_sheet(self, spreadsheet_id: str, sheet_name: str):
+        """Delete every vector of one sheet, e.g. after the sheet was removed"""
+        self.delete_where({"$and": [{"spreadsheet_id": spreadsheet_id}, {"sheet_name": sheet_name}]})
+        print(f"✅ Deleted vectors of sheet {sheet_name}")
+
+    def rebuild_lexical_index(self) -> int:
+        """Re-index the stored chunks, e.g. for collections built before the lexical index existed"""
+        collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        return self.lexical_index.rebuild_from(collection)
+
+    def _mark_changed(self):
+        """Bump the collection's write generation so readers can drop cached results"""
+        collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        # hnsw:* ayarları oluşturulduktan sonra değiştirilemez, dokunma
+        metadata = {k: v for k, v in (collection.metadata or {}).items() if not k.startswith("hnsw:")}
+        metadata[GENERATION_KEY] = int(metadata.get(GENERATION_KEY, 0)) + 1
+        collection.modify(metadata=metadata)
+
     def get_stats(self) -> dict:
         """Get collection statistics"""
         try:
@@ -69,14 +323,22 @@ class GoogleSheetsVectorStore:
                 return {
                     "collection_name": self.collection_name,
                     "document_count": count,
-                    "status": "active"
+                    "status": "active",
+                    "embedding_cache": self._cache_stats(),
+                    "embedding_model": embedding_registry.get_metrics(),
+                    "lexical_index": self.lexical_index.stats(),
                 }
         except Exception:
             return {
                 "collection_name": self.collection_name,
                 "document_count": 0,
-                "status": "empty"
+                "status": "empty",
+                "embedding_cache": self._cache_stats(),
+                "embedding_model": embedding_registry.get_metrics()
             }
+
+    def _cache_stats(self) -> Optional[dict]:
+        return self.embedding_cache.stats() if self.embedding_cache else None
     
     def clear_collection(self):
         """Clear all documents from collection"""
@@ -85,6 +347,7 @@ class GoogleSheetsVectorStore:
                 self.chroma_client.delete_collection(self.collection_name)
                 collection = self.chroma_client.get_or_create_collection(self.collection_name)
                 self.vector_store = ChromaVectorStore(chroma_collection=collection)
+                self.lexical_index.clear()
                 print("✅ Collection cleared")
         except Exception as e:
             print(f"❌ Clear collection error: {e}")